@@ -0,0 +1,89 @@
+"""Compare AnchorTimeline with filtering and sorting the anchors for every event.
+
+Run with `python -m benchmarks.anchor_timeline`. ffmpeg is not needed.
+"""
+
+import random
+import sys
+from operator import attrgetter
+from statistics import median
+from typing import List
+
+from benchmarks.common import time_call
+from match_video.anchor import Anchor, AnchorTimeline
+
+EVENT_COUNT = 10000
+ANCHOR_COUNTS = [2, 20, 200]
+
+
+def main():
+    """Time converting the clocks of many events for increasing numbers of anchors."""
+    anchor_counts = [int(arg) for arg in sys.argv[1:]] or ANCHOR_COUNTS
+
+    random.seed(0)
+    periods = [random.randint(1, 2) for _ in range(EVENT_COUNT)]
+    clocks = [random.uniform(0, 45 * 60) for _ in range(EVENT_COUNT)]
+
+    print(f"{'anchors':>8} {'scan':>10} {'timeline':>10}")
+
+    for anchor_count in anchor_counts:
+        anchors = _stoppage_anchors(anchor_count)
+
+        scan_times = time_call(
+            lambda: [
+                _scan_video_time(anchors, period, clock)
+                for period, clock in zip(periods, clocks)
+            ]
+        )
+        timeline_times = time_call(
+            lambda: AnchorTimeline(anchors).video_times(periods, clocks)
+        )
+
+        print(
+            f"{anchor_count:>8} {median(scan_times):>8.4f} s"
+            f" {median(timeline_times):>8.4f} s"
+        )
+
+
+def _stoppage_anchors(anchor_count: int) -> List[Anchor]:
+    """Anchor each half's start and evenly spaced stoppages, like replays or ads.
+
+    Args:
+        anchor_count: The number of anchors across both halves.
+
+    Returns:
+        The anchors, with thirty seconds of extra video at each stoppage.
+    """
+    anchors = []
+    per_period = anchor_count // 2
+
+    for period in (1, 2):
+        for index in range(per_period):
+            clock = index * 45 * 60 / per_period
+            anchors.append(Anchor(period, clock, period * 3600 + clock + index * 30))
+
+    return anchors
+
+
+def _scan_video_time(anchors: List[Anchor], period: int, clock: float) -> float:
+    """Look up a clock the way clips were looked up before AnchorTimeline.
+
+    Args:
+        anchors: A video's anchors.
+        period: The period of the match.
+        clock: A time since the start of the period.
+
+    Returns:
+        The video time that corresponds to clock.
+    """
+    prior_anchors = sorted(
+        [a for a in anchors if a.period == period and a.clock <= clock],
+        key=attrgetter("clock"),
+    )
+    last_anchor = prior_anchors[-1]
+
+    return last_anchor.video_time + (clock - last_anchor.clock)
+
+
+if __name__ == "__main__":
+    main()
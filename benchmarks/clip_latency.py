@@ -0,0 +1,54 @@
+"""Show that clip latency does not depend on the length of the match video.
+
+Run with `python -m benchmarks.clip_latency`. ffmpeg must be installed.
+"""
+
+import os
+import subprocess
+import sys
+from statistics import median
+from tempfile import TemporaryDirectory
+
+import match_video as mv
+from benchmarks.common import synthetic_match, time_call, timer
+
+MATCH_MINUTES = [5, 15, 45, 90]
+
+
+def main():
+    """Time a ten second clip from synthetic matches of increasing length."""
+    minutes = [int(arg) for arg in sys.argv[1:]] or MATCH_MINUTES
+
+    print(f"{'match':>8} {'size':>10} {'get_clip':>10} {'full remux':>11}")
+
+    with TemporaryDirectory() as directory:
+        for match_minutes in minutes:
+            video_path = os.path.join(directory, f"match_{match_minutes}.mp4")
+            synthetic_match(video_path, match_minutes * 60)
+
+            clip_times = time_call(
+                lambda: mv.get_clip(video_path, period=2, start_clock=60, end_clock=70)
+            )
+
+            # the cost every clip used to pay to strip chapters from the whole video
+            remux_path = os.path.join(directory, "remux.mp4")
+            with timer() as remux_time:
+                subprocess.run(
+                    ["ffmpeg", "-y", "-i", video_path, "-map", "0", "-c", "copy"]
+                    + ["-map_chapters", "-1", remux_path],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+            os.remove(remux_path)
+
+            size_mb = os.path.getsize(video_path) / 1e6
+            print(
+                f"{match_minutes:>6} m {size_mb:>7.0f} MB {median(clip_times):>8.3f} s"
+                f" {remux_time[0]:>9.3f} s"
+            )
+
+            os.remove(video_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+
+import match_video as mv
+from match_video.anchor import Anchor
+
+
+def synthetic_match(
+    path: str, duration: float, size: str = "640x360", bitrate: str = "1M"
+) -> None:
+    """Write a synthetic match video with anchors for each half.
+
+    A one minute segment is encoded from ffmpeg's test sources and then looped with
+    stream copy, so long matches are cheap to create.
+
+    Args:
+        path: The path to write the video to.
+        duration: The length of the video in seconds.
+        size: The frame size of the video as WIDTHxHEIGHT.
+        bitrate: The video bitrate, e.g. 1M.
+    """
+    segment_path = f"{path}.segment.mp4"
+    looped_path = f"{path}.looped.mp4"
+
+    _run_ffmpeg(
+        [
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc=size={size}:rate=25",
+            "-f",
+            "lavfi",
+            "-i",
+            "sine=frequency=440",
+            "-t",
+            "60",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-g",
+            "50",
+            "-b:v",
+            bitrate,
+            "-c:a",
+            "aac",
+            segment_path,
+        ]
+    )
+    _run_ffmpeg(
+        [
+            "-stream_loop",
+            "-1",
+            "-i",
+            segment_path,
+            "-t",
+            f"{duration}",
+            "-c",
+            "copy",
+            looped_path,
+        ]
+    )
+
+    anchors = [Anchor(1, 0.0, 0.0), Anchor(2, 0.0, duration / 2)]
+    mv.write_anchors(looped_path, path, anchors)
+
+    os.remove(segment_path)
+    os.remove(looped_path)
+
+
+def time_call(function: Callable[[], object], repeat: int = 3) -> List[float]:
+    """Time repeated calls of a function.
+
+    Args:
+        function: The function to call without arguments.
+        repeat: The number of times to call the function.
+
+    Returns:
+        The wall time of each call in seconds.
+    """
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+@contextmanager
+def timer() -> Iterator[List[float]]:
+    """Time the body of a with statement.
+
+    Yields:
+        A list that holds the elapsed wall time in seconds once the body finishes.
+    """
+    elapsed: List[float] = []
+    start = time.perf_counter()
+
+    yield elapsed
+
+    elapsed.append(time.perf_counter() - start)
+
+
+def _run_ffmpeg(args: List[str]) -> None:
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y"] + args,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
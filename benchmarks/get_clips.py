@@ -0,0 +1,80 @@
+"""Compare get_clips with extracting each clip to its own file with export_clips.
+
+get_clips reads the clips straight from the match video with one ffmpeg process.
+export_clips runs one process per clip, single pass or a worker pool.
+
+Run with `python -m benchmarks.get_clips`. ffmpeg must be installed.
+"""
+
+import os
+import sys
+from statistics import median
+from tempfile import TemporaryDirectory
+
+import match_video as mv
+from benchmarks.common import synthetic_match, time_call
+
+CLIP_COUNTS = [10, 30, 60]
+MATCH_MINUTES = 20
+MAX_WORKERS = os.cpu_count() or 1
+
+
+def main():
+    """Time highlight reels of ten second clips spread over a synthetic match."""
+    clip_counts = [int(arg) for arg in sys.argv[1:]] or CLIP_COUNTS
+
+    print(
+        f"{'clips':>6} {'get_clips':>10} {'per clip':>10} {'single pass':>12}"
+        f" {f'{MAX_WORKERS} workers':>12}"
+    )
+
+    with TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "match.mp4")
+        synthetic_match(video_path, MATCH_MINUTES * 60)
+
+        for clip_count in clip_counts:
+            half_seconds = MATCH_MINUTES * 30
+            step = (half_seconds - 10) / clip_count
+            clip_clocks = [
+                {
+                    "period": 1,
+                    "start_clock": i * step,
+                    "end_clock": i * step + 10,
+                }
+                for i in range(clip_count)
+            ]
+            output_paths = [
+                os.path.join(directory, f"clip_{i}.mp4") for i in range(clip_count)
+            ]
+
+            get_clips_time = median(
+                time_call(lambda: mv.get_clips(video_path, clip_clocks))
+            )
+            per_clip_time = median(
+                time_call(
+                    lambda: mv.export_clips(video_path, clip_clocks, output_paths)
+                )
+            )
+            single_pass_time = median(
+                time_call(
+                    lambda: mv.export_clips(
+                        video_path, clip_clocks, output_paths, single_pass=True
+                    )
+                )
+            )
+            pool_time = median(
+                time_call(
+                    lambda: mv.export_clips(
+                        video_path, clip_clocks, output_paths, max_workers=MAX_WORKERS
+                    )
+                )
+            )
+
+            print(
+                f"{clip_count:>6} {get_clips_time:>8.3f} s {per_clip_time:>8.3f} s"
+                f" {single_pass_time:>10.3f} s {pool_time:>10.3f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
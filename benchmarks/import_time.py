@@ -0,0 +1,68 @@
+"""Time importing the package and starting the match-video command.
+
+Each measurement starts a fresh interpreter, as a shell loop over many videos would.
+Run with `python -m benchmarks.import_time`. ffmpeg is not needed, as anchors are
+read from a JSON sidecar file.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+from tempfile import TemporaryDirectory
+
+from benchmarks.common import time_call
+
+REPEAT = 10
+
+# the most milliseconds importing the package may take, however many names it
+# exports, which tests/test_launcher.py checks
+IMPORT_BUDGET_MS = 25
+
+
+def main():
+    """Time a bare interpreter, the package import and both read-anchors paths."""
+    with TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "match.mp4")
+        open(video_path, "wb").close()
+
+        with open(f"{video_path}.anchors.json", "w") as sidecar_file:
+            json.dump(
+                {"anchors": [{"period": 1, "clock": 0.0, "video_time": 0.0}]},
+                sidecar_file,
+            )
+
+        cases = [
+            ("python", "pass"),
+            ("import match_video", "import match_video"),
+            (
+                "read-anchors fast path",
+                "from match_video.launcher import main;"
+                f" main(['read-anchors', {video_path!r}, '--store', 'json'])",
+            ),
+            (
+                "read-anchors with Typer",
+                "from match_video.cli import app;"
+                f" app(['read-anchors', {video_path!r}, '--store', 'json'])",
+            ),
+        ]
+
+        for name, code in cases:
+            times = time_call(lambda: _run_python(code), repeat=REPEAT)
+            print(f"{name:<24} {median(times) * 1000:>8.1f} ms")
+
+    print(f"\nimport match_video budget: {IMPORT_BUDGET_MS} ms of import time")
+
+
+def _run_python(code: str) -> None:
+    subprocess.run(
+        [sys.executable, "-c", code],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
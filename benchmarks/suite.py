@@ -0,0 +1,258 @@
+"""Time anchor and clip operations on synthetic matches and save the results as JSON.
+
+Each measurement runs in a fresh worker process, so its peak RSS and the bytes it
+writes to disk, including those of the ffmpeg processes it starts, are its own.
+Resource usage is read with the resource module, so the suite runs on Unix only.
+
+Run with `python -m benchmarks.suite --output results.json`. Pass
+`--compare baseline.json` to print how each operation changed from an earlier run.
+ffmpeg must be installed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import median
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import match_video as mv
+from benchmarks.common import synthetic_match
+
+MATCH_MINUTES = [5, 45]
+BITRATES = ["1M", "4M"]
+CLIP_COUNTS = [1, 10, 30]
+REPEAT = 3
+
+# a worker's own usage, and that of the ffmpeg processes it waited for
+_RUSAGE_WHO = [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]
+
+# ru_oublock counts blocks of 512 bytes
+_BLOCK_BYTES = 512
+
+# ru_maxrss is in kilobytes on Linux and bytes on macOS
+_MAXRSS_BYTES = 1 if sys.platform == "darwin" else 1024
+
+
+def main():
+    """Run every operation across match lengths, bitrates and clip counts."""
+    args = _parse_args()
+    results = []
+
+    def record(
+        case: Dict,
+        operation: str,
+        clip_count: Optional[int],
+        function: Callable[..., None],
+        function_args: Tuple,
+    ) -> None:
+        result = dict(
+            case,
+            operation=operation,
+            clip_count=clip_count,
+            **_measure(function, function_args, args.repeat),
+        )
+        results.append(result)
+        _print_result(result)
+
+    with TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, "output.mp4")
+
+        for match_minutes in args.minutes:
+            for bitrate in args.bitrates:
+                video_path = os.path.join(directory, f"match_{match_minutes}.mp4")
+                synthetic_match(video_path, match_minutes * 60, bitrate=bitrate)
+                case = {"match_minutes": match_minutes, "bitrate": bitrate}
+
+                record(case, "read_anchors", None, _read_anchors, (video_path,))
+                record(
+                    case,
+                    "write_anchors",
+                    None,
+                    _write_anchors,
+                    (video_path, output_path),
+                )
+                record(case, "get_clip", 1, _get_clip, (video_path,))
+
+                for clip_count in args.clip_counts:
+                    record(
+                        case,
+                        "get_clips",
+                        clip_count,
+                        _get_clips,
+                        (video_path, match_minutes, clip_count),
+                    )
+
+                os.remove(video_path)
+
+    report = {"environment": _environment(), "results": results}
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            _print_comparison(json.load(baseline_file)["results"], results)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=int, nargs="+", default=MATCH_MINUTES)
+    parser.add_argument("--bitrates", nargs="+", default=BITRATES)
+    parser.add_argument("--clip-counts", type=int, nargs="+", default=CLIP_COUNTS)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", help="The path to save the results to as JSON.")
+    parser.add_argument("--compare", help="The path to earlier results to compare.")
+
+    return parser.parse_args()
+
+
+def _measure(function: Callable[..., None], args: Tuple, repeat: int) -> Dict:
+    """Measure repeated calls of a function, each in a fresh worker process.
+
+    Args:
+        function: A module level function to call with args.
+        args: The arguments for function.
+        repeat: The number of times to call the function.
+
+    Returns:
+        The median wall time in seconds, and the largest peak RSS and bytes written
+        of any call.
+    """
+    measurements = []
+
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            measurements.append(executor.submit(_run, function, args).result())
+
+    wall_times, peak_rss, bytes_written = zip(*measurements)
+
+    return {
+        "wall_seconds": median(wall_times),
+        "peak_rss_bytes": max(peak_rss),
+        "bytes_written": max(bytes_written),
+    }
+
+
+def _run(function: Callable[..., None], args: Tuple) -> Tuple[float, int, int]:
+    """Call a function in a worker process and measure it.
+
+    Args:
+        function: The function to call.
+        args: The arguments for function.
+
+    Returns:
+        The wall time of the call in seconds, the peak RSS of the worker or any of its
+        child processes in bytes, and the bytes they wrote to disk.
+    """
+    start_usage = [resource.getrusage(who) for who in _RUSAGE_WHO]
+    start = time.perf_counter()
+
+    function(*args)
+
+    wall_time = time.perf_counter() - start
+    end_usage = [resource.getrusage(who) for who in _RUSAGE_WHO]
+
+    peak_rss = max(usage.ru_maxrss for usage in end_usage) * _MAXRSS_BYTES
+    blocks_written = sum(
+        end.ru_oublock - start.ru_oublock for start, end in zip(start_usage, end_usage)
+    )
+
+    return wall_time, peak_rss, blocks_written * _BLOCK_BYTES
+
+
+def _read_anchors(video_path: str) -> None:
+    mv.clear_anchor_cache()
+    mv.read_anchors(video_path)
+
+
+def _write_anchors(video_path: str, output_path: str) -> None:
+    mv.write_anchors(video_path, output_path, mv.read_anchors(video_path))
+
+
+def _get_clip(video_path: str) -> None:
+    mv.get_clip(video_path, period=2, start_clock=0, end_clock=10)
+
+
+def _get_clips(video_path: str, match_minutes: int, clip_count: int) -> None:
+    step = (match_minutes * 30 - 10) / clip_count
+    clip_clocks = [
+        {"period": 1, "start_clock": i * step, "end_clock": i * step + 10}
+        for i in range(clip_count)
+    ]
+
+    mv.get_clips(video_path, clip_clocks)
+
+
+def _result_key(result: Dict) -> Tuple:
+    return (
+        result["operation"],
+        result["match_minutes"],
+        result["bitrate"],
+        result["clip_count"],
+    )
+
+
+def _print_result(result: Dict) -> None:
+    clip_count = "" if result["clip_count"] is None else result["clip_count"]
+
+    print(
+        f"{result['operation']:<14} {result['match_minutes']:>4} m"
+        f" {result['bitrate']:>4} {clip_count:>4}"
+        f" {result['wall_seconds']:>8.3f} s"
+        f" {result['peak_rss_bytes'] / 1e6:>7.1f} MB RSS"
+        f" {result['bytes_written'] / 1e6:>8.1f} MB written"
+    )
+
+
+def _print_comparison(baseline: List[Dict], results: List[Dict]) -> None:
+    """Print the change in wall time of each operation from a baseline run.
+
+    Args:
+        baseline: The results of an earlier run.
+        results: The results of this run.
+    """
+    baseline_times = {
+        _result_key(result): result["wall_seconds"] for result in baseline
+    }
+
+    print("\nChange in wall time from the baseline:")
+
+    for result in results:
+        baseline_time = baseline_times.get(_result_key(result))
+
+        if not baseline_time:
+            continue
+
+        change = result["wall_seconds"] / baseline_time - 1
+        operation, match_minutes, bitrate, clip_count = _result_key(result)
+        clip_count = "" if clip_count is None else clip_count
+
+        print(
+            f"{operation:<14} {match_minutes:>4} m {bitrate:>4} {clip_count:>4}"
+            f" {change:>+8.1%}"
+        )
+
+
+def _environment() -> Dict:
+    ffmpeg_version = subprocess.run(
+        ["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    ).stdout.decode()
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "ffmpeg": ffmpeg_version.splitlines()[0] if ffmpeg_version else None,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare updating anchors in place with the old remux and copy back.
+
+Both include flushing their writes to disk, as the copy back wrote the whole video a
+second time.
+
+Run with `python -m benchmarks.write_anchors`. ffmpeg must be installed.
+"""
+
+import os
+import shutil
+import sys
+from statistics import median
+from tempfile import TemporaryDirectory
+
+import match_video as mv
+from benchmarks.common import synthetic_match, time_call, timer
+from match_video.anchor import Anchor
+
+MATCH_MINUTES = [15, 45, 90]
+
+
+def main():
+    """Time in-place anchor updates on synthetic matches of increasing length."""
+    minutes = [int(arg) for arg in sys.argv[1:]] or MATCH_MINUTES
+
+    print(f"{'match':>8} {'size':>10} {'in place':>10} {'remux + copy':>13}")
+
+    with TemporaryDirectory() as directory:
+        for match_minutes in minutes:
+            video_path = os.path.join(directory, f"match_{match_minutes}.mp4")
+            synthetic_match(video_path, match_minutes * 60, bitrate="4M")
+
+            anchors = [Anchor(1, 0.0, 0.0), Anchor(2, 0.0, match_minutes * 30.0)]
+
+            def write_inplace():
+                mv.write_anchors(video_path, video_path, anchors)
+                os.sync()
+
+            inplace_times = time_call(write_inplace)
+
+            # the old update remuxed to a temporary file then copied it back
+            remux_path = os.path.join(directory, "remux.mp4")
+            with timer() as copy_time:
+                mv.write_anchors(video_path, remux_path, anchors)
+                shutil.copy2(remux_path, video_path)
+                os.sync()
+            os.remove(remux_path)
+
+            size_mb = os.path.getsize(video_path) / 1e6
+            print(
+                f"{match_minutes:>6} m {size_mb:>7.0f} MB"
+                f" {median(inplace_times):>8.3f} s {copy_time[0]:>11.3f} s"
+            )
+
+            os.remove(video_path)
+
+
+if __name__ == "__main__":
+    main()
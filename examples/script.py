@@ -8,10 +8,9 @@ def main():
     video_path = sys.argv[1]
 
     print("Getting match kickoff...")
-    clip = mv.get_clip(video_path, period=1, start_clock=0, end_clock=60)
-
-    with open("kickoff.mp4", "wb") as clip_file:
-        clip_file.write(clip)
+    mv.write_clip(
+        video_path, period=1, start_clock=0, end_clock=60, output="kickoff.mp4"
+    )
 
     print("Kickoff saved as kickoff.mp4!")
 
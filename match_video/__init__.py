@@ -1,10 +1,97 @@
-from match_video.anchor import Anchor
-from match_video.utils import get_clip, get_clips, read_anchors, write_anchors
-
-__all__ = [
-    "Anchor",
-    "write_anchors",
-    "read_anchors",
-    "get_clip",
-    "get_clips",
-]
+"""Work with video from soccer matches.
+
+The names exported here are imported from their submodules the first time they are
+used, so importing the package is fast. Command line tools that only read anchors
+don't pay for asyncio, sqlite3 or the HTTP server.
+"""
+
+import sys
+from importlib import import_module
+from types import ModuleType
+
+# the submodule each exported name is imported from
+_EXPORTS = {
+    "Anchor": "match_video.anchor",
+    "AnchorTimeline": "match_video.anchor",
+    "write_anchors": "match_video.utils",
+    "read_anchors": "match_video.utils",
+    "get_clip": "match_video.utils",
+    "get_clips": "match_video.utils",
+    "export_clips": "match_video.utils",
+    "write_clip": "match_video.utils",
+    "write_clips": "match_video.utils",
+    "stream_clip": "match_video.utils",
+    "stream_clips": "match_video.utils",
+    "write_hls": "match_video.utils",
+    "anchor_cache_info": "match_video.utils",
+    "clear_anchor_cache": "match_video.utils",
+    "awrite_anchors": "match_video.aio",
+    "aread_anchors": "match_video.aio",
+    "aget_clip": "match_video.aio",
+    "aget_clips": "match_video.aio",
+    "read_manifest": "match_video.batch",
+    "set_half_starts": "match_video.batch",
+    "scan_videos": "match_video.batch",
+    "check_anchors": "match_video.batch",
+    "write_scan_report": "match_video.batch",
+    "read_scan_report": "match_video.batch",
+    "AnchorStore": "match_video.stores",
+    "ChapterStore": "match_video.stores",
+    "JSONSidecarStore": "match_video.stores",
+    "SQLiteStore": "match_video.stores",
+    "get_default_store": "match_video.stores",
+    "set_default_store": "match_video.stores",
+    "migrate_anchors": "match_video.stores",
+    "merge_clip_clocks": "match_video.utils",
+    "coalesce_clip_clocks": "match_video.utils",
+    "ClipCache": "match_video.cache",
+    "Event": "match_video.highlights",
+    "read_events": "match_video.highlights",
+    "highlight_clip_clocks": "match_video.highlights",
+    "get_highlights": "match_video.highlights",
+    "write_highlights": "match_video.highlights",
+    "Whistle": "match_video.detect",
+    "detect_whistles": "match_video.detect",
+    "half_starts_from_whistles": "match_video.detect",
+    "detect_half_starts": "match_video.detect",
+    "ClockReading": "match_video.ocr",
+    "read_match_clock": "match_video.ocr",
+    "parse_clock": "match_video.ocr",
+    "clock_anchors": "match_video.ocr",
+    "detect_clock_anchors": "match_video.ocr",
+    "CommandRecord": "match_video.commands",
+    "StageMetrics": "match_video.commands",
+    "add_command_hook": "match_video.commands",
+    "remove_command_hook": "match_video.commands",
+    "command_metrics": "match_video.commands",
+    "reset_command_metrics": "match_video.commands",
+    "CompilationClip": "match_video.compilation",
+    "get_compilation": "match_video.compilation",
+    "write_compilation": "match_video.compilation",
+    "read_stream_parameters": "match_video.compilation",
+}
+
+__all__ = list(_EXPORTS)
+
+
+class _LazyModule(ModuleType):
+    """The package module, which imports exported names when they are first used.
+
+    Module level __getattr__ needs Python 3.7, so the package's class is swapped for
+    this one instead.
+    """
+
+    def __getattr__(self, name: str):
+        if name not in _EXPORTS:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+
+        value = getattr(import_module(_EXPORTS[name]), name)
+        setattr(self, name, value)
+
+        return value
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(_EXPORTS))
+
+
+sys.modules[__name__].__class__ = _LazyModule
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import time
+from tempfile import NamedTemporaryFile
+from typing import List, Optional, Sequence
+
+import match_video.commands as commands
+import match_video.utils as utils
+from match_video.anchor import Anchor
+from match_video.stores import AnchorStore, ChapterStore, get_default_store
+
+
+async def awrite_anchors(
+    input_video_path: str,
+    output_video_path: str,
+    anchors: List[Anchor],
+    store: Optional[AnchorStore] = None,
+) -> None:
+    """Write anchors to a video file without blocking the event loop.
+
+    This is the asyncio version of write_anchors. ffmpeg is killed if the task is
+    cancelled. Stores other than chapters are written in a worker thread. Like
+    write_anchors, a ValueError is raised if ffmpeg fails, and a video being updated
+    in place is left untouched.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_path: The path to write the video with anchors to.
+        anchors: A list of anchors specifying the start of each half and any
+            discontinuities in the video.
+        store: Where to keep the anchors. Defaults to the store from
+            get_default_store.
+    """
+    if store is None:
+        store = get_default_store()
+
+    if not isinstance(store, ChapterStore):
+        await asyncio.get_event_loop().run_in_executor(
+            None, store.write, input_video_path, output_video_path, anchors
+        )
+        return
+
+    existing_metadata: str
+
+    with NamedTemporaryFile("r") as existing_metadata_file:
+        await _run(
+            utils._read_metadata_command(input_video_path, existing_metadata_file.name),
+            "read_metadata",
+            [existing_metadata_file.name],
+            check=True,
+        )
+
+        existing_metadata_file.seek(0)
+        existing_metadata = existing_metadata_file.read()
+
+    updated_metadata = utils._metadata_with_anchors(existing_metadata, anchors)
+
+    with NamedTemporaryFile("w") as updated_metadata_file:
+        updated_metadata_file.write(updated_metadata)
+        updated_metadata_file.seek(0)
+
+        async def write_video_with_metadata(path: str) -> None:
+            await _run(
+                utils._write_metadata_command(
+                    input_video_path, updated_metadata_file.name, path
+                ),
+                "write_anchors",
+                [path],
+                check=True,
+            )
+
+        if utils._is_same_video(input_video_path, output_video_path):
+            with utils._replacement_video(output_video_path) as replacement_path:
+                await write_video_with_metadata(replacement_path)
+        else:
+            await write_video_with_metadata(output_video_path)
+
+    utils._forget_anchors(output_video_path)
+
+
+async def aread_anchors(
+    video_path: str, store: Optional[AnchorStore] = None
+) -> List[Anchor]:
+    """Read the anchor points from a video file without blocking the event loop.
+
+    This is the asyncio version of read_anchors, and shares its cache. Stores other
+    than chapters are read in a worker thread.
+
+    Args:
+        video_path: The path to a video.
+        store: Where the anchors are kept. Defaults to the store from
+            get_default_store.
+
+    Returns:
+        The list of anchors set for the video.
+
+    Raises:
+        ValueError: The video's metadata could not be read.
+    """
+    if store is None:
+        store = get_default_store()
+
+    if not isinstance(store, ChapterStore):
+        return await asyncio.get_event_loop().run_in_executor(
+            None, store.read, video_path
+        )
+
+    cache_key = utils._anchor_cache_key(video_path)
+
+    if cache_key is not None:
+        cached_anchors = utils._anchor_cache.get(cache_key)
+
+        if cached_anchors is not None:
+            return list(cached_anchors)
+
+    result = json.loads(
+        await _run(utils._read_anchors_command(video_path), "read_anchors")
+    )
+
+    if "error" in result:
+        raise ValueError(
+            f"Unable to read the metadata for {video_path}, {result['error']['string']}"
+        )
+
+    anchors = utils._chapters_to_anchors(result["chapters"])
+
+    if cache_key is not None:
+        utils._anchor_cache.put(cache_key, tuple(anchors))
+
+    return anchors
+
+
+async def aget_clip(
+    video_path: str, period: int, start_clock: float, end_clock: float
+) -> bytes:
+    """Get a clip from a match by period and clock without blocking the event loop.
+
+    This is the asyncio version of get_clip. ffmpeg is killed if the task is
+    cancelled.
+
+    Args:
+        video_path: The path to a video.
+        period: The period of the match the clip is in.
+        start_clock: The start of the clip in seconds since the start of the period.
+        end_clock: The end of the clip in seconds since the start of the period.
+
+    Returns:
+        The video clip as bytes.
+
+    Raises:
+        ValueError: The video does not have anchors, the clips is before the first
+            anchor in its period, or ffmpeg failed to extract it.
+    """
+    anchors = await aread_anchors(video_path)
+
+    if len(anchors) == 0:
+        raise ValueError(f"{video_path} has no set anchors")
+
+    video_times = utils._get_video_times(anchors, period, start_clock, end_clock)
+
+    with NamedTemporaryFile("rb", suffix=".mp4") as clip_file:
+        await _run(
+            utils._extract_clips_command(video_path, [clip_file.name], [video_times]),
+            "extract_clip",
+            [clip_file.name],
+            check=True,
+        )
+
+        return await _read_file(clip_file)
+
+
+async def aget_clips(
+    video_path: str,
+    clip_clocks: List[dict],
+    merge_gap: Optional[float] = None,
+) -> bytes:
+    """Get clips from a match by period and clock without blocking the event loop.
+
+    This is the asyncio version of get_clips. ffmpeg is killed if the task is
+    cancelled.
+
+    Args:
+        video_path: The path to a video.
+        clip_clocks: A list of clips to select and stitch together, as with
+            get_clips.
+        merge_gap: Merge clips that are close together, as with get_clips.
+
+    Returns:
+        The video clips as bytes.
+
+    Raises:
+        ValueError: The video does not have anchors, one of the clips is before the
+            first anchor in its period, or ffmpeg failed to extract the clips.
+    """
+    anchors = await aread_anchors(video_path)
+
+    if len(anchors) == 0:
+        raise ValueError(f"{video_path} has no set anchors")
+
+    clip_clocks = utils._merged_clip_clocks(clip_clocks, merge_gap)
+    video_times = utils._get_clip_video_times(anchors, clip_clocks)
+
+    with utils._source_concat_list(video_path, video_times) as concat_list_path:
+        with NamedTemporaryFile("rb", suffix=".mp4") as clips_file:
+            await _run(
+                utils._concat_command(concat_list_path, clips_file.name),
+                "concat",
+                [clips_file.name],
+                check=True,
+            )
+
+            return await _read_file(clips_file)
+
+
+async def _run(
+    command: List[str],
+    stage: str,
+    output_paths: Sequence[str] = (),
+    check: bool = False,
+) -> bytes:
+    """Run a command as an asyncio subprocess, killing it if the task is cancelled.
+
+    The command is recorded like those run by commands.run_command, unless it is
+    killed.
+
+    Args:
+        command: The command to run.
+        stage: The name the command is recorded under.
+        output_paths: The files the command writes, whose sizes are recorded.
+        check: Raise a ValueError if the command fails.
+
+    Returns:
+        The command's stdout.
+
+    Raises:
+        ValueError: check is True and the command exited with a non-zero status.
+    """
+    start_time = time.time()
+    start = time.perf_counter()
+
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    try:
+        stdout, stderr = await process.communicate()
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    # the process has exited, so this returns its exit status straight away
+    returncode = await process.wait()
+
+    commands.record_command(
+        stage,
+        command,
+        start_time,
+        time.perf_counter() - start,
+        returncode,
+        commands._output_bytes(stdout, output_paths),
+        stderr,
+    )
+
+    if check and returncode != 0:
+        raise ValueError(f"{stage} failed with exit status {returncode}")
+
+    return stdout
+
+
+async def _read_file(file) -> bytes:
+    """Read a file in a worker thread so large clips don't block the event loop.
+
+    Args:
+        file: A binary file object.
+
+    Returns:
+        The file's contents.
+    """
+    return await asyncio.get_event_loop().run_in_executor(None, file.read)
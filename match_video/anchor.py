@@ -1,3 +1,97 @@
+from bisect import bisect_right
 from collections import namedtuple
+from operator import attrgetter
+from typing import Dict, Iterable, List, Tuple
 
 Anchor = namedtuple("Anchor", ["period", "clock", "video_time"])
+
+# the match minute the clock reads at the start of each period: the two halves, the
+# two halves of extra time, then penalties
+PERIOD_START_MINUTES = {1: 0, 2: 45, 3: 90, 4: 105, 5: 120}
+
+# penalties are taken without a running clock
+PENALTIES_PERIOD = 5
+
+
+class AnchorTimeline:
+    """Convert match clocks to video times with a binary search of the anchors.
+
+    Each period's anchors are sorted by clock once, so looking up a clock takes
+    logarithmic time in the number of anchors instead of a scan of every anchor.
+
+    Args:
+        anchors: A video's anchors.
+    """
+
+    def __init__(self, anchors: Iterable[Anchor]):
+        self._clocks: Dict[int, List[float]] = {}
+        self._video_times: Dict[int, List[float]] = {}
+
+        # a stable sort, so the last of several anchors at the same clock wins
+        for anchor in sorted(anchors, key=attrgetter("clock")):
+            self._clocks.setdefault(anchor.period, []).append(anchor.clock)
+            self._video_times.setdefault(anchor.period, []).append(anchor.video_time)
+
+    def video_time(self, period: int, clock: float) -> float:
+        """Convert a period and match clock into a video time.
+
+        Args:
+            period: The period of the match.
+            clock: A time since the start of the period.
+
+        Returns:
+            The video time that corresponds to clock, measured from the last anchor in
+            the period at or before clock.
+
+        Raises:
+            ValueError: There are no anchors in the period before clock.
+        """
+        clocks = self._clocks.get(period, [])
+        index = bisect_right(clocks, clock) - 1
+
+        if index < 0:
+            minute = int(clock / 60)
+            second = int(clock % 60)
+
+            raise ValueError(
+                f"No anchors set in period {period} before {minute}:{second:02}"
+            )
+
+        return self._video_times[period][index] + (clock - clocks[index])
+
+    def video_times(
+        self, periods: Iterable[int], clocks: Iterable[float]
+    ) -> List[float]:
+        """Convert many periods and match clocks into video times in one call.
+
+        Args:
+            periods: The period of each clock.
+            clocks: Times since the start of their periods.
+
+        Returns:
+            The video time that corresponds to each clock.
+        """
+        return [
+            self.video_time(period, clock) for period, clock in zip(periods, clocks)
+        ]
+
+    def clip_video_times(
+        self, period: int, start_clock: float, end_clock: float
+    ) -> Tuple[float, float]:
+        """Convert the start and end clocks of a clip into video times.
+
+        The end is measured from the same anchor as the start, so a clip plays
+        straight through any discontinuity after it starts.
+
+        Args:
+            period: The period of the match the clip is in.
+            start_clock: The start of the clip in seconds since the start of the period.
+            end_clock: The end of the clip in seconds since the start of the period.
+
+        Returns:
+            A pair, (start_video_time, end_video_time), that correspond to start_clock
+            and end_clock in video time.
+        """
+        start_video_time = self.video_time(period, start_clock)
+
+        return start_video_time, start_video_time + (end_clock - start_clock)
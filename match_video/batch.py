@@ -0,0 +1,441 @@
+import csv
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, TextIO, Union
+
+import match_video.utils as utils
+from match_video.anchor import Anchor
+from match_video.stores import AnchorStore, _anchors_from_json, _anchors_to_json
+
+HalfStarts = namedtuple(
+    "HalfStarts",
+    [
+        "input_video_path",
+        "first_half_start_time",
+        "second_half_start_time",
+        "output_video_path",
+    ],
+)
+
+BatchResult = namedtuple("BatchResult", ["input_video_path", "error"])
+ScanResult = namedtuple(
+    "ScanResult",
+    ["video_path", "size", "modified_time", "status", "anchors", "problems"],
+)
+
+_SCAN_REPORT_FORMATS = ["jsonl", "csv"]
+
+
+def read_manifest(manifest_path: str) -> List[HalfStarts]:
+    """Read a manifest of half start times for many match videos.
+
+    The manifest is a CSV file with a header row, or a JSON file with a list of
+    objects. Each row or object has input_video_path, first_half_start_time and
+    second_half_start_time, and optionally output_video_path. Start times are mm:ss
+    strings or seconds. Relative video paths are relative to the manifest.
+
+    Args:
+        manifest_path: The path to a .csv or .json manifest.
+
+    Returns:
+        The half start times for each video in the manifest.
+
+    Raises:
+        ValueError: The manifest is not a CSV or JSON file, or a row is missing a
+            required column.
+    """
+    with open(manifest_path, newline="") as manifest_file:
+        if manifest_path.lower().endswith(".json"):
+            rows = json.load(manifest_file)
+        elif manifest_path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(manifest_file))
+        else:
+            raise ValueError(f"{manifest_path} is not a .csv or .json manifest")
+
+    manifest_directory = os.path.dirname(os.path.abspath(manifest_path))
+
+    def resolve(path: Optional[str]) -> Optional[str]:
+        return os.path.join(manifest_directory, path) if path else None
+
+    manifest = []
+
+    for line, row in enumerate(rows, start=1):
+        missing = [
+            column for column in HalfStarts._fields[:3] if row.get(column) in (None, "")
+        ]
+
+        if len(missing) > 0:
+            raise ValueError(
+                f"Entry {line} of {manifest_path} is missing {', '.join(missing)}"
+            )
+
+        manifest.append(
+            HalfStarts(
+                resolve(row["input_video_path"]),
+                row["first_half_start_time"],
+                row["second_half_start_time"],
+                resolve(row.get("output_video_path")),
+            )
+        )
+
+    return manifest
+
+
+def set_half_starts(
+    manifest: List[HalfStarts],
+    max_workers: int = 1,
+    progress: Optional[Callable[[int, int, BatchResult], None]] = None,
+    store: Optional[AnchorStore] = None,
+) -> List[BatchResult]:
+    """Write half start anchors to many match videos.
+
+    A failure for one video is recorded in its result and does not stop the others.
+
+    Args:
+        manifest: The half start times for each video, e.g. from read_manifest.
+        max_workers: The most videos to write at once.
+        progress: A function called as each video finishes with the number of videos
+            finished, the total number of videos and the video's result.
+        store: Where to keep the anchors. Defaults to the store from
+            get_default_store.
+
+    Returns:
+        A result for each video in manifest order. The error is None if the anchors
+        were written, otherwise a description of what went wrong.
+    """
+    results: Dict[int, BatchResult] = {}
+
+    def write(half_starts: HalfStarts) -> BatchResult:
+        try:
+            if not os.path.exists(half_starts.input_video_path):
+                raise FileNotFoundError(f"{half_starts.input_video_path} not found")
+
+            anchors = half_start_anchors(
+                half_starts.first_half_start_time, half_starts.second_half_start_time
+            )
+            utils.write_anchors(
+                half_starts.input_video_path,
+                half_starts.output_video_path or half_starts.input_video_path,
+                anchors,
+                store=store,
+            )
+        except Exception as error:
+            return BatchResult(half_starts.input_video_path, str(error))
+
+        return BatchResult(half_starts.input_video_path, None)
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        futures = {
+            executor.submit(write, half_starts): index
+            for index, half_starts in enumerate(manifest)
+        }
+
+        for finished, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results[futures[future]] = result
+
+            if progress is not None:
+                progress(finished, len(manifest), result)
+
+    return [results[index] for index in range(len(manifest))]
+
+
+def half_start_anchors(
+    first_half_start_time: Union[str, float], second_half_start_time: Union[str, float]
+) -> List[Anchor]:
+    """Get the anchors for the start of each half of a match.
+
+    Args:
+        first_half_start_time: The start of the first half as mm:ss or seconds in
+            video time.
+        second_half_start_time: The start of the second half as mm:ss or seconds in
+            video time.
+
+    Returns:
+        An anchor at 0:00 on the clock for each half.
+    """
+    return [
+        Anchor(1, 0.0, parse_video_time(first_half_start_time)),
+        Anchor(2, 0.0, parse_video_time(second_half_start_time)),
+    ]
+
+
+def parse_video_time(video_time: Union[str, float]) -> float:
+    """Convert a video time given as mm:ss or seconds to seconds.
+
+    Args:
+        video_time: A video time as mm:ss, or a number of seconds.
+
+    Returns:
+        The video time in seconds.
+
+    Raises:
+        ValueError: The video time is not mm:ss or a number.
+    """
+    if isinstance(video_time, (int, float)):
+        return float(video_time)
+
+    if ":" not in video_time:
+        return float(video_time)
+
+    video_minutes, _, video_seconds = video_time.partition(":")
+
+    try:
+        return int(video_minutes) * 60 + float(video_seconds)
+    except ValueError:
+        raise ValueError(f"{video_time} is not a time as mm:ss") from None
+
+
+def scan_videos(
+    video_root: str,
+    max_workers: int = 1,
+    store: Optional[AnchorStore] = None,
+    previous: Optional[List[ScanResult]] = None,
+    min_periods: int = 2,
+    extensions: Sequence[str] = (".mp4",),
+    progress: Optional[Callable[[int, int, ScanResult], None]] = None,
+) -> List[ScanResult]:
+    """Read and check the anchors of every video under a directory.
+
+    Anchors are read by a pool of workers, so at most max_workers ffprobe processes
+    run at once. A video whose size and modification time match its result in
+    previous is not read again, so a scan of a large library only reads the videos
+    added or changed since the last scan. Anchors kept in a JSON or SQLite store can
+    change without the video changing, so only pass previous with the chapters store.
+
+    Args:
+        video_root: The directory to scan. Hidden files are skipped.
+        max_workers: The most videos to read anchors from at once.
+        store: Where the anchors are kept. Defaults to the store from
+            get_default_store.
+        previous: The results of an earlier scan, e.g. from read_scan_report.
+        min_periods: The number of periods every video should have anchors for.
+        extensions: The file extensions of the videos to scan.
+        progress: A function called as each video finishes with the number of videos
+            finished, the total number of videos and the video's result.
+
+    Returns:
+        A result for each video sorted by path. The status is ok, missing if the
+        video has no anchors, inconsistent if check_anchors found problems, or error
+        if the anchors could not be read, with the reason in problems.
+    """
+    video_paths = _find_videos(video_root, extensions)
+    previous_results = {result.video_path: result for result in previous or []}
+    results: Dict[int, ScanResult] = {}
+
+    def scan(video_path: str) -> ScanResult:
+        try:
+            stat = os.stat(video_path)
+        except OSError as error:
+            return ScanResult(video_path, None, None, "error", [], [str(error)])
+
+        earlier = previous_results.get(video_path)
+
+        if (
+            earlier is not None
+            and earlier.status != "error"
+            and (earlier.size, earlier.modified_time)
+            == (stat.st_size, stat.st_mtime_ns)
+        ):
+            return earlier
+
+        try:
+            anchors = utils.read_anchors(video_path, store=store)
+        except Exception as error:
+            return ScanResult(
+                video_path, stat.st_size, stat.st_mtime_ns, "error", [], [str(error)]
+            )
+
+        problems = check_anchors(anchors, min_periods)
+
+        if len(anchors) == 0:
+            status = "missing"
+        elif len(problems) > 0:
+            status = "inconsistent"
+        else:
+            status = "ok"
+
+        return ScanResult(
+            video_path, stat.st_size, stat.st_mtime_ns, status, anchors, problems
+        )
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        futures = {
+            executor.submit(scan, video_path): index
+            for index, video_path in enumerate(video_paths)
+        }
+
+        for finished, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results[futures[future]] = result
+
+            if progress is not None:
+                progress(finished, len(video_paths), result)
+
+    return [results[index] for index in range(len(video_paths))]
+
+
+def check_anchors(anchors: List[Anchor], min_periods: int = 2) -> List[str]:
+    """Find problems with the anchors set for a video.
+
+    Args:
+        anchors: The anchors set for a video.
+        min_periods: The number of periods the video should have anchors for.
+
+    Returns:
+        A description of each problem, which is empty if the anchors are consistent.
+    """
+    if len(anchors) == 0:
+        return ["No anchors set"]
+
+    problems = []
+    periods = sorted({anchor.period for anchor in anchors})
+    expected_periods = list(range(1, max(periods[-1], min_periods) + 1))
+    missing_periods = [period for period in expected_periods if period not in periods]
+
+    if len(missing_periods) > 0:
+        problems.append(
+            f"No anchors for period {', '.join(str(p) for p in missing_periods)}"
+        )
+
+    for anchor in anchors:
+        if anchor.clock < 0 or anchor.video_time < 0:
+            problems.append(
+                f"Period {anchor.period} anchor at {anchor.video_time:.2f}s is negative"
+            )
+
+    ordered = sorted(anchors, key=lambda anchor: anchor.video_time)
+
+    for earlier, later in zip(ordered, ordered[1:]):
+        if later.video_time == earlier.video_time:
+            problems.append(f"Several anchors at {later.video_time:.2f}s")
+        elif later.period < earlier.period:
+            problems.append(
+                f"Period {later.period} anchor at {later.video_time:.2f}s is after"
+                f" period {earlier.period}"
+            )
+        elif later.period == earlier.period and later.clock < earlier.clock:
+            problems.append(
+                f"Period {later.period} clock goes back from {earlier.clock:.2f}s to"
+                f" {later.clock:.2f}s at {later.video_time:.2f}s"
+            )
+
+    return problems
+
+
+def write_scan_report(
+    results: List[ScanResult],
+    output: Union[str, TextIO],
+    report_format: Optional[str] = None,
+) -> None:
+    """Write the results of a scan as JSON lines or CSV.
+
+    Each line or row has the video_path, size, modified_time, status, anchors and
+    problems of a video. In CSV the anchors are a JSON list and the problems are
+    separated by semicolons.
+
+    Args:
+        results: The results of a scan.
+        output: A path to write the report to, or a text file object to write it to.
+        report_format: jsonl or csv. Defaults to csv for paths ending in .csv and
+            jsonl otherwise.
+
+    Raises:
+        ValueError: The report format is not jsonl or csv.
+    """
+    if isinstance(output, str):
+        with open(output, "w", newline="") as output_file:
+            write_scan_report(
+                results, output_file, report_format or _report_format(output)
+            )
+
+        return
+
+    report_format = report_format or "jsonl"
+
+    if report_format not in _SCAN_REPORT_FORMATS:
+        raise ValueError(f"{report_format} is not jsonl or csv")
+
+    if report_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=ScanResult._fields)
+        writer.writeheader()
+
+        for result in results:
+            writer.writerow(
+                dict(
+                    result._asdict(),
+                    anchors=json.dumps(_anchors_to_json(result.anchors)),
+                    problems="; ".join(result.problems),
+                )
+            )
+    else:
+        for result in results:
+            row = dict(result._asdict(), anchors=_anchors_to_json(result.anchors))
+            output.write(json.dumps(row) + "\n")
+
+
+def read_scan_report(report_path: str) -> List[ScanResult]:
+    """Read a report written by write_scan_report, e.g. to pass to scan_videos.
+
+    Args:
+        report_path: The path to a .csv or JSON lines report.
+
+    Returns:
+        The results of the scan.
+    """
+    with open(report_path, newline="") as report_file:
+        if _report_format(report_path) == "csv":
+            return [
+                ScanResult(
+                    row["video_path"],
+                    int(row["size"]) if row["size"] else None,
+                    int(row["modified_time"]) if row["modified_time"] else None,
+                    row["status"],
+                    _anchors_from_json(json.loads(row["anchors"])),
+                    row["problems"].split("; ") if row["problems"] else [],
+                )
+                for row in csv.DictReader(report_file)
+            ]
+
+        results = []
+
+        for line in report_file:
+            if line.strip() == "":
+                continue
+
+            row = json.loads(line)
+            results.append(
+                ScanResult(**dict(row, anchors=_anchors_from_json(row["anchors"])))
+            )
+
+        return results
+
+
+def _find_videos(video_root: str, extensions: Sequence[str]) -> List[str]:
+    """Find the videos under a directory.
+
+    Hidden files, such as new versions of videos that are still being written, are
+    skipped.
+
+    Args:
+        video_root: The directory to search.
+        extensions: The file extensions of videos.
+
+    Returns:
+        The paths of the videos, sorted.
+    """
+    extensions = tuple(extension.lower() for extension in extensions)
+    video_paths = []
+
+    for directory, _, file_names in os.walk(video_root):
+        for file_name in file_names:
+            if not file_name.startswith(".") and file_name.lower().endswith(extensions):
+                video_paths.append(os.path.join(directory, file_name))
+
+    return sorted(video_paths)
+
+
+def _report_format(report_path: str) -> str:
+    return "csv" if report_path.lower().endswith(".csv") else "jsonl"
@@ -0,0 +1,357 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from tempfile import NamedTemporaryFile
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 10 * 1024**3
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class LRUCache:
+    """A thread-safe in-memory cache that keeps its most recently used entries.
+
+    Args:
+        maxsize: The number of entries to keep.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Look up an entry and count the lookup as a hit or miss.
+
+        Args:
+            key: The key of the entry.
+
+        Returns:
+            The cached value, or None if there is no entry for key.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Add an entry, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: The key of the entry.
+            value: The value to cache.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, predicate: Callable[[Any], bool]) -> None:
+        """Remove the entries whose keys match a predicate.
+
+        Args:
+            predicate: A function that returns True for the keys to remove.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Remove every entry and reset the hit and miss counts."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self) -> CacheInfo:
+        """Get the cache's statistics.
+
+        Returns:
+            The hit and miss counts, maximum size and current size of the cache.
+        """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._entries))
+
+
+class VideoCache:
+    """A directory of files derived from match videos, shared across processes.
+
+    Each cached file belongs to a version of a video, identified by the video's path,
+    size and modification time. Editing or replacing a video makes its old entries
+    unreachable, and they are evicted with the least recently used entries once the
+    cache grows beyond max_bytes.
+
+    A cached file's modification time is when it was created and its access time is
+    when it was last used, which the cache sets itself.
+
+    Args:
+        directory: The directory to keep cached files in. Defaults to the
+            MATCH_VIDEO_CACHE_DIR environment variable, or ~/.cache/match-video.
+        max_bytes: The size the cache is trimmed to after each new entry.
+        ttl: The seconds a cached file is used for after it is created. Files are
+            kept until they are evicted if this is None.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: Optional[float] = None,
+    ):
+        if directory is None:
+            directory = default_cache_directory()
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def path(self, video_path: str, name: str) -> str:
+        """Get the cache path of a file derived from the current version of a video.
+
+        Args:
+            video_path: The path to a video.
+            name: The name of the derived file, e.g. keyframes.json.
+
+        Returns:
+            The path the derived file is cached at. The file may not exist yet.
+        """
+        return os.path.join(self.directory, f"{video_key(video_path)}-{name}")
+
+    def get(self, video_path: str, name: str) -> Optional[str]:
+        """Look up a file derived from the current version of a video.
+
+        Args:
+            video_path: The path to a video.
+            name: The name of the derived file.
+
+        Returns:
+            The path to the cached file, or None if it has not been cached.
+        """
+        path = self.path(video_path, name)
+
+        try:
+            stat = os.stat(path)
+
+            if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+
+            # mark the entry as recently used, keeping when it was created
+            os.utime(path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+
+        return path
+
+    def get_or_create(
+        self, video_path: str, name: str, create: Callable[[str], None]
+    ) -> str:
+        """Look up a file derived from a video, creating it if it is not cached.
+
+        The file is created under a temporary name and renamed into place, so
+        concurrent processes never see a partially written entry. Nothing is cached if
+        create raises or writes an empty file.
+
+        Args:
+            video_path: The path to a video.
+            name: The name of the derived file.
+            create: A function that writes the derived file to the path it is given.
+
+        Returns:
+            The path to the cached file.
+
+        Raises:
+            ValueError: create wrote an empty file.
+        """
+        path = self.get(video_path, name)
+
+        if path is not None:
+            return path
+
+        path = self.path(video_path, name)
+        os.makedirs(self.directory, exist_ok=True)
+
+        with NamedTemporaryFile(
+            dir=self.directory, prefix=".", suffix=f"-{name}", delete=False
+        ) as temp_file:
+            temp_path = temp_file.name
+
+        try:
+            create(temp_path)
+
+            if os.path.getsize(temp_path) == 0:
+                raise ValueError(f"Nothing was written for {name} of {video_path}")
+
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.evict()
+
+        return path
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in max_bytes."""
+        entries = self._entries()
+        size = sum(entry_size for _, _, entry_size in entries)
+
+        for _, path, entry_size in sorted(entries):
+            if size <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # another process evicted it first
+                pass
+
+            size -= entry_size
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def info(self) -> CacheInfo:
+        """Get the cache's statistics.
+
+        Returns:
+            The hit and miss counts of this cache object, with the maximum size and
+            current size of the cache directory in bytes.
+        """
+        size = sum(entry_size for _, _, entry_size in self._entries())
+
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.max_bytes, size)
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def _entries(self) -> List[Tuple[float, str, int]]:
+        """List the cached files.
+
+        Returns:
+            A list of (last_used, path, size) for each cached file.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+
+        entries = []
+
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+
+            stat = entry.stat()
+            entries.append((stat.st_atime, entry.path, stat.st_size))
+
+        return entries
+
+
+class ClipCache(VideoCache):
+    """A VideoCache of clips extracted from match videos.
+
+    Clips are identified by the version of the video, its anchors, the clips'
+    periods and clocks, and any options that change the output, so changing any of
+    them extracts the clips again.
+
+    Args:
+        directory: The directory to keep clips in. Defaults to a clips directory in
+            the default VideoCache directory.
+        max_bytes: The size the cache is trimmed to after each new clip.
+        ttl: The seconds a clip is used for after it is extracted. Clips are kept
+            until they are evicted if this is None.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: Optional[float] = None,
+    ):
+        if directory is None:
+            directory = os.path.join(default_cache_directory(), "clips")
+
+        super().__init__(directory, max_bytes, ttl)
+
+    def clip_name(
+        self, anchors: Iterable[tuple], clip_clocks: Iterable[dict], options: dict
+    ) -> str:
+        """Get the name a clip is cached under for a video.
+
+        Args:
+            anchors: The video's anchors.
+            clip_clocks: The clip dictionaries the clip is made of, as with get_clips.
+            options: The options that change the clip, e.g. smart_cut.
+
+        Returns:
+            A name derived from a hash of the anchors, clips and options.
+        """
+        identity = json.dumps(
+            {
+                "anchors": [list(anchor) for anchor in anchors],
+                "clips": [
+                    [
+                        clip_info["period"],
+                        float(clip_info["start_clock"]),
+                        float(clip_info["end_clock"]),
+                    ]
+                    for clip_info in clip_clocks
+                ],
+                "options": options,
+            },
+            sort_keys=True,
+        )
+
+        return f"clip-{hashlib.sha1(identity.encode()).hexdigest()}.mp4"
+
+
+def default_cache_directory() -> str:
+    """Get the directory caches are kept in by default.
+
+    Returns:
+        The MATCH_VIDEO_CACHE_DIR environment variable, or ~/.cache/match-video.
+    """
+    return os.environ.get(
+        "MATCH_VIDEO_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "match-video"),
+    )
+
+
+def video_key(video_path: str) -> str:
+    """Identify the current version of a video.
+
+    Args:
+        video_path: The path to a video.
+
+    Returns:
+        A hex digest of the video's absolute path, size and modification time.
+    """
+    stat = os.stat(video_path)
+    identity = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    return hashlib.sha1(identity.encode()).hexdigest()
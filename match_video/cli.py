@@ -1,9 +1,17 @@
-from typing import Optional
+import os
+import sys
+from collections import Counter
+from typing import List, Optional
 
 import typer
 
+import match_video.batch as batch
+import match_video.detect as detect
+import match_video.ocr as ocr
+import match_video.stores as stores
 import match_video.utils as utils
-from match_video.anchor import Anchor
+from match_video.cache import ClipCache
+from match_video.launcher import anchor_lines
 
 app = typer.Typer()
 
@@ -14,6 +22,7 @@ def set_half_starts(
     first_half_start_time: str,
     second_half_start_time: str,
     output_video_path: Optional[str] = None,
+    store: Optional[str] = None,
 ) -> None:
     """Set the start times for each half of a match video.
 
@@ -23,46 +32,329 @@ def set_half_starts(
         second_half_start_time: The start of the second half as mm:ss in video time.
         output_video_path: The path to write the video with anchors to. Overwrite the
             input video if this is not specified.
+        store: Where to keep the anchors, as chapters, json or sqlite:PATH. Defaults
+            to the MATCH_VIDEO_ANCHOR_STORE environment variable, or chapters.
     """
     if output_video_path is None:
         output_video_path = input_video_path
 
-    def get_anchor(period: int, video_time_str: str) -> Anchor:
-        video_minutes, video_seconds = video_time_str.split(":")
-        video_time = int(video_minutes) * 60 + int(video_seconds)
+    anchors = batch.half_start_anchors(first_half_start_time, second_half_start_time)
 
-        return Anchor(period, 0.0, video_time)
+    utils.write_anchors(
+        input_video_path, output_video_path, anchors, store=_open_store(store)
+    )
 
-    anchors = [
-        get_anchor(1, first_half_start_time),
-        get_anchor(2, second_half_start_time),
-    ]
 
-    utils.write_anchors(input_video_path, output_video_path, anchors)
+@app.command()
+def detect_half_starts(
+    input_video_path: str,
+    output_video_path: Optional[str] = None,
+    store: Optional[str] = None,
+    half_minutes: float = 45.0,
+    dry_run: bool = False,
+) -> None:
+    """Set the start times for each half of a match video from the referee's whistles.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_path: The path to write the video with anchors to. Overwrite the
+            input video if this is not specified.
+        store: Where to keep the anchors, as chapters, json or sqlite:PATH. Defaults
+            to the MATCH_VIDEO_ANCHOR_STORE environment variable, or chapters.
+        half_minutes: The length of a half without stoppage time.
+        dry_run: Print the detected half starts without setting them.
+
+    Raises:
+        Exit: The half starts could not be detected.
+    """
+    if output_video_path is None:
+        output_video_path = input_video_path
+
+    try:
+        anchors = detect.detect_half_starts(input_video_path, half_minutes=half_minutes)
+    except ValueError as error:
+        typer.echo(f"Unable to detect half starts in {input_video_path}, {error}")
+        raise typer.Exit(code=1)
+
+    for line in anchor_lines(anchors):
+        typer.echo(line)
+
+    if not dry_run:
+        utils.write_anchors(
+            input_video_path, output_video_path, anchors, store=_open_store(store)
+        )
+
+
+@app.command()
+def set_clock_anchors(
+    input_video_path: str,
+    region: str,
+    output_video_path: Optional[str] = None,
+    store: Optional[str] = None,
+    sample_interval: float = 1.0,
+    drift_threshold: float = 2.0,
+    max_workers: int = 1,
+    dry_run: bool = False,
+) -> None:
+    """Set anchors for a match video from the match clock shown on screen.
+
+    tesseract must be installed.
+
+    Args:
+        input_video_path: The path to a video.
+        region: The part of the frame that shows the clock, as x:y:width:height in
+            pixels.
+        output_video_path: The path to write the video with anchors to. Overwrite the
+            input video if this is not specified.
+        store: Where to keep the anchors, as chapters, json or sqlite:PATH. Defaults
+            to the MATCH_VIDEO_ANCHOR_STORE environment variable, or chapters.
+        sample_interval: The seconds between frames whose clock is read.
+        drift_threshold: The most seconds the clock may drift from video time before
+            an anchor is added.
+        max_workers: The most parts of the video to read at once.
+        dry_run: Print the anchors without setting them.
+
+    Raises:
+        BadParameter: The region is not four whole numbers.
+        Exit: The clock could not be read.
+    """
+    if output_video_path is None:
+        output_video_path = input_video_path
+
+    try:
+        x, y, width, height = (int(value) for value in region.split(":"))
+    except ValueError:
+        raise typer.BadParameter(f"{region} is not x:y:width:height")
+
+    anchors = ocr.detect_clock_anchors(
+        input_video_path,
+        (x, y, width, height),
+        sample_interval=sample_interval,
+        drift_threshold=drift_threshold,
+        max_workers=max_workers,
+    )
+
+    for line in anchor_lines(anchors):
+        typer.echo(line)
+
+    if len(anchors) == 0:
+        raise typer.Exit(code=1)
+
+    if not dry_run:
+        utils.write_anchors(
+            input_video_path, output_video_path, anchors, store=_open_store(store)
+        )
 
 
 @app.command()
-def read_anchors(video_path: str) -> None:
+def set_half_starts_batch(
+    manifest_path: str, max_workers: int = 1, store: Optional[str] = None
+) -> None:
+    """Set the start times for each half of many match videos listed in a manifest.
+
+    Videos that fail are reported and skipped, and the command exits with status 1 if
+    any failed.
+
+    Args:
+        manifest_path: The path to a CSV or JSON manifest with input_video_path,
+            first_half_start_time, second_half_start_time and optionally
+            output_video_path for each video.
+        max_workers: The most videos to write at once.
+        store: Where to keep the anchors, as chapters, json or sqlite:PATH. Defaults
+            to the MATCH_VIDEO_ANCHOR_STORE environment variable, or chapters.
+
+    Raises:
+        Exit: Anchors could not be written to one or more videos.
+    """
+    manifest = batch.read_manifest(manifest_path)
+
+    def report(finished: int, total: int, result: batch.BatchResult) -> None:
+        status = "ok" if result.error is None else f"failed, {result.error}"
+        typer.echo(f"[{finished}/{total}] {result.input_video_path} {status}")
+
+    results = batch.set_half_starts(
+        manifest, max_workers=max_workers, progress=report, store=_open_store(store)
+    )
+    failures = [result for result in results if result.error is not None]
+
+    typer.echo(
+        f"Set anchors for {len(results) - len(failures)} of {len(results)} videos"
+    )
+
+    if len(failures) > 0:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def read_anchors(video_path: str, store: Optional[str] = None) -> None:
     """Read the anchors set for a video.
 
     Args:
         video_path: The path to a video.
+        store: Where the anchors are kept, as chapters, json or sqlite:PATH. Defaults
+            to the MATCH_VIDEO_ANCHOR_STORE environment variable, or chapters.
     """
-    anchors = utils.read_anchors(video_path)
+    anchors = utils.read_anchors(video_path, store=_open_store(store))
 
-    if len(anchors) == 0:
-        typer.echo("No anchors set for video")
+    for line in anchor_lines(anchors):
+        typer.echo(line)
 
-    for anchor in anchors:
-        minute = int(anchor.clock / 60)
-        second = int(anchor.clock % 60)
 
-        video_minute = int(anchor.video_time / 60)
-        video_second = int(anchor.video_time % 60)
+@app.command()
+def migrate_anchors(
+    video_paths: List[str], source: str = "chapters", target: str = "json"
+) -> None:
+    """Copy the anchors of videos from one store to another.
 
-        typer.echo(
-            f"Period {anchor.period} {minute}:{second:02} | {video_minute}:{video_second:02} in video"
-        )
+    Args:
+        video_paths: The paths to the videos.
+        source: The store to read anchors from, as chapters, json or sqlite:PATH.
+        target: The store to write anchors to, as chapters, json or sqlite:PATH.
+    """
+    source_store = _open_named_store(source)
+    target_store = _open_named_store(target)
+
+    for video_path in video_paths:
+        anchors = stores.migrate_anchors(video_path, source_store, target_store)
+        typer.echo(f"Copied {len(anchors)} anchors for {video_path}")
+
+
+@app.command()
+def scan(
+    video_root: str,
+    output: Optional[str] = None,
+    report_format: Optional[str] = typer.Option(None, "--format"),
+    max_workers: int = 1,
+    store: Optional[str] = None,
+    previous: Optional[str] = None,
+    min_periods: int = 2,
+) -> None:
+    """Check the anchors of every video under a directory and report on each video.
+
+    The report is written as JSON lines or CSV, and a summary is printed to stderr.
+    The command exits with status 1 if any video's anchors are missing, inconsistent
+    or could not be read.
+
+    Args:
+        video_root: The directory to scan.
+        output: The path to write the report to. Print it if this is not specified.
+        report_format: jsonl or csv. Defaults to csv if output ends in .csv and
+            jsonl otherwise.
+        max_workers: The most videos to read anchors from at once.
+        store: Where the anchors are kept, as chapters, json or sqlite:PATH. Defaults
+            to the MATCH_VIDEO_ANCHOR_STORE environment variable, or chapters.
+        previous: The path to an earlier report. Videos that haven't changed since
+            are not read again. Ignored if the report doesn't exist yet, so the same
+            path can be passed as output each night.
+        min_periods: The number of periods every video should have anchors for.
+
+    Raises:
+        BadParameter: The report format is not jsonl or csv.
+        Exit: A video's anchors are missing, inconsistent or could not be read.
+    """
+    if report_format is not None and report_format not in batch._SCAN_REPORT_FORMATS:
+        raise typer.BadParameter(f"{report_format} is not jsonl or csv")
+
+    previous_results = (
+        batch.read_scan_report(previous)
+        if previous is not None and os.path.exists(previous)
+        else None
+    )
+
+    results = batch.scan_videos(
+        video_root,
+        max_workers=max_workers,
+        store=_open_store(store),
+        previous=previous_results,
+        min_periods=min_periods,
+    )
+
+    batch.write_scan_report(
+        results, sys.stdout if output is None else output, report_format
+    )
+
+    statuses = Counter(result.status for result in results)
+    typer.echo(
+        f"Scanned {len(results)} videos: {statuses['ok']} ok,"
+        f" {statuses['missing']} missing, {statuses['inconsistent']} inconsistent,"
+        f" {statuses['error']} failed",
+        err=True,
+    )
+
+    if statuses["ok"] < len(results):
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    video_root: str = ".",
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_workers: int = 1,
+    cache_dir: Optional[str] = None,
+    warm: bool = False,
+) -> None:
+    """Serve the clips and anchors of the videos in a directory over HTTP.
+
+    Args:
+        video_root: The directory videos are served from.
+        host: The host to listen on.
+        port: The port to listen on.
+        max_workers: The most clips to extract at once.
+        cache_dir: A directory to cache extracted clips in. Clips are not cached if
+            this is not specified.
+        warm: Read the anchors of every video under the video root before serving.
+    """
+    import match_video.server as server
+
+    cache = None if cache_dir is None else ClipCache(cache_dir)
+    clip_server = server.make_server(host, port, video_root, max_workers, cache)
+
+    if warm:
+        typer.echo(f"Read anchors for {clip_server.service.warm()} videos")
+
+    typer.echo(f"Serving {video_root} on http://{host}:{clip_server.server_port}")
+
+    try:
+        clip_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        clip_server.server_close()
+        clip_server.service.shutdown()
+
+
+def _open_store(name: Optional[str]) -> Optional[stores.AnchorStore]:
+    """Open the anchor store named by a --store option.
+
+    Args:
+        name: The name of the store, or None for the default store.
+
+    Returns:
+        The anchor store, or None for the default store.
+    """
+    if name is None:
+        return None
+
+    return _open_named_store(name)
+
+
+def _open_named_store(name: str) -> stores.AnchorStore:
+    """Open the anchor store named by a store option.
+
+    Args:
+        name: The name of the store, as chapters, json or sqlite:PATH.
+
+    Returns:
+        The anchor store.
+
+    Raises:
+        BadParameter: The name is not a known kind of store.
+    """
+    try:
+        return stores.open_store(name)
+    except ValueError as error:
+        raise typer.BadParameter(str(error))
 
 
 if __name__ == "__main__":
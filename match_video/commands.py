@@ -0,0 +1,251 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Sequence, Union
+
+CommandRecord = namedtuple(
+    "CommandRecord",
+    [
+        "stage",
+        "command",
+        "start_time",
+        "duration",
+        "returncode",
+        "output_bytes",
+        "stderr_tail",
+    ],
+)
+StageMetrics = namedtuple(
+    "StageMetrics", ["count", "failures", "seconds", "max_seconds", "output_bytes"]
+)
+
+logger = logging.getLogger(__name__)
+
+# the most characters of stderr kept for each command
+_STDERR_TAIL_CHARS = 2000
+
+
+class CommandMetrics:
+    """Totals of the commands run for each stage, such as extract_clip or concat.
+
+    Safe to update from several threads at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, StageMetrics] = {}
+
+    def add(self, record: CommandRecord) -> None:
+        """Add a finished command to the totals of its stage.
+
+        Args:
+            record: The command's record.
+        """
+        with self._lock:
+            metrics = self._stages.get(record.stage, StageMetrics(0, 0, 0.0, 0.0, 0))
+            self._stages[record.stage] = StageMetrics(
+                count=metrics.count + 1,
+                failures=metrics.failures + (record.returncode != 0),
+                seconds=metrics.seconds + record.duration,
+                max_seconds=max(metrics.max_seconds, record.duration),
+                output_bytes=metrics.output_bytes + record.output_bytes,
+            )
+
+    def snapshot(self) -> Dict[str, StageMetrics]:
+        """Get the totals of each stage.
+
+        Returns:
+            A copy of the totals by stage name.
+        """
+        with self._lock:
+            return dict(self._stages)
+
+    def reset(self) -> None:
+        """Clear the totals of every stage."""
+        with self._lock:
+            self._stages.clear()
+
+
+_metrics = CommandMetrics()
+_hooks: List[Callable[[CommandRecord], None]] = []
+
+
+def add_command_hook(hook: Callable[[CommandRecord], None]) -> None:
+    """Call a function after every ffmpeg or ffprobe command finishes.
+
+    Hooks are called in the thread that ran the command, e.g. to log slow commands or
+    to export spans to a tracing system using each record's start_time and duration.
+
+    Args:
+        hook: A function that takes the CommandRecord of each finished command.
+    """
+    _hooks.append(hook)
+
+
+def remove_command_hook(hook: Callable[[CommandRecord], None]) -> None:
+    """Stop calling a function added with add_command_hook.
+
+    Args:
+        hook: The function to stop calling.
+    """
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def command_metrics() -> Dict[str, StageMetrics]:
+    """Get the totals of the ffmpeg and ffprobe commands run by each stage.
+
+    Returns:
+        The count, failures, total and longest seconds, and bytes written of the
+        commands run for each stage, by stage name.
+    """
+    return _metrics.snapshot()
+
+
+def reset_command_metrics() -> None:
+    """Clear the totals returned by command_metrics."""
+    _metrics.reset()
+
+
+def run_command(
+    command: List[str],
+    stage: str,
+    output_paths: Sequence[str] = (),
+    universal_newlines: bool = False,
+) -> subprocess.CompletedProcess:
+    """Run an ffmpeg or ffprobe command and record it.
+
+    Args:
+        command: The command to run.
+        stage: The name the command is recorded under, e.g. extract_clip.
+        output_paths: The files the command writes, or directories of them, whose
+            sizes are recorded.
+        universal_newlines: Decode the command's output as text.
+
+    Returns:
+        The finished process, with its stdout and stderr.
+    """
+    text_args: Dict[str, Any] = (
+        {"universal_newlines": True} if universal_newlines else {}
+    )
+    start_time = time.time()
+    start = time.perf_counter()
+
+    result = subprocess.run(
+        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **text_args
+    )
+
+    record_command(
+        stage,
+        command,
+        start_time,
+        time.perf_counter() - start,
+        result.returncode,
+        _output_bytes(result.stdout, output_paths),
+        result.stderr,
+    )
+
+    return result
+
+
+def record_command(
+    stage: str,
+    command: List[str],
+    start_time: float,
+    duration: float,
+    returncode: int,
+    output_bytes: int,
+    stderr: Union[bytes, str, None],
+) -> CommandRecord:
+    """Record a finished command in the metrics and pass it to the hooks.
+
+    Failed commands are logged as warnings with the last line of their stderr.
+
+    Args:
+        stage: The name the command is recorded under.
+        command: The command that ran.
+        start_time: When the command started, in seconds since the epoch.
+        duration: The wall time of the command in seconds.
+        returncode: The command's exit status.
+        output_bytes: The bytes the command wrote to stdout and its output files.
+        stderr: What the command wrote to stderr, if it was captured.
+
+    Returns:
+        The command's record.
+    """
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode(errors="replace")
+
+    record = CommandRecord(
+        stage=stage,
+        command=list(command),
+        start_time=start_time,
+        duration=duration,
+        returncode=returncode,
+        output_bytes=output_bytes,
+        stderr_tail=stderr[-_STDERR_TAIL_CHARS:] if isinstance(stderr, str) else "",
+    )
+
+    if returncode != 0:
+        logger.warning(
+            "%s failed with exit status %s: %s",
+            stage,
+            returncode,
+            failure_reason(record.stderr_tail),
+        )
+
+    _metrics.add(record)
+
+    for hook in list(_hooks):
+        try:
+            hook(record)
+        except Exception:
+            logger.exception("Command hook %r failed", hook)
+
+    return record
+
+
+def failure_reason(stderr: Union[bytes, str, None]) -> str:
+    """Get the reason a command failed from what it wrote to stderr.
+
+    Args:
+        stderr: What the command wrote to stderr, if it was captured.
+
+    Returns:
+        The last line of stderr, which is where ffmpeg prints the reason it failed.
+    """
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode(errors="replace")
+
+    if not isinstance(stderr, str):
+        return ""
+
+    return "".join(stderr.strip().splitlines()[-1:])
+
+
+def _output_bytes(stdout: Union[bytes, str, None], output_paths: Sequence[str]) -> int:
+    """Count the bytes a command wrote to stdout and its output files.
+
+    Args:
+        stdout: What the command wrote to stdout.
+        output_paths: The files the command writes, or directories of them.
+
+    Returns:
+        The number of bytes written.
+    """
+    output_bytes = len(stdout) if isinstance(stdout, (bytes, str)) else 0
+
+    for output_path in output_paths:
+        if os.path.isdir(output_path):
+            output_bytes += sum(
+                entry.stat().st_size
+                for entry in os.scandir(output_path)
+                if entry.is_file()
+            )
+        elif os.path.isfile(output_path):
+            output_bytes += os.path.getsize(output_path)
+
+    return output_bytes
@@ -0,0 +1,416 @@
+import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+import match_video.commands as commands
+import match_video.utils as utils
+from match_video.anchor import AnchorTimeline
+from match_video.cache import LRUCache
+
+CompilationClip = namedtuple(
+    "CompilationClip", ["video_path", "period", "start_clock", "end_clock"]
+)
+StreamParameters = namedtuple(
+    "StreamParameters",
+    [
+        "video_codec",
+        "width",
+        "height",
+        "pixel_format",
+        "frame_rate",
+        "timescale",
+        "audio_codec",
+        "sample_rate",
+        "channels",
+    ],
+)
+
+_parameters_cache = LRUCache(maxsize=128)
+
+
+def get_compilation(
+    clips: Iterable[Tuple[str, int, float, float]],
+    max_workers: int = 1,
+    normalize: bool = False,
+) -> bytes:
+    """Get clips from several matches stitched together.
+
+    A ValueError is raised if a clip can't be found in its video or ffmpeg fails to
+    normalize or stitch the clips.
+
+    Args:
+        clips: A (video_path, period, start_clock, end_clock) tuple, such as a
+            CompilationClip, for each clip in the order they should play.
+        max_workers: The most ffmpeg processes to read anchors and normalize clips
+            with at once.
+        normalize: Re-encode the clips from videos whose streams don't match the first
+            clip's video, instead of raising a ValueError.
+
+    Returns:
+        The compilation as bytes.
+    """
+    with NamedTemporaryFile("rb", suffix=".mp4") as compilation_file:
+        _write_compilation(clips, compilation_file.name, max_workers, normalize)
+
+        return compilation_file.read()
+
+
+def write_compilation(
+    clips: Iterable[Tuple[str, int, float, float]],
+    output: Union[str, BinaryIO],
+    max_workers: int = 1,
+    normalize: bool = False,
+) -> None:
+    """Write clips from several matches stitched together to a file.
+
+    Errors are raised as with get_compilation.
+
+    Args:
+        clips: A (video_path, period, start_clock, end_clock) tuple for each clip, as
+            with get_compilation.
+        output: A path to write the compilation to, or a binary file object to copy
+            it to.
+        max_workers: The most ffmpeg processes to read anchors and normalize clips
+            with at once.
+        normalize: Re-encode the clips from videos whose streams don't match the first
+            clip's video, as with get_compilation.
+    """
+    clips = list(clips)
+
+    utils._write_output(
+        output, lambda path: _write_compilation(clips, path, max_workers, normalize)
+    )
+
+
+def read_stream_parameters(video_path: str) -> StreamParameters:
+    """Read the parameters of a video's streams that clips must share to be stitched.
+
+    Parameters are cached in memory by the video's path, size and modification time.
+
+    Args:
+        video_path: The path to a video.
+
+    Returns:
+        The parameters of the video's first video and audio streams. The audio
+        parameters are None if the video has no audio.
+
+    Raises:
+        ValueError: The video's streams could not be read, or it has no video stream.
+    """
+    cache_key = utils._anchor_cache_key(video_path)
+
+    if cache_key is not None:
+        parameters = _parameters_cache.get(cache_key)
+
+        if parameters is not None:
+            return parameters
+
+    result = commands.run_command(
+        [
+            "ffprobe",
+            "-v",
+            "quiet",
+            "-print_format",
+            "json",
+            "-show_error",
+            "-show_streams",
+            video_path,
+        ],
+        "read_streams",
+    )
+    streams = json.loads(result.stdout)
+
+    if "error" in streams:
+        raise ValueError(
+            f"Unable to read the streams of {video_path}, {streams['error']['string']}"
+        )
+
+    video_stream = _first_stream(streams["streams"], "video")
+    audio_stream = _first_stream(streams["streams"], "audio")
+
+    if video_stream is None:
+        raise ValueError(f"{video_path} has no video stream")
+
+    parameters = StreamParameters(
+        video_codec=video_stream["codec_name"],
+        width=video_stream["width"],
+        height=video_stream["height"],
+        pixel_format=video_stream.get("pix_fmt"),
+        frame_rate=video_stream.get("r_frame_rate"),
+        timescale=int(video_stream["time_base"].split("/")[1]),
+        audio_codec=None if audio_stream is None else audio_stream["codec_name"],
+        sample_rate=None if audio_stream is None else audio_stream.get("sample_rate"),
+        channels=None if audio_stream is None else audio_stream.get("channels"),
+    )
+
+    if cache_key is not None:
+        _parameters_cache.put(cache_key, parameters)
+
+    return parameters
+
+
+def _write_compilation(
+    clips: Iterable[Tuple[str, int, float, float]],
+    output_video_path: str,
+    max_workers: int,
+    normalize: bool,
+) -> None:
+    """Write clips from several matches stitched together to output_video_path.
+
+    Each video's anchors and stream parameters are read once, however many clips come
+    from it. Clips from videos that match the first clip's video are read straight
+    from the videos by the final concat. Only clips from other videos are re-encoded,
+    in parallel, to temporary files first.
+
+    Args:
+        clips: A (video_path, period, start_clock, end_clock) tuple for each clip.
+        output_video_path: The path to write the compilation to.
+        max_workers: The most ffmpeg processes to run at once.
+        normalize: Re-encode the clips from videos that don't match.
+
+    Raises:
+        ValueError: There are no clips, a video has no anchors, a clip is before the
+            first anchor in its period, a video's streams don't match and normalize is
+            False, or ffmpeg failed to normalize or stitch the clips.
+    """
+    compilation_clips = [CompilationClip(*clip) for clip in clips]
+
+    if len(compilation_clips) == 0:
+        raise ValueError("A compilation needs at least one clip")
+
+    video_paths = list(dict.fromkeys(clip.video_path for clip in compilation_clips))
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        timelines = dict(zip(video_paths, executor.map(_read_timeline, video_paths)))
+        parameters = dict(
+            zip(video_paths, executor.map(read_stream_parameters, video_paths))
+        )
+
+    video_times = [
+        timelines[clip.video_path].clip_video_times(
+            clip.period, clip.start_clock, clip.end_clock
+        )
+        for clip in compilation_clips
+    ]
+
+    target = parameters[compilation_clips[0].video_path]
+    mismatched = [
+        path
+        for path in video_paths
+        if _stitchable(parameters[path]) != _stitchable(target)
+    ]
+
+    if len(mismatched) > 0 and not normalize:
+        raise ValueError(
+            f"The streams of {', '.join(mismatched)} don't match"
+            f" {compilation_clips[0].video_path}, normalize them to stitch them together"
+        )
+
+    normalized_indexes = [
+        index
+        for index, clip in enumerate(compilation_clips)
+        if clip.video_path in mismatched
+    ]
+    normalized_files = [
+        NamedTemporaryFile("rb", suffix=".mp4") for _ in normalized_indexes
+    ]
+
+    try:
+        normalized_paths = dict(
+            zip(normalized_indexes, [file.name for file in normalized_files])
+        )
+
+        def normalize_clip(index: int) -> None:
+            start_time, end_time = video_times[index]
+
+            result = commands.run_command(
+                _normalize_clip_command(
+                    compilation_clips[index].video_path,
+                    normalized_paths[index],
+                    start_time,
+                    end_time,
+                    parameters[compilation_clips[index].video_path],
+                    target,
+                ),
+                "normalize_clip",
+                [normalized_paths[index]],
+            )
+
+            if result.returncode != 0:
+                raise ValueError(
+                    f"Unable to normalize a clip from"
+                    f" {compilation_clips[index].video_path},"
+                    f" {commands.failure_reason(result.stderr)}"
+                )
+
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            list(executor.map(normalize_clip, normalized_indexes))
+
+        entries = [
+            (
+                (normalized_paths[index], None)
+                if index in normalized_paths
+                else (clip.video_path, video_times[index])
+            )
+            for index, clip in enumerate(compilation_clips)
+        ]
+
+        with utils._ranged_concat_list(entries) as concat_list_path:
+            result = commands.run_command(
+                _compilation_command(
+                    concat_list_path, output_video_path, target, len(video_paths)
+                ),
+                "compilation",
+                [output_video_path],
+            )
+
+        if result.returncode != 0:
+            raise ValueError(
+                f"Unable to write the compilation to {output_video_path},"
+                f" {commands.failure_reason(result.stderr)}"
+            )
+    finally:
+        for normalized_file in normalized_files:
+            normalized_file.close()
+
+
+def _read_timeline(video_path: str) -> AnchorTimeline:
+    """Read a video's anchors into a timeline.
+
+    Args:
+        video_path: The path to a video.
+
+    Returns:
+        The video's anchor timeline.
+
+    Raises:
+        ValueError: The video does not have anchors.
+    """
+    anchors = utils.read_anchors(video_path)
+
+    if len(anchors) == 0:
+        raise ValueError(f"{video_path} has no set anchors")
+
+    return AnchorTimeline(anchors)
+
+
+def _compilation_command(
+    concat_list_path: str,
+    output_video_path: str,
+    target: StreamParameters,
+    video_count: int,
+) -> List[str]:
+    """Get the ffmpeg command that stitches the clips of a compilation together.
+
+    Args:
+        concat_list_path: The path to a list written by _ranged_concat_list.
+        output_video_path: The path to write the compilation to.
+        target: The stream parameters every clip shares.
+        video_count: The number of videos the clips are from.
+
+    Returns:
+        The ffmpeg command.
+    """
+    command = (
+        ["ffmpeg", "-y"]
+        + utils._concat_input_args(concat_list_path)
+        + utils._CONCAT_OUTPUT_ARGS
+    )
+
+    # each video has its own parameter sets, which are repeated in the stream so
+    # players pick up the new ones when the source changes
+    if video_count > 1 and target.video_codec in utils._SMART_CUT_VIDEO_CODECS:
+        _, bitstream_filter = utils._SMART_CUT_VIDEO_CODECS[target.video_codec]
+        command += ["-bsf:v", bitstream_filter]
+
+    return command + [output_video_path]
+
+
+def _normalize_clip_command(
+    input_video_path: str,
+    output_video_path: str,
+    start_time: float,
+    end_time: float,
+    source: StreamParameters,
+    target: StreamParameters,
+) -> List[str]:
+    """Get the ffmpeg command that re-encodes a clip to match other streams.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_path: The path to write the clip to.
+        start_time: The start of the clip in seconds since video start.
+        end_time: The end of the clip in seconds since video start.
+        source: The stream parameters of the video.
+        target: The stream parameters to re-encode the clip to.
+
+    Returns:
+        The ffmpeg command.
+
+    Raises:
+        ValueError: The clip can't be re-encoded to match target.
+    """
+    if target.video_codec not in utils._SMART_CUT_VIDEO_CODECS:
+        raise ValueError(f"Clips can't be normalized to {target.video_codec} video")
+
+    if target.audio_codec is not None and source.audio_codec is None:
+        raise ValueError(f"{input_video_path} has no audio to normalize")
+
+    video_encoder, _ = utils._SMART_CUT_VIDEO_CODECS[target.video_codec]
+    video_filters = [f"scale={target.width}:{target.height}"]
+
+    if target.frame_rate is not None:
+        video_filters.append(f"fps={target.frame_rate}")
+
+    command = [
+        "ffmpeg",
+        "-y",
+        "-ss",
+        f"{start_time:0.6f}",
+        "-to",
+        f"{end_time:0.6f}",
+        "-i",
+        input_video_path,
+        "-map",
+        "0:v:0",
+        "-vf",
+        ",".join(video_filters),
+        "-c:v",
+        video_encoder,
+        "-video_track_timescale",
+        f"{target.timescale}",
+    ]
+
+    if target.pixel_format is not None:
+        command += ["-pix_fmt", target.pixel_format]
+
+    if target.audio_codec is None:
+        command += ["-an"]
+    else:
+        command += [
+            "-map",
+            "0:a:0",
+            "-c:a",
+            utils._SMART_CUT_AUDIO_ENCODERS.get(target.audio_codec, target.audio_codec),
+        ]
+
+        if target.sample_rate is not None:
+            command += ["-ar", f"{target.sample_rate}"]
+
+        if target.channels is not None:
+            command += ["-ac", f"{target.channels}"]
+
+    return command + ["-map_chapters", "-1", output_video_path]
+
+
+def _stitchable(parameters: StreamParameters) -> StreamParameters:
+    # the concat demuxer rescales timestamps, so only the timescale can differ
+    return parameters._replace(timescale=None)
+
+
+def _first_stream(streams: List[Dict], codec_type: str) -> Optional[Dict]:
+    return next(
+        (stream for stream in streams if stream["codec_type"] == codec_type), None
+    )
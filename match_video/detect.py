@@ -0,0 +1,223 @@
+from collections import namedtuple
+from typing import Dict, List, Tuple
+
+import match_video.batch as batch
+import match_video.commands as commands
+from match_video.anchor import Anchor
+
+Whistle = namedtuple("Whistle", ["video_time", "duration"])
+
+# referee whistles sound between about 2.5 and 4.5 kHz, so the audio is resampled to a
+# rate that keeps that band and no more
+_WHISTLE_BAND_HZ = (2500, 4500)
+_SAMPLE_RATE = 16000
+
+# windows quieter than this are ignored, as their share of energy in the band means
+# nothing
+_MIN_LEVEL_DB = -50.0
+
+
+def detect_whistles(
+    video_path: str,
+    threshold_db: float = -6.0,
+    min_duration: float = 0.4,
+    window: float = 0.2,
+) -> List[Whistle]:
+    """Find the referee's whistles in a video's audio.
+
+    Only the first audio stream is decoded, downmixed to mono and resampled, so the
+    video is never decoded and a full match takes seconds. The audio is split into
+    windows, and a window is part of a whistle when most of its energy is in the band
+    whistles sound in, which broadband crowd noise and commentary rarely manage.
+
+    Args:
+        video_path: The path to a video.
+        threshold_db: The most decibels the energy in the whistle band may be below
+            the energy of the whole window for the window to count as a whistle.
+        min_duration: The shortest whistle in seconds.
+        window: The length of each window in seconds.
+
+    Returns:
+        The whistles in order of video time.
+
+    Raises:
+        ValueError: The video's audio could not be read.
+    """
+    result = commands.run_command(
+        _whistle_levels_command(video_path, window), "detect_whistles"
+    )
+
+    if result.returncode != 0:
+        raise ValueError(f"Unable to read the audio of {video_path}")
+
+    levels = _parse_levels(result.stdout.decode())
+    whistles = []
+    start_time = None
+
+    for video_time, (level, band_level) in sorted(levels.items()):
+        is_whistle = band_level > _MIN_LEVEL_DB and band_level - level >= threshold_db
+
+        if is_whistle and start_time is None:
+            start_time = video_time
+        elif not is_whistle and start_time is not None:
+            whistles.append(Whistle(start_time, video_time - start_time))
+            start_time = None
+
+    if start_time is not None:
+        end_time = max(levels) + window
+        whistles.append(Whistle(start_time, end_time - start_time))
+
+    return [whistle for whistle in whistles if whistle.duration >= min_duration]
+
+
+def half_starts_from_whistles(
+    whistles: List[Whistle],
+    half_minutes: float = 45.0,
+    min_break_minutes: float = 5.0,
+    max_stoppage_minutes: float = 10.0,
+) -> Tuple[float, float]:
+    """Pick the kickoff whistle of each half.
+
+    Half-time is the first gap between whistles that is at least min_break_minutes
+    long and starts at least a half after the first whistle, and the second half
+    starts with the whistle that ends it. The first half starts with the earliest
+    whistle that leaves a half plus at most max_stoppage_minutes of play before
+    half-time.
+
+    Args:
+        whistles: The whistles in a match video, e.g. from detect_whistles.
+        half_minutes: The length of a half without stoppage time.
+        min_break_minutes: The shortest half-time break.
+        max_stoppage_minutes: The most stoppage time added to the first half.
+
+    Returns:
+        The video times the first and second halves start at.
+
+    Raises:
+        ValueError: Half-time or the first kickoff could not be found.
+    """
+    times = sorted(whistle.video_time for whistle in whistles)
+    half = half_minutes * 60
+
+    breaks = [
+        (earlier, later)
+        for earlier, later in zip(times, times[1:])
+        if later - earlier >= min_break_minutes * 60 and earlier - times[0] >= half
+    ]
+
+    if len(breaks) == 0:
+        raise ValueError("No break between whistles looks like half-time")
+
+    first_half_end, second_half_start = breaks[0]
+    latest_kickoff = first_half_end - half
+    kickoffs = [
+        time
+        for time in times
+        if latest_kickoff - max_stoppage_minutes * 60 <= time <= latest_kickoff
+    ]
+
+    if len(kickoffs) == 0:
+        raise ValueError("No whistle looks like the first half's kickoff")
+
+    return kickoffs[0], second_half_start
+
+
+def detect_half_starts(
+    video_path: str,
+    half_minutes: float = 45.0,
+    min_break_minutes: float = 5.0,
+    max_stoppage_minutes: float = 10.0,
+) -> List[Anchor]:
+    """Propose half start anchors for a match video from the referee's whistles.
+
+    The anchors are a proposal for a person to check, e.g. with read-anchors after
+    writing them with write_anchors.
+
+    Args:
+        video_path: The path to a match video.
+        half_minutes: The length of a half without stoppage time.
+        min_break_minutes: The shortest half-time break.
+        max_stoppage_minutes: The most stoppage time added to the first half.
+
+    Returns:
+        An anchor at 0:00 on the clock for each half.
+    """
+    first_half_start, second_half_start = half_starts_from_whistles(
+        detect_whistles(video_path),
+        half_minutes=half_minutes,
+        min_break_minutes=min_break_minutes,
+        max_stoppage_minutes=max_stoppage_minutes,
+    )
+
+    return batch.half_start_anchors(first_half_start, second_half_start)
+
+
+def _whistle_levels_command(video_path: str, window: float) -> List[str]:
+    """Get the ffmpeg command that prints the levels of each window of audio.
+
+    The audio is joined with a copy filtered to the whistle band as a second channel,
+    so one astats filter measures both levels of each window. Measuring only the RMS
+    level needs ffmpeg 4.4 or later.
+
+    Args:
+        video_path: The path to a video.
+        window: The length of each window in seconds.
+
+    Returns:
+        The ffmpeg command.
+    """
+    low_hz, high_hz = _WHISTLE_BAND_HZ
+    levels_filter = (
+        f"[0:a:0]aformat=channel_layouts=mono,aresample={_SAMPLE_RATE},asplit[full][a];"
+        f"[a]highpass=f={low_hz},lowpass=f={high_hz}[band];"
+        "[full][band]join=inputs=2:channel_layout=stereo,"
+        f"asetnsamples=n={round(window * _SAMPLE_RATE)},"
+        "astats=metadata=1:reset=1:measure_perchannel=RMS_level:measure_overall=none,"
+        "ametadata=mode=print:file=-"
+    )
+
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        "-vn",
+        "-sn",
+        "-dn",
+        "-i",
+        video_path,
+        "-filter_complex",
+        levels_filter,
+        "-f",
+        "null",
+        "-",
+    ]
+
+
+def _parse_levels(output: str) -> Dict[float, Tuple[float, float]]:
+    """Parse the levels printed by the whistle levels command.
+
+    Args:
+        output: What the command printed.
+
+    Returns:
+        The RMS level in decibels of the whole window and of the whistle band, by the
+        video time the window starts at.
+    """
+    levels: Dict[float, Dict[str, float]] = {}
+    video_time = None
+
+    for line in output.splitlines():
+        if line.startswith("frame:"):
+            video_time = float(line.rpartition("pts_time:")[2])
+        elif line.startswith("lavfi.astats.") and video_time is not None:
+            key, _, value = line.partition("=")
+            levels.setdefault(video_time, {})[key] = float(value)
+
+    return {
+        video_time: (
+            window_levels["lavfi.astats.1.RMS_level"],
+            window_levels["lavfi.astats.2.RMS_level"],
+        )
+        for video_time, window_levels in levels.items()
+        if len(window_levels) == 2
+    }
@@ -0,0 +1,197 @@
+import csv
+import json
+import os
+from collections import namedtuple
+from typing import BinaryIO, Collection, Iterable, Iterator, List, Optional, Union
+from xml.etree.ElementTree import iterparse
+
+import match_video.utils as utils
+from match_video.anchor import PERIOD_START_MINUTES
+
+Event = namedtuple("Event", ["period", "clock", "type"])
+
+
+def read_events(events_path: str) -> Iterator[Event]:
+    """Read the events in a match's event feed one at a time.
+
+    JSON feeds are a list of objects, or an object with an events list. CSV feeds have
+    a header row. Each JSON object or CSV row has a period, a clock in seconds since
+    the start of the period and a type. XML feeds are Opta F24 files, whose events
+    are read as they are parsed so large feeds aren't held in memory.
+
+    Args:
+        events_path: The path to a .json, .csv or .xml event feed.
+
+    Yields:
+        The events in the order they appear in the feed.
+
+    Raises:
+        ValueError: The feed is not a JSON, CSV or XML file.
+    """
+    extension = os.path.splitext(events_path)[1].lower()
+
+    if extension == ".json":
+        yield from _read_json_events(events_path)
+    elif extension == ".csv":
+        yield from _read_csv_events(events_path)
+    elif extension == ".xml":
+        yield from _read_opta_events(events_path)
+    else:
+        raise ValueError(f"{events_path} is not a .json, .csv or .xml event feed")
+
+
+def event_clip_clocks(
+    events: Iterable[Event],
+    before: float = 5.0,
+    after: float = 5.0,
+    types: Optional[Collection[Union[str, int]]] = None,
+) -> Iterator[dict]:
+    """Select a clip around each event.
+
+    Args:
+        events: The events to clip, e.g. from read_events.
+        before: The seconds of video to include before each event.
+        after: The seconds of video to include after each event.
+        types: The event types to clip. Defaults to every event.
+
+    Yields:
+        A clip dictionary, as with get_clips, for each selected event. Clips don't
+        start before the start of their period.
+    """
+    type_names = None if types is None else {str(event_type) for event_type in types}
+
+    for event in events:
+        if type_names is not None and str(event.type) not in type_names:
+            continue
+
+        yield {
+            "period": event.period,
+            "start_clock": max(event.clock - before, 0.0),
+            "end_clock": event.clock + after,
+        }
+
+
+def highlight_clip_clocks(
+    events: Iterable[Event],
+    before: float = 5.0,
+    after: float = 5.0,
+    types: Optional[Collection[Union[str, int]]] = None,
+    gap: float = 0.0,
+) -> List[dict]:
+    """Select the clips for a highlight reel of events.
+
+    Clips for events that are close together are merged, so no footage is extracted
+    or shown twice.
+
+    Args:
+        events: The events to clip, e.g. from read_events.
+        before: The seconds of video to include before each event.
+        after: The seconds of video to include after each event.
+        types: The event types to clip. Defaults to every event.
+        gap: Merge clips that are at most this many seconds apart.
+
+    Returns:
+        The merged clips in match order, as with get_clips.
+    """
+    return utils.merge_clip_clocks(
+        list(event_clip_clocks(events, before=before, after=after, types=types)),
+        gap=gap,
+    )
+
+
+def get_highlights(
+    video_path: str,
+    events: Iterable[Event],
+    before: float = 5.0,
+    after: float = 5.0,
+    types: Optional[Collection[Union[str, int]]] = None,
+    gap: float = 0.0,
+    **clip_options,
+) -> bytes:
+    """Get a highlight reel of events from a match.
+
+    Args:
+        video_path: The path to a video.
+        events: The events to clip, e.g. from read_events.
+        before: The seconds of video to include before each event.
+        after: The seconds of video to include after each event.
+        types: The event types to clip. Defaults to every event.
+        gap: Merge clips that are at most this many seconds apart.
+        **clip_options: Options for get_clips, such as max_workers.
+
+    Returns:
+        The highlight reel as bytes.
+    """
+    clip_clocks = highlight_clip_clocks(events, before, after, types, gap)
+
+    return utils.get_clips(video_path, clip_clocks, **clip_options)
+
+
+def write_highlights(
+    video_path: str,
+    events: Iterable[Event],
+    output: Union[str, BinaryIO],
+    before: float = 5.0,
+    after: float = 5.0,
+    types: Optional[Collection[Union[str, int]]] = None,
+    gap: float = 0.0,
+    **clip_options,
+) -> None:
+    """Write a highlight reel of events from a match to a file.
+
+    Args:
+        video_path: The path to a video.
+        events: The events to clip, e.g. from read_events.
+        output: The path or binary file object to write the highlight reel to.
+        before: The seconds of video to include before each event.
+        after: The seconds of video to include after each event.
+        types: The event types to clip. Defaults to every event.
+        gap: Merge clips that are at most this many seconds apart.
+        **clip_options: Options for write_clips, such as max_workers.
+    """
+    clip_clocks = highlight_clip_clocks(events, before, after, types, gap)
+
+    utils.write_clips(video_path, clip_clocks, output, **clip_options)
+
+
+def _read_json_events(events_path: str) -> Iterator[Event]:
+    with open(events_path) as events_file:
+        feed = json.load(events_file)
+
+    if isinstance(feed, dict):
+        feed = feed["events"]
+
+    for event in feed:
+        yield _event(event)
+
+
+def _read_csv_events(events_path: str) -> Iterator[Event]:
+    with open(events_path, newline="") as events_file:
+        for row in csv.DictReader(events_file):
+            yield _event(row)
+
+
+def _read_opta_events(events_path: str) -> Iterator[Event]:
+    for _, element in iterparse(events_path):
+        if element.tag != "Event":
+            continue
+
+        period = int(element.attrib["period_id"])
+
+        # pre-match (16) and post-match (14) events aren't in the match video's
+        # periods
+        if period in PERIOD_START_MINUTES:
+            minute = int(element.attrib["min"]) - PERIOD_START_MINUTES[period]
+
+            yield Event(
+                period,
+                float(minute * 60 + int(element.attrib["sec"])),
+                element.attrib["type_id"],
+            )
+
+        # drop the parsed event and its qualifiers to keep memory use flat
+        element.clear()
+
+
+def _event(fields: dict) -> Event:
+    return Event(int(fields["period"]), float(fields["clock"]), fields["type"])
@@ -0,0 +1,143 @@
+import json
+from collections import namedtuple
+from fractions import Fraction
+from typing import List, Optional
+
+import match_video.commands as commands
+from match_video.cache import LRUCache, VideoCache
+
+KeyframeIndex = namedtuple(
+    "KeyframeIndex",
+    ["keyframes", "video_codec", "pixel_format", "timescale", "audio_codec"],
+)
+
+_index_cache = LRUCache(maxsize=32)
+
+
+def read_keyframe_index(
+    video_path: str, cache: Optional[VideoCache] = None
+) -> KeyframeIndex:
+    """Read the keyframe times and codecs of a video.
+
+    The index is built with an ffprobe packet scan the first time a version of a video
+    is read, then kept in a VideoCache so later reads, including from other
+    processes, only load a small JSON file.
+
+    Args:
+        video_path: The path to a video.
+        cache: The cache to keep the index in. Defaults to a VideoCache in the default
+            directory.
+
+    Returns:
+        The sorted times of the video's keyframes in seconds, with the codecs and
+        parameters needed to re-encode part of the video to match it.
+    """
+    if cache is None:
+        cache = VideoCache()
+
+    index_path = cache.get_or_create(
+        video_path,
+        "keyframes.json",
+        lambda path: _write_keyframe_index(video_path, path),
+    )
+
+    index = _index_cache.get(index_path)
+
+    if index is None:
+        with open(index_path) as index_file:
+            index = KeyframeIndex(**json.load(index_file))
+
+        _index_cache.put(index_path, index)
+
+    return index
+
+
+def _write_keyframe_index(video_path: str, index_path: str) -> None:
+    """Scan a video's packets and write its keyframe index as JSON.
+
+    Args:
+        video_path: The path to a video.
+        index_path: The path to write the index to.
+
+    Raises:
+        ValueError: The video's streams could not be read.
+    """
+    streams_json = commands.run_command(
+        [
+            "ffprobe",
+            "-v",
+            "quiet",
+            "-print_format",
+            "json",
+            "-show_error",
+            "-show_streams",
+            video_path,
+        ],
+        "read_streams",
+    )
+    streams = json.loads(streams_json.stdout)
+
+    if "error" in streams:
+        raise ValueError(
+            f"Unable to read the streams of {video_path}, {streams['error']['string']}"
+        )
+
+    video_streams = [
+        stream for stream in streams["streams"] if stream["codec_type"] == "video"
+    ]
+    audio_streams = [
+        stream for stream in streams["streams"] if stream["codec_type"] == "audio"
+    ]
+
+    if len(video_streams) == 0:
+        raise ValueError(f"{video_path} has no video stream")
+
+    video_stream = video_streams[0]
+
+    packets = commands.run_command(
+        [
+            "ffprobe",
+            "-v",
+            "quiet",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "packet=pts_time,flags",
+            "-print_format",
+            "csv=print_section=0",
+            video_path,
+        ],
+        "read_keyframes",
+        universal_newlines=True,
+    )
+
+    index = KeyframeIndex(
+        keyframes=_parse_keyframes(packets.stdout),
+        video_codec=video_stream["codec_name"],
+        pixel_format=video_stream.get("pix_fmt"),
+        timescale=Fraction(video_stream["time_base"]).denominator,
+        audio_codec=audio_streams[0]["codec_name"] if audio_streams else None,
+    )
+
+    with open(index_path, "w") as index_file:
+        json.dump(index._asdict(), index_file)
+
+
+def _parse_keyframes(packets_csv: str) -> List[float]:
+    """Find the keyframes in ffprobe's packet listing.
+
+    Args:
+        packets_csv: Lines of pts_time,flags for each packet of a video stream.
+
+    Returns:
+        The sorted times of the packets flagged as keyframes.
+    """
+    keyframes = []
+
+    for line in packets_csv.splitlines():
+        pts_time, _, flags = line.partition(",")
+
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+
+    return sorted(keyframes)
@@ -0,0 +1,121 @@
+"""The match-video command.
+
+Reading the anchors of one video is answered without importing Typer, so shell loops
+that run read-anchors over many videos aren't dominated by startup. Every other
+command, and any arguments the fast path doesn't understand, go to the Typer app in
+match_video.cli.
+"""
+
+import sys
+from typing import List, Optional, Sequence, Tuple
+
+from match_video.anchor import Anchor
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the match-video command.
+
+    Args:
+        argv: The command's arguments. Defaults to sys.argv[1:].
+    """
+    args = sys.argv[1:] if argv is None else argv
+    read_anchors_args = _read_anchors_args(args)
+
+    if read_anchors_args is not None and _read_anchors(*read_anchors_args):
+        return
+
+    from match_video.cli import app
+
+    app(args=args, prog_name="match-video")
+
+
+def anchor_lines(anchors: Sequence[Anchor]) -> List[str]:
+    """Describe anchors the way the read-anchors command prints them.
+
+    Args:
+        anchors: The anchors set for a video.
+
+    Returns:
+        A line for each anchor, or a single line saying there are none.
+    """
+    if len(anchors) == 0:
+        return ["No anchors set for video"]
+
+    lines = []
+
+    for anchor in anchors:
+        minute = int(anchor.clock / 60)
+        second = int(anchor.clock % 60)
+
+        video_minute = int(anchor.video_time / 60)
+        video_second = int(anchor.video_time % 60)
+
+        lines.append(
+            f"Period {anchor.period} {minute}:{second:02} | {video_minute}:{video_second:02} in video"
+        )
+
+    return lines
+
+
+def _read_anchors_args(args: List[str]) -> Optional[Tuple[str, Optional[str]]]:
+    """Parse the arguments of a read-anchors command the fast path can answer.
+
+    Args:
+        args: The command's arguments.
+
+    Returns:
+        The video path and store name, or None if the arguments are for another
+        command or use anything other than a single video path and --store.
+    """
+    if len(args) == 0 or args[0] != "read-anchors":
+        return None
+
+    video_paths = []
+    store_name = None
+    remaining = list(args[1:])
+
+    while len(remaining) > 0:
+        arg = remaining.pop(0)
+
+        if arg == "--store" and len(remaining) > 0:
+            store_name = remaining.pop(0)
+        elif arg.startswith("--store="):
+            store_name = arg[len("--store=") :]
+        elif arg.startswith("-"):
+            return None
+        else:
+            video_paths.append(arg)
+
+    if len(video_paths) != 1:
+        return None
+
+    return video_paths[0], store_name
+
+
+def _read_anchors(video_path: str, store_name: Optional[str]) -> bool:
+    """Print the anchors set for a video.
+
+    Args:
+        video_path: The path to a video.
+        store_name: The name of the store the anchors are kept in, or None for the
+            default store.
+
+    Returns:
+        False if the store name isn't valid, so the Typer app can report it.
+    """
+    import match_video.stores as stores
+    import match_video.utils as utils
+
+    try:
+        store = None if store_name is None else stores.open_store(store_name)
+    except ValueError:
+        return False
+
+    for line in anchor_lines(utils.read_anchors(video_path, store=store)):
+        print(line)
+
+    return True
+
+
+if __name__ == "__main__":
+    main()
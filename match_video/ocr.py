@@ -0,0 +1,380 @@
+import json
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from typing import List, Optional, Tuple
+
+import match_video.commands as commands
+from match_video.anchor import PENALTIES_PERIOD, PERIOD_START_MINUTES, Anchor
+
+ClockReading = namedtuple("ClockReading", ["video_time", "clock"])
+
+# broadcast clocks show the match minute in every period but penalties
+_CLOCK_PERIOD_START_MINUTES = {
+    period: start_minute
+    for period, start_minute in PERIOD_START_MINUTES.items()
+    if period != PENALTIES_PERIOD
+}
+
+# tesseract reads digits best when they are a few tens of pixels tall, and scoreboard
+# clocks are usually smaller
+_OCR_SCALE = 3
+
+_CLOCK_PATTERN = re.compile(r"(\d{1,3})\s*[:.]\s*([0-5]\d)")
+
+
+def read_match_clock(
+    video_path: str,
+    region: Tuple[int, int, int, int],
+    sample_interval: float = 1.0,
+    max_workers: int = 1,
+    chunk_seconds: float = 300.0,
+) -> List[ClockReading]:
+    """Read the match clock shown on screen throughout a video.
+
+    The video is split into chunks that are read in parallel. For each chunk, ffmpeg
+    writes the clock region of one frame every sample_interval seconds to grayscale
+    images, and a single tesseract process reads all of them. tesseract must be
+    installed.
+
+    Args:
+        video_path: The path to a video.
+        region: The x, y, width and height in pixels of the part of the frame that
+            shows the clock.
+        sample_interval: The seconds between frames that are read.
+        max_workers: The most chunks to read at once.
+        chunk_seconds: The length of each chunk in seconds.
+
+    Returns:
+        A reading for each sampled frame in order of video time. The clock is the
+        match time in seconds, or None if it could not be read.
+    """
+    duration = _read_duration(video_path)
+    chunks = []
+    start_time = 0.0
+
+    while start_time < duration:
+        chunks.append((start_time, min(start_time + chunk_seconds, duration)))
+        start_time += chunk_seconds
+
+    def read_chunk(chunk: Tuple[float, float]) -> List[ClockReading]:
+        return _read_chunk_clock(video_path, region, *chunk, sample_interval)
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        return [
+            reading
+            for readings in executor.map(read_chunk, chunks)
+            for reading in readings
+        ]
+
+
+def parse_clock(text: str) -> Optional[float]:
+    """Parse a match clock read from the screen, such as 67:12.
+
+    Args:
+        text: The text read from the clock region.
+
+    Returns:
+        The match time in seconds, or None if the text has no clock.
+    """
+    match = _CLOCK_PATTERN.search(text)
+
+    if match is None:
+        return None
+
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def clock_anchors(
+    readings: List[ClockReading],
+    drift_threshold: float = 2.0,
+    min_break: float = 120.0,
+) -> List[Anchor]:
+    """Turn readings of the match clock into anchors.
+
+    Readings that agree with neither neighbour are dropped as misreads, as are
+    repeated readings of a stopped clock. A new period starts when the clock goes
+    back, or when it hasn't moved across a gap of at least min_break seconds of
+    video without a reading, such as half-time with the clock hidden. Each
+    period gets an anchor at its first reading, then only where the clock drifts
+    more than drift_threshold seconds from where video time advancing from the last
+    anchor puts it, e.g. after a replay, a VAR check or an ad break, so clip clocks
+    are converted with as few anchors as possible.
+
+    Args:
+        readings: The readings of a video's clock, e.g. from read_match_clock.
+        drift_threshold: The most seconds the clock may drift before an anchor is
+            added.
+        min_break: The seconds of video without a reading across which a clock that
+            hasn't moved starts a new period.
+
+    Returns:
+        The anchors in order of video time.
+    """
+    readings = _consistent_readings(
+        [reading for reading in readings if reading.clock is not None],
+        drift_threshold,
+    )
+    anchors: List[Anchor] = []
+    period: Optional[int] = None
+    previous: Optional[ClockReading] = None
+    last_seen: Optional[ClockReading] = None
+
+    for reading in readings:
+        reading_period = period
+
+        # the first reading sets all three
+        if period is None or previous is None or last_seen is None:
+            reading_period = max(
+                candidate
+                for candidate, start_minute in _CLOCK_PERIOD_START_MINUTES.items()
+                if start_minute * 60 <= reading.clock
+            )
+        elif reading.clock < previous.clock - drift_threshold or (
+            reading.video_time - last_seen.video_time >= min_break
+            and reading.clock - last_seen.clock < drift_threshold
+        ):
+            reading_period = period + 1
+        elif reading.clock == previous.clock:
+            last_seen = reading
+            continue
+
+        last_seen = reading
+
+        # a clock before the start of its period, or in a period without a clock, is
+        # a misread
+        if reading_period not in _CLOCK_PERIOD_START_MINUTES:
+            continue
+
+        clock = reading.clock - _CLOCK_PERIOD_START_MINUTES[reading_period] * 60
+
+        if clock < 0:
+            continue
+
+        period = reading_period
+        previous = reading
+
+        if len(anchors) > 0 and anchors[-1].period == period:
+            last_anchor = anchors[-1]
+            expected_clock = last_anchor.clock + (
+                reading.video_time - last_anchor.video_time
+            )
+
+            if abs(clock - expected_clock) <= drift_threshold:
+                continue
+
+        anchors.append(Anchor(period, float(clock), reading.video_time))
+
+    return anchors
+
+
+def detect_clock_anchors(
+    video_path: str,
+    region: Tuple[int, int, int, int],
+    sample_interval: float = 1.0,
+    drift_threshold: float = 2.0,
+    max_workers: int = 1,
+) -> List[Anchor]:
+    """Read the match clock shown on screen and turn it into anchors.
+
+    Args:
+        video_path: The path to a video.
+        region: The x, y, width and height in pixels of the part of the frame that
+            shows the clock.
+        sample_interval: The seconds between frames that are read.
+        drift_threshold: The most seconds the clock may drift before an anchor is
+            added.
+        max_workers: The most parts of the video to read at once.
+
+    Returns:
+        The anchors in order of video time, to check and write with write_anchors.
+    """
+    readings = read_match_clock(
+        video_path, region, sample_interval=sample_interval, max_workers=max_workers
+    )
+
+    return clock_anchors(readings, drift_threshold=drift_threshold)
+
+
+def _read_chunk_clock(
+    video_path: str,
+    region: Tuple[int, int, int, int],
+    start_time: float,
+    end_time: float,
+    sample_interval: float,
+) -> List[ClockReading]:
+    """Read the match clock in part of a video.
+
+    Args:
+        video_path: The path to a video.
+        region: The x, y, width and height of the clock.
+        start_time: The start of the part in seconds since video start.
+        end_time: The end of the part in seconds since video start.
+        sample_interval: The seconds between frames that are read.
+
+    Returns:
+        A reading for each sampled frame.
+
+    Raises:
+        ValueError: The frames could not be written or read.
+    """
+    with TemporaryDirectory() as directory:
+        result = commands.run_command(
+            _sample_clock_command(
+                video_path, region, start_time, end_time, sample_interval, directory
+            ),
+            "sample_clock",
+            [directory],
+        )
+
+        if result.returncode != 0:
+            raise ValueError(f"Unable to sample the clock of {video_path}")
+
+        frame_paths = sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.endswith(".png")
+        )
+
+        if len(frame_paths) == 0:
+            return []
+
+        frames_path = os.path.join(directory, "frames.txt")
+
+        with open(frames_path, "w") as frames_file:
+            frames_file.write("\n".join(frame_paths) + "\n")
+
+        result = commands.run_command(
+            _ocr_command(frames_path), "ocr_clock", universal_newlines=True
+        )
+
+    # tesseract ends the text of each image with a form feed
+    texts = result.stdout.split("\f")[: len(frame_paths)]
+
+    if result.returncode != 0 or len(texts) != len(frame_paths):
+        raise ValueError(f"Unable to read the clock of {video_path}")
+
+    readings = [
+        ClockReading(start_time + index * sample_interval, parse_clock(text))
+        for index, text in enumerate(texts)
+    ]
+
+    # the last frame of one chunk can be the first of the next
+    return [reading for reading in readings if reading.video_time < end_time]
+
+
+def _consistent_readings(
+    readings: List[ClockReading], drift_threshold: float
+) -> List[ClockReading]:
+    def agree(earlier: ClockReading, later: ClockReading) -> bool:
+        drift = (later.clock - earlier.clock) - (later.video_time - earlier.video_time)
+        return abs(drift) <= drift_threshold
+
+    return [
+        reading
+        for index, reading in enumerate(readings)
+        if (index > 0 and agree(readings[index - 1], reading))
+        or (index < len(readings) - 1 and agree(reading, readings[index + 1]))
+    ]
+
+
+def _read_duration(video_path: str) -> float:
+    """Read the duration of a video.
+
+    Args:
+        video_path: The path to a video.
+
+    Returns:
+        The duration in seconds.
+
+    Raises:
+        ValueError: The duration could not be read.
+    """
+    result = commands.run_command(
+        [
+            "ffprobe",
+            "-v",
+            "quiet",
+            "-print_format",
+            "json",
+            "-show_error",
+            "-show_entries",
+            "format=duration",
+            video_path,
+        ],
+        "read_duration",
+    )
+    probe = json.loads(result.stdout)
+
+    if "error" in probe or "duration" not in probe.get("format", {}):
+        raise ValueError(f"Unable to read the duration of {video_path}")
+
+    return float(probe["format"]["duration"])
+
+
+def _sample_clock_command(
+    video_path: str,
+    region: Tuple[int, int, int, int],
+    start_time: float,
+    end_time: float,
+    sample_interval: float,
+    output_directory: str,
+) -> List[str]:
+    """Get the ffmpeg command that writes the clock region of sampled frames.
+
+    Args:
+        video_path: The path to a video.
+        region: The x, y, width and height of the clock.
+        start_time: The start of the part to sample in seconds since video start.
+        end_time: The end of the part to sample in seconds since video start.
+        sample_interval: The seconds between sampled frames.
+        output_directory: The directory to write the images to.
+
+    Returns:
+        The ffmpeg command.
+    """
+    x, y, width, height = region
+
+    return [
+        "ffmpeg",
+        "-y",
+        "-ss",
+        f"{start_time:0.6f}",
+        "-t",
+        f"{end_time - start_time:0.6f}",
+        "-an",
+        "-sn",
+        "-dn",
+        "-i",
+        video_path,
+        "-vf",
+        f"fps=1/{sample_interval:g},crop={width}:{height}:{x}:{y},"
+        f"scale=iw*{_OCR_SCALE}:ih*{_OCR_SCALE},format=gray",
+        "-start_number",
+        "0",
+        os.path.join(output_directory, "frame_%06d.png"),
+    ]
+
+
+def _ocr_command(frames_path: str) -> List[str]:
+    """Get the tesseract command that reads the clock in each image of a list.
+
+    Args:
+        frames_path: The path to a file with the path of an image on each line.
+
+    Returns:
+        The tesseract command.
+    """
+    return [
+        "tesseract",
+        frames_path,
+        "stdout",
+        "--dpi",
+        "300",
+        "--psm",
+        "7",
+        "-c",
+        "tessedit_char_whitelist=0123456789:",
+    ]
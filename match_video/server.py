@@ -0,0 +1,386 @@
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import match_video.commands as commands
+import match_video.utils as utils
+from match_video.cache import ClipCache
+
+# the most bytes of JSON accepted in a request body
+_MAX_BODY_BYTES = 1024 * 1024
+
+
+class HTTPError(Exception):
+    """An error to send to the client with an HTTP status code.
+
+    Args:
+        status: The HTTP status code.
+        message: A description of the error.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ClipService:
+    """Extract clips and read anchors for HTTP requests.
+
+    Clips are extracted by a bounded pool of workers, and identical requests that
+    arrive while a clip is being extracted wait for that extraction instead of
+    starting their own.
+
+    Args:
+        video_root: The directory videos are served from. Requests can't reach videos
+            outside of it.
+        max_workers: The most clips to extract at once.
+        cache: A cache to keep extracted clips in.
+    """
+
+    def __init__(
+        self, video_root: str, max_workers: int = 1, cache: Optional[ClipCache] = None
+    ):
+        self.video_root = os.path.realpath(video_root)
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1))
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    def video_path(self, name: str) -> str:
+        """Resolve a video name from a request to a path under the video root.
+
+        Args:
+            name: The path to a video relative to the video root.
+
+        Returns:
+            The path to the video.
+
+        Raises:
+            HTTPError: The name is outside the video root or the video doesn't exist.
+        """
+        path = os.path.realpath(os.path.join(self.video_root, name))
+
+        if os.path.commonpath([self.video_root, path]) != self.video_root:
+            raise HTTPError(403, f"{name} is outside the video root")
+
+        if not os.path.isfile(path):
+            raise HTTPError(404, f"{name} not found")
+
+        return path
+
+    def anchors(self, name: str) -> List[dict]:
+        """Read the anchors of a video.
+
+        Args:
+            name: The path to a video relative to the video root.
+
+        Returns:
+            The video's anchors as dictionaries.
+        """
+        anchors = utils.read_anchors(self.video_path(name))
+
+        return [anchor._asdict() for anchor in anchors]
+
+    def clips(self, name: str, clip_clocks: List[dict], smart_cut: bool) -> bytes:
+        """Get clips from a video, sharing the extraction with identical requests.
+
+        Args:
+            name: The path to a video relative to the video root.
+            clip_clocks: A list of clips to select and stitch together, as with
+                get_clips.
+            smart_cut: Start each clip exactly at its start_clock, as with get_clip.
+
+        Returns:
+            The video clips as bytes.
+        """
+        video_path = self.video_path(name)
+        key = (
+            video_path,
+            tuple(
+                (
+                    int(clip_info["period"]),
+                    float(clip_info["start_clock"]),
+                    float(clip_info["end_clock"]),
+                )
+                for clip_info in clip_clocks
+            ),
+            smart_cut,
+        )
+
+        if len(clip_clocks) == 1:
+            clip_info = clip_clocks[0]
+
+            def extract() -> bytes:
+                return utils.get_clip(
+                    video_path,
+                    clip_info["period"],
+                    clip_info["start_clock"],
+                    clip_info["end_clock"],
+                    smart_cut=smart_cut,
+                    cache=self.cache,
+                )
+
+        else:
+
+            def extract() -> bytes:
+                return utils.get_clips(
+                    video_path, clip_clocks, smart_cut=smart_cut, cache=self.cache
+                )
+
+        return self._coalesce(key, extract).result()
+
+    def warm(self) -> int:
+        """Read the anchors of every MP4 under the video root into the anchor cache.
+
+        Returns:
+            The number of videos whose anchors were read.
+        """
+        warmed = 0
+
+        for directory, _, file_names in os.walk(self.video_root):
+            for file_name in file_names:
+                if not file_name.lower().endswith(".mp4"):
+                    continue
+
+                try:
+                    utils.read_anchors(os.path.join(directory, file_name))
+                except ValueError:
+                    continue
+
+                warmed += 1
+
+        return warmed
+
+    def shutdown(self) -> None:
+        """Wait for running extractions to finish and stop the workers."""
+        self._executor.shutdown()
+
+    def _coalesce(self, key: Hashable, extract: Callable[[], bytes]) -> Future:
+        """Start an extraction, or join the identical extraction already running.
+
+        Args:
+            key: Identifies the clips being extracted.
+            extract: A function that extracts the clips.
+
+        Returns:
+            The future result of the extraction.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+
+            if future is not None:
+                return future
+
+            future = self._executor.submit(extract)
+            self._in_flight[key] = future
+
+        # outside the lock, as the callback runs right away if the future is done
+        future.add_done_callback(lambda _: self._forget(key, future))
+
+        return future
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+
+class ClipServer(ThreadingMixIn, HTTPServer):
+    """An HTTP server that handles each request in its own thread.
+
+    Args:
+        address: The (host, port) to listen on.
+        service: The service that handles requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: ClipService):
+        super().__init__(address, ClipRequestHandler)
+        self.service = service
+
+
+class ClipRequestHandler(BaseHTTPRequestHandler):
+    """Handle requests for anchors and clips.
+
+    GET /anchors?video=NAME responds with the video's anchors as JSON.
+    GET /clip?video=NAME&period=P&start_clock=S&end_clock=E responds with a clip.
+    POST /clips with a JSON body of video, clips and optionally smart_cut responds
+    with the clips stitched together, as with get_clips.
+    GET /metrics responds with the totals of the ffmpeg commands run by each stage, as
+    with command_metrics.
+    """
+
+    server: ClipServer
+
+    def do_GET(self) -> None:
+        """Handle a GET request."""
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        def respond() -> None:
+            service = self.server.service
+
+            if url.path == "/anchors":
+                self._send_json(200, service.anchors(_required(query, "video")))
+            elif url.path == "/clip":
+                clip_info = _clip_info(query)
+                smart_cut = query.get("smart_cut", "false").lower() in ("1", "true")
+
+                self._send_video(
+                    service.clips(_required(query, "video"), [clip_info], smart_cut)
+                )
+            elif url.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif url.path == "/metrics":
+                self._send_json(
+                    200,
+                    {
+                        stage: metrics._asdict()
+                        for stage, metrics in commands.command_metrics().items()
+                    },
+                )
+            else:
+                raise HTTPError(404, f"{url.path} not found")
+
+        self._handle(respond)
+
+    def do_POST(self) -> None:
+        """Handle a POST request."""
+
+        def respond() -> None:
+            if urlsplit(self.path).path != "/clips":
+                raise HTTPError(404, f"{self.path} not found")
+
+            length = int(self.headers.get("Content-Length", 0))
+
+            if length > _MAX_BODY_BYTES:
+                raise HTTPError(413, "Request body is too large")
+
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if not isinstance(body, dict):
+                raise HTTPError(400, "The request body must be a JSON object")
+
+            clip_clocks = body.get("clips")
+
+            if not isinstance(clip_clocks, list) or len(clip_clocks) == 0:
+                raise HTTPError(400, "clips must be a non-empty list")
+
+            if not all(isinstance(clip_info, dict) for clip_info in clip_clocks):
+                raise HTTPError(400, "Each clip must be an object")
+
+            video = _required(body, "video")
+
+            if not isinstance(video, str):
+                raise HTTPError(400, "video must be a string")
+
+            self._send_video(
+                self.server.service.clips(
+                    video,
+                    [_clip_info(clip_info) for clip_info in clip_clocks],
+                    bool(body.get("smart_cut", False)),
+                )
+            )
+
+        self._handle(respond)
+
+    def _handle(self, respond: Callable[[], None]) -> None:
+        """Run a response, sending errors to the client as JSON.
+
+        Args:
+            respond: A function that sends the response.
+        """
+        try:
+            respond()
+        except HTTPError as error:
+            self._send_json(error.status, {"error": str(error)})
+        except (KeyError, ValueError) as error:
+            self._send_json(400, {"error": str(error)})
+        except Exception as error:
+            self.log_error("Unable to respond to %s, %r", self.path, error)
+            self._send_json(500, {"error": "Internal server error"})
+
+    def _send_json(self, status: int, content: object) -> None:
+        body = json.dumps(content).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_video(self, video: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(video)))
+        self.end_headers()
+        self.wfile.write(video)
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    video_root: str = ".",
+    max_workers: int = 1,
+    cache: Optional[ClipCache] = None,
+) -> ClipServer:
+    """Create a server for the clips and anchors of the videos in a directory.
+
+    Args:
+        host: The host to listen on.
+        port: The port to listen on, or 0 for any free port.
+        video_root: The directory videos are served from.
+        max_workers: The most clips to extract at once.
+        cache: A cache to keep extracted clips in.
+
+    Returns:
+        The server, which starts handling requests when serve_forever is called.
+    """
+    return ClipServer((host, port), ClipService(video_root, max_workers, cache))
+
+
+def _required(fields: dict, name: str) -> str:
+    """Get a required field from a request.
+
+    Args:
+        fields: The request's query parameters or JSON body.
+        name: The name of the field.
+
+    Returns:
+        The field's value.
+
+    Raises:
+        HTTPError: The field is missing.
+    """
+    if name not in fields:
+        raise HTTPError(400, f"{name} is required")
+
+    return fields[name]
+
+
+def _clip_info(fields: dict) -> dict:
+    """Get a clip's period and clocks from a request.
+
+    Args:
+        fields: The request's query parameters, or a clip object from its JSON body.
+
+    Returns:
+        A clip dictionary, as with get_clips.
+
+    Raises:
+        HTTPError: The period or a clock is missing or isn't a number.
+    """
+    try:
+        return {
+            "period": int(_required(fields, "period")),
+            "start_clock": float(_required(fields, "start_clock")),
+            "end_clock": float(_required(fields, "end_clock")),
+        }
+    except (TypeError, ValueError):
+        raise HTTPError(400, "period, start_clock and end_clock must be numbers")
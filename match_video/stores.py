@@ -0,0 +1,371 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from tempfile import NamedTemporaryFile
+from typing import TYPE_CHECKING, Iterator, List, Optional
+
+from match_video.anchor import Anchor
+
+if TYPE_CHECKING:
+    import sqlite3
+from match_video.cache import LRUCache
+
+# bytes hashed from each end of a video to identify it in a shared index
+_VIDEO_HASH_SAMPLE_BYTES = 1024 * 1024
+
+_video_hash_cache = LRUCache(maxsize=1024)
+
+_default_store: Optional["AnchorStore"] = None
+
+
+class AnchorStore(ABC):
+    """Somewhere to keep the anchors of match videos."""
+
+    @abstractmethod
+    def read(self, video_path: str) -> List[Anchor]:
+        """Read the anchors set for a video.
+
+        Args:
+            video_path: The path to a video.
+
+        Returns:
+            The list of anchors set for the video, which is empty if none are set.
+        """
+
+    @abstractmethod
+    def write(
+        self, input_video_path: str, output_video_path: str, anchors: List[Anchor]
+    ) -> None:
+        """Set the anchors of a video, replacing any existing anchors.
+
+        Args:
+            input_video_path: The path to a video.
+            output_video_path: The path to the video with anchors, which may be the
+                input video.
+            anchors: A list of anchors specifying the start of each half and any
+                discontinuities in the video.
+        """
+
+
+class ChapterStore(AnchorStore):
+    """Keep anchors as chapters in each video's metadata.
+
+    The anchors travel with the video, but reading them runs ffprobe and writing
+    them remuxes the whole video.
+    """
+
+    def read(self, video_path: str) -> List[Anchor]:
+        """Read the anchors from the chapters of a video.
+
+        Args:
+            video_path: The path to a video.
+
+        Returns:
+            The list of anchors set for the video.
+        """
+        import match_video.utils as utils
+
+        return utils._read_chapter_anchors(video_path)
+
+    def write(
+        self, input_video_path: str, output_video_path: str, anchors: List[Anchor]
+    ) -> None:
+        """Write a copy of a video with anchors as its chapters.
+
+        Args:
+            input_video_path: The path to a video.
+            output_video_path: The path to write the video with anchors to.
+            anchors: A list of anchors specifying the start of each half and any
+                discontinuities in the video.
+        """
+        import match_video.utils as utils
+
+        utils._write_chapter_anchors(input_video_path, output_video_path, anchors)
+
+
+class JSONSidecarStore(AnchorStore):
+    """Keep each video's anchors in a JSON file next to it.
+
+    Reading and writing anchors never touches the video, except to copy it when the
+    anchors are written to a different output path.
+
+    Args:
+        suffix: The suffix added to a video's path to get its sidecar path.
+    """
+
+    def __init__(self, suffix: str = ".anchors.json"):
+        self.suffix = suffix
+
+    def sidecar_path(self, video_path: str) -> str:
+        """Get the path of a video's sidecar file.
+
+        Args:
+            video_path: The path to a video.
+
+        Returns:
+            The path the video's anchors are kept at.
+        """
+        return f"{video_path}{self.suffix}"
+
+    def read(self, video_path: str) -> List[Anchor]:
+        """Read the anchors from a video's sidecar file.
+
+        Args:
+            video_path: The path to a video.
+
+        Returns:
+            The list of anchors set for the video, which is empty if it has no
+            sidecar file.
+        """
+        try:
+            with open(self.sidecar_path(video_path)) as sidecar_file:
+                sidecar = json.load(sidecar_file)
+        except FileNotFoundError:
+            return []
+
+        return _anchors_from_json(sidecar["anchors"])
+
+    def write(
+        self, input_video_path: str, output_video_path: str, anchors: List[Anchor]
+    ) -> None:
+        """Write anchors to a video's sidecar file.
+
+        Args:
+            input_video_path: The path to a video.
+            output_video_path: The path to the video with anchors. The input video is
+                copied here if it is a different file.
+            anchors: A list of anchors specifying the start of each half and any
+                discontinuities in the video.
+        """
+        _copy_video(input_video_path, output_video_path)
+
+        sidecar_path = self.sidecar_path(output_video_path)
+
+        with NamedTemporaryFile(
+            "w",
+            dir=os.path.dirname(os.path.abspath(sidecar_path)),
+            prefix=".",
+            suffix=self.suffix,
+            delete=False,
+        ) as sidecar_file:
+            json.dump({"anchors": _anchors_to_json(anchors)}, sidecar_file)
+
+        os.replace(sidecar_file.name, sidecar_path)
+
+
+class SQLiteStore(AnchorStore):
+    """Keep the anchors of many videos in a shared SQLite database.
+
+    Videos are identified by a hash of their contents rather than their path, so
+    anchors follow a video when it is moved, renamed or copied to another machine.
+    Each thread keeps its own connection, so the store can be shared by threads and
+    processes.
+
+    Args:
+        database_path: The path to the database, which is created if it does not
+            exist.
+    """
+
+    def __init__(self, database_path: str):
+        self.database_path = database_path
+        self._connections = threading.local()
+
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS anchors ("
+                "video_hash TEXT PRIMARY KEY, video_path TEXT, anchors TEXT)"
+            )
+
+    def read(self, video_path: str) -> List[Anchor]:
+        """Look up the anchors of a video in the database.
+
+        Args:
+            video_path: The path to a video.
+
+        Returns:
+            The list of anchors set for the video, which is empty if the video is
+            not in the database.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT anchors FROM anchors WHERE video_hash = ?",
+                (video_hash(video_path),),
+            ).fetchone()
+
+        if row is None:
+            return []
+
+        return _anchors_from_json(json.loads(row[0]))
+
+    def write(
+        self, input_video_path: str, output_video_path: str, anchors: List[Anchor]
+    ) -> None:
+        """Save the anchors of a video in the database.
+
+        Args:
+            input_video_path: The path to a video.
+            output_video_path: The path to the video with anchors. The input video is
+                copied here if it is a different file.
+            anchors: A list of anchors specifying the start of each half and any
+                discontinuities in the video.
+        """
+        _copy_video(input_video_path, output_video_path)
+
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO anchors VALUES (?, ?, ?)",
+                (
+                    video_hash(output_video_path),
+                    os.path.abspath(output_video_path),
+                    json.dumps(_anchors_to_json(anchors)),
+                ),
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator["sqlite3.Connection"]:
+        connection = getattr(self._connections, "connection", None)
+
+        if connection is None:
+            # imported here so reading anchors from other stores doesn't load sqlite3
+            import sqlite3
+
+            connection = sqlite3.connect(self.database_path, timeout=30)
+            self._connections.connection = connection
+
+        with connection:
+            yield connection
+
+
+def open_store(name: str) -> AnchorStore:
+    """Get an anchor store by name.
+
+    Args:
+        name: chapters, json, or sqlite:PATH for a database at PATH.
+
+    Returns:
+        The anchor store.
+
+    Raises:
+        ValueError: The name is not a known kind of store.
+    """
+    if name == "chapters":
+        return ChapterStore()
+
+    if name == "json":
+        return JSONSidecarStore()
+
+    if name.startswith("sqlite:") and len(name) > len("sqlite:"):
+        return SQLiteStore(name[len("sqlite:") :])
+
+    raise ValueError(f"{name} is not chapters, json or sqlite:PATH")
+
+
+def get_default_store() -> AnchorStore:
+    """Get the store used when read_anchors and write_anchors aren't given one.
+
+    Returns:
+        The store set with set_default_store, or else the store named by the
+        MATCH_VIDEO_ANCHOR_STORE environment variable, which defaults to chapters.
+    """
+    global _default_store
+
+    if _default_store is None:
+        _default_store = open_store(
+            os.environ.get("MATCH_VIDEO_ANCHOR_STORE", "chapters")
+        )
+
+    return _default_store
+
+
+def set_default_store(store: Optional[AnchorStore]) -> None:
+    """Set the store used when read_anchors and write_anchors aren't given one.
+
+    Args:
+        store: The anchor store, or None to go back to the store named by the
+            MATCH_VIDEO_ANCHOR_STORE environment variable.
+    """
+    global _default_store
+
+    _default_store = store
+
+
+def migrate_anchors(
+    video_path: str, source: AnchorStore, target: AnchorStore
+) -> List[Anchor]:
+    """Copy a video's anchors from one store to another.
+
+    Args:
+        video_path: The path to a video.
+        source: The store to read the anchors from.
+        target: The store to write the anchors to.
+
+    Returns:
+        The anchors that were copied.
+    """
+    anchors = source.read(video_path)
+    target.write(video_path, video_path, anchors)
+
+    return anchors
+
+
+def video_hash(video_path: str) -> str:
+    """Identify a video by its contents.
+
+    Only the size and the first and last megabyte of the video are hashed, which is
+    enough to tell match videos apart without reading gigabytes. Hashes are cached in
+    memory by the video's path, size and modification time.
+
+    Args:
+        video_path: The path to a video.
+
+    Returns:
+        A hex digest of the video's size and the bytes at each end.
+    """
+    stat = os.stat(video_path)
+    cache_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    cached_hash = _video_hash_cache.get(cache_key)
+
+    if cached_hash is not None:
+        return cached_hash
+
+    size = stat.st_size
+    digest = hashlib.sha1(str(size).encode())
+
+    with open(video_path, "rb") as video_file:
+        digest.update(video_file.read(_VIDEO_HASH_SAMPLE_BYTES))
+
+        if size > _VIDEO_HASH_SAMPLE_BYTES:
+            video_file.seek(size - _VIDEO_HASH_SAMPLE_BYTES)
+            digest.update(video_file.read(_VIDEO_HASH_SAMPLE_BYTES))
+
+    _video_hash_cache.put(cache_key, digest.hexdigest())
+
+    return digest.hexdigest()
+
+
+def _copy_video(input_video_path: str, output_video_path: str) -> None:
+    if os.path.exists(output_video_path) and os.path.samefile(
+        input_video_path, output_video_path
+    ):
+        return
+
+    shutil.copy2(input_video_path, output_video_path)
+
+
+def _anchors_to_json(anchors: List[Anchor]) -> List[dict]:
+    return [anchor._asdict() for anchor in anchors]
+
+
+def _anchors_from_json(anchors_json: List[dict]) -> List[Anchor]:
+    anchors = [
+        Anchor(
+            int(anchor["period"]), float(anchor["clock"]), float(anchor["video_time"])
+        )
+        for anchor in anchors_json
+    ]
+
+    return sorted(anchors, key=lambda anchor: anchor.video_time)
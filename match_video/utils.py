@@ -1,108 +1,191 @@
 import json
+import logging
 import os
 import shutil
 import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from operator import attrgetter
-from tempfile import NamedTemporaryFile
-from typing import Iterator, List, Tuple
+from tempfile import NamedTemporaryFile, TemporaryFile
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union, cast
 
-from match_video.anchor import Anchor
+import match_video.commands as commands
+import match_video.keyframes as keyframes
+from match_video.anchor import Anchor, AnchorTimeline
+from match_video.cache import CacheInfo, ClipCache, LRUCache
+from match_video.stores import AnchorStore, get_default_store
+
+CoalescedClips = namedtuple("CoalescedClips", ["clip_clocks", "seconds_saved"])
+
+logger = logging.getLogger(__name__)
+
+_anchor_cache = LRUCache(maxsize=128)
+
+# the encoder for the head of a smart cut, and the bitstream filter that repeats
+# parameter sets in its stream copied tail, for each video codec
+_SMART_CUT_VIDEO_CODECS = {
+    "h264": ("libx264", "h264_mp4toannexb"),
+    "hevc": ("libx265", "hevc_mp4toannexb"),
+}
+
+# audio codecs whose ffmpeg encoder isn't named after the codec
+_SMART_CUT_AUDIO_ENCODERS = {
+    "mp3": "libmp3lame",
+    "opus": "libopus",
+    "vorbis": "libvorbis",
+}
+
+# shorter than any frame, and longer than the rounding in ffprobe's timestamps
+_KEYFRAME_TOLERANCE = 0.0005
+
+# lets MP4s be written to a pipe, which can't seek back to write the index
+_FRAGMENTED_MP4_ARGS = ["-movflags", "frag_keyframe+empty_moov", "-f", "mp4"]
+
+# stream copies a concatenation, leaving out the source's anchors as with _extract_clip
+_CONCAT_OUTPUT_ARGS = [
+    "-map",
+    "0",
+    "-map",
+    "-0:d?",
+    "-c",
+    "copy",
+    "-map_chapters",
+    "-1",
+]
+
+# the file extension of the segments of each HLS segment type
+_HLS_SEGMENT_EXTENSIONS = {"mpegts": ".ts", "fmp4": ".m4s"}
+
+# ffmpeg's cost per packet grows with its number of outputs, so single pass
+# extraction caps the clips handled by each process
+_SINGLE_PASS_BATCH_SIZE = 8
 
 
 def write_anchors(
-    input_video_path: str, output_video_path: str, anchors: List[Anchor]
+    input_video_path: str,
+    output_video_path: str,
+    anchors: List[Anchor],
+    store: Optional[AnchorStore] = None,
 ) -> None:
     """Write anchors to a video file.
 
-    Anchors are written as chapters in the video's metadata. Any existing anchors will
-    be overwritten.
+    By default anchors are written as chapters in the video's metadata. Any existing
+    anchors will be overwritten.
 
     Args:
         input_video_path: The path to a video.
         output_video_path: The path to write the video with anchors to.
         anchors: A list of anchors specifying the start of each half and any
             discontinuities in the video.
+        store: Where to keep the anchors. Defaults to the store from
+            get_default_store.
     """
-    existing_metadata: str
+    if store is None:
+        store = get_default_store()
 
-    with NamedTemporaryFile("r") as existing_metadata_file:
-        subprocess.run(
-            [
-                "ffmpeg",
-                "-y",
-                "-i",
-                input_video_path,
-                "-f",
-                "ffmetadata",
-                existing_metadata_file.name,
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+    store.write(input_video_path, output_video_path, anchors)
 
-        existing_metadata_file.seek(0)
-        existing_metadata = existing_metadata_file.read()
 
-    existing_metadata_without_chapters = (
-        existing_metadata.split("[CHAPTER]")[0].strip()
-        if "[CHAPTER]" in existing_metadata
-        else existing_metadata
-    )
+def read_anchors(video_path: str, store: Optional[AnchorStore] = None) -> List[Anchor]:
+    """Read the anchor points from a video file.
 
-    updated_metadata = existing_metadata_without_chapters
+    By default anchors are read from the video's chapter metadata, which raises a
+    ValueError if the metadata could not be read.
 
-    for anchor in anchors:
-        time = int(anchor.video_time * 1000)
+    Args:
+        video_path: The path to a video.
+        store: Where the anchors are kept. Defaults to the store from
+            get_default_store.
 
-        chapter = f"""
+    Returns:
+        The list of anchors set for the video.
+    """
+    if store is None:
+        store = get_default_store()
 
-[CHAPTER]
-TIMEBASE=1/1000
-START={time}
-END={time + 1}
-title=Period {anchor.period}, {anchor.clock}"""
+    return store.read(video_path)
 
-        updated_metadata += chapter
+
+def anchor_cache_info() -> CacheInfo:
+    """Get statistics for the in-memory cache of anchors read from chapters.
+
+    Returns:
+        The hit and miss counts, maximum size and current size of the cache.
+    """
+    return _anchor_cache.info()
+
+
+def clear_anchor_cache() -> None:
+    """Empty the in-memory cache of anchors read from chapters and reset its stats."""
+    _anchor_cache.clear()
+
+
+def _write_chapter_anchors(
+    input_video_path: str, output_video_path: str, anchors: List[Anchor]
+) -> None:
+    """Write a copy of a video with anchors as its chapters.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_path: The path to write the video with anchors to.
+        anchors: A list of anchors specifying the start of each half and any
+            discontinuities in the video.
+
+    Raises:
+        ValueError: ffmpeg failed to read the video's metadata or to write the new
+            version. A video being updated in place is left untouched.
+    """
+    existing_metadata: str
+
+    with NamedTemporaryFile("r") as existing_metadata_file:
+        result = commands.run_command(
+            _read_metadata_command(input_video_path, existing_metadata_file.name),
+            "read_metadata",
+            [existing_metadata_file.name],
+        )
+
+        if result.returncode != 0:
+            raise ValueError(f"Unable to read the metadata of {input_video_path}")
+
+        existing_metadata_file.seek(0)
+        existing_metadata = existing_metadata_file.read()
+
+    updated_metadata = _metadata_with_anchors(existing_metadata, anchors)
 
     with NamedTemporaryFile("w") as updated_metadata_file:
         updated_metadata_file.write(updated_metadata)
         updated_metadata_file.seek(0)
 
         def write_video_with_metadata(path: str) -> None:
-            subprocess.run(
-                [
-                    "ffmpeg",
-                    "-y",
-                    "-i",
-                    input_video_path,
-                    "-i",
-                    updated_metadata_file.name,
-                    "-map_metadata",
-                    "1",
-                    "-codec",
-                    "copy",
-                    path,
-                ],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+            result = commands.run_command(
+                _write_metadata_command(
+                    input_video_path, updated_metadata_file.name, path
+                ),
+                "write_anchors",
+                [path],
             )
 
-        if os.path.exists(output_video_path) and os.path.samefile(
-            input_video_path, output_video_path
-        ):
-            # ffmpeg can't update video metadata in place, so use an intermediate file
+            # a write cut short, e.g. by a full disk, leaves a file that can't be
+            # played, so it must never replace the video
+            if result.returncode != 0:
+                raise ValueError(f"Unable to write anchors to {output_video_path}")
 
-            with NamedTemporaryFile("w", suffix=".mp4") as intermediate_file:
-                write_video_with_metadata(intermediate_file.name)
-                shutil.copy2(intermediate_file.name, output_video_path)
+        if _is_same_video(input_video_path, output_video_path):
+            with _replacement_video(output_video_path) as replacement_path:
+                write_video_with_metadata(replacement_path)
         else:
             write_video_with_metadata(output_video_path)
 
+    _forget_anchors(output_video_path)
+
 
-def read_anchors(video_path: str) -> List[Anchor]:
+def _read_chapter_anchors(video_path: str) -> List[Anchor]:
     """Read the anchor points from the chapter metadata of a video file.
 
+    Anchors are cached in memory by the video's path, size and modification time, so
+    ffprobe only runs the first time a version of a video is read.
+
     Args:
         video_path: The path to a video.
 
@@ -112,19 +195,16 @@ def read_anchors(video_path: str) -> List[Anchor]:
     Raises:
         ValueError: The video's metadata could not be read.
     """
-    result_json = subprocess.run(
-        [
-            "ffprobe",
-            "-v",
-            "quiet",
-            "-print_format",
-            "json",
-            "-show_error",
-            "-show_chapters",
-            video_path,
-        ],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+    cache_key = _anchor_cache_key(video_path)
+
+    if cache_key is not None:
+        cached_anchors = _anchor_cache.get(cache_key)
+
+        if cached_anchors is not None:
+            return list(cached_anchors)
+
+    result_json = commands.run_command(
+        _read_anchors_command(video_path), "read_anchors"
     )
     result = json.loads(result_json.stdout)
 
@@ -133,6 +213,177 @@ def read_anchors(video_path: str) -> List[Anchor]:
             f"Unable to read the metadata for {video_path}, {result['error']['string']}"
         )
 
+    anchors = _chapters_to_anchors(result["chapters"])
+
+    if cache_key is not None:
+        _anchor_cache.put(cache_key, tuple(anchors))
+
+    return anchors
+
+
+def _read_metadata_command(video_path: str, metadata_path: str) -> List[str]:
+    """Get the ffmpeg command that dumps a video's metadata to a file.
+
+    Args:
+        video_path: The path to a video.
+        metadata_path: The path to write the metadata to in ffmetadata format.
+
+    Returns:
+        The ffmpeg command.
+    """
+    return ["ffmpeg", "-y", "-i", video_path, "-f", "ffmetadata", metadata_path]
+
+
+def _write_metadata_command(
+    input_video_path: str, metadata_path: str, output_video_path: str
+) -> List[str]:
+    """Get the ffmpeg command that copies a video with new metadata.
+
+    Args:
+        input_video_path: The path to a video.
+        metadata_path: The path to the new metadata in ffmetadata format.
+        output_video_path: The path to write the video with the new metadata to.
+
+    Returns:
+        The ffmpeg command.
+    """
+    return [
+        "ffmpeg",
+        "-y",
+        "-i",
+        input_video_path,
+        "-i",
+        metadata_path,
+        "-map_metadata",
+        "1",
+        "-map_chapters",
+        "1",
+        "-codec",
+        "copy",
+        output_video_path,
+    ]
+
+
+def _is_same_video(input_video_path: str, output_video_path: str) -> bool:
+    """Check whether writing to a path would overwrite the input video.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_path: The path to write to.
+
+    Returns:
+        True if both paths are the same file.
+    """
+    return os.path.exists(output_video_path) and os.path.samefile(
+        input_video_path, output_video_path
+    )
+
+
+@contextmanager
+def _replacement_video(video_path: str) -> Iterator[str]:
+    """Get a path to write a new version of a video to, then swap it into place.
+
+    ffmpeg can't update video metadata in place, so the new version is written
+    alongside the video and renamed over it. The rename is atomic, so readers see
+    either the old or the new version, and the video is written once instead of
+    being written to a temporary file and copied back.
+
+    Args:
+        video_path: The path to the video to replace.
+
+    Yields:
+        The path to write the new version of the video to.
+
+    Raises:
+        ValueError: Nothing was written to the replacement path. The video is left
+            untouched, as it is if the caller raises while writing.
+    """
+    directory, name = os.path.split(os.path.abspath(video_path))
+    _, extension = os.path.splitext(name)
+
+    with NamedTemporaryFile(
+        dir=directory, prefix=f".{name}.", suffix=extension, delete=False
+    ) as replacement_file:
+        replacement_path = replacement_file.name
+
+    try:
+        yield replacement_path
+
+        if os.path.getsize(replacement_path) == 0:
+            raise ValueError(f"Unable to write a new version of {video_path}")
+
+        shutil.copymode(video_path, replacement_path)
+        os.replace(replacement_path, video_path)
+    finally:
+        if os.path.exists(replacement_path):
+            os.remove(replacement_path)
+
+
+def _metadata_with_anchors(existing_metadata: str, anchors: List[Anchor]) -> str:
+    """Replace the chapters in a video's metadata with anchors.
+
+    Args:
+        existing_metadata: The video's metadata in ffmetadata format.
+        anchors: The anchors to write as chapters.
+
+    Returns:
+        The updated metadata in ffmetadata format.
+    """
+    existing_metadata_without_chapters = (
+        existing_metadata.split("[CHAPTER]")[0].strip()
+        if "[CHAPTER]" in existing_metadata
+        else existing_metadata
+    )
+
+    updated_metadata = existing_metadata_without_chapters
+
+    for anchor in anchors:
+        time = int(anchor.video_time * 1000)
+
+        chapter = f"""
+
+[CHAPTER]
+TIMEBASE=1/1000
+START={time}
+END={time + 1}
+title=Period {anchor.period}, {anchor.clock}"""
+
+        updated_metadata += chapter
+
+    return updated_metadata
+
+
+def _read_anchors_command(video_path: str) -> List[str]:
+    """Get the ffprobe command that prints a video's chapters as JSON.
+
+    Args:
+        video_path: The path to a video.
+
+    Returns:
+        The ffprobe command.
+    """
+    return [
+        "ffprobe",
+        "-v",
+        "quiet",
+        "-print_format",
+        "json",
+        "-show_error",
+        "-show_chapters",
+        video_path,
+    ]
+
+
+def _chapters_to_anchors(chapters: List[dict]) -> List[Anchor]:
+    """Convert chapters printed by ffprobe into anchors.
+
+    Args:
+        chapters: The chapters from ffprobe's JSON output.
+
+    Returns:
+        The anchor stored in each chapter.
+    """
+
     def get_anchor(chapter: dict) -> Anchor:
         period_str, clock_str = chapter["tags"]["title"].split(", ")
         period = int(period_str.split("Period ")[-1])
@@ -142,13 +393,26 @@ def read_anchors(video_path: str) -> List[Anchor]:
 
         return Anchor(period, clock, video_time)
 
-    anchors = [get_anchor(chapter) for chapter in result["chapters"]]
+    return [get_anchor(chapter) for chapter in chapters]
 
-    return anchors
+
+def _forget_anchors(video_path: str) -> None:
+    """Remove a video's entries from the in-memory anchor cache.
+
+    Args:
+        video_path: The path to a video.
+    """
+    video_abspath = os.path.abspath(video_path)
+    _anchor_cache.discard(lambda key: key[0] == video_abspath)
 
 
 def get_clip(
-    video_path: str, period: int, start_clock: float, end_clock: float
+    video_path: str,
+    period: int,
+    start_clock: float,
+    end_clock: float,
+    smart_cut: bool = False,
+    cache: Optional[ClipCache] = None,
 ) -> bytes:
     """Get a clip from a match by period and clock.
 
@@ -157,13 +421,18 @@ def get_clip(
         period: The period of the match the clip is in.
         start_clock: The start of the clip in seconds since the start of the period.
         end_clock: The end of the clip in seconds since the start of the period.
+        smart_cut: Start the clip exactly at start_clock by re-encoding the footage
+            before its first keyframe. Otherwise the clip starts at the keyframe
+            before start_clock.
+        cache: A cache to look the clip up in before extracting it, and to keep the
+            clip in after it is extracted.
 
     Returns:
         The video clip as bytes.
 
     Raises:
-        ValueError: The video does not have anchors or the clips is before the first
-            anchor in its period.
+        ValueError: The video does not have anchors, the clips is before the first
+            anchor in its period, or ffmpeg failed to extract it.
     """
     anchors = read_anchors(video_path)
 
@@ -174,213 +443,1279 @@ def get_clip(
         anchors, period, start_clock, end_clock
     )
 
-    clip: bytes
-
-    with _video_sans_chapters(video_path) as video_sans_chapters_path:
-        with NamedTemporaryFile("rb", suffix=".mp4") as clip_file:
-            _extract_clip(
-                video_sans_chapters_path,
-                clip_file.name,
-                start_video_time,
-                end_video_time,
-            )
-
-            clip = clip_file.read()
-
-    return clip
+    extract_clip = _smart_cut_clip if smart_cut else _extract_clip
+
+    return _read_clip(
+        video_path,
+        lambda path: extract_clip(video_path, path, start_video_time, end_video_time),
+        cache,
+        lambda clip_cache: clip_cache.clip_name(
+            anchors,
+            [{"period": period, "start_clock": start_clock, "end_clock": end_clock}],
+            {"method": "get_clip", "smart_cut": smart_cut},
+        ),
+    )
 
 
-def get_clips(video_path: str, clip_clocks: List[dict]) -> bytes:
+def get_clips(
+    video_path: str,
+    clip_clocks: List[dict],
+    max_workers: int = 1,
+    smart_cut: bool = False,
+    merge_gap: Optional[float] = None,
+    cache: Optional[ClipCache] = None,
+) -> bytes:
     """Get clips from a match by period and clock.
 
+    Unless they are smart cut, the clips are read straight from the video and stitched
+    together by one ffmpeg process, without extracting each clip to its own file.
+
     Args:
         video_path: The path to a video.
         clip_clocks: A list of clips to select and stitch together. Each clip
             dictionary should have a period, start_clock, and end_clock. These values
             are the same as with get_clip.
+        max_workers: The most ffmpeg processes to extract smart cuts with at once.
+        smart_cut: Start each clip exactly at its start_clock, as with get_clip.
+        merge_gap: Merge clips in the same period that overlap or are at most this
+            many seconds apart, so no footage is extracted twice. Merging sorts the
+            clips into match order. Clips are not merged if this is None.
+        cache: A cache to look the clips up in before extracting them, and to keep
+            the clips in after they are extracted.
 
     Returns:
         The video clips as bytes.
 
     Raises:
-        ValueError: The video does not have anchors or one of the clips is before the
-            first anchor in its period.
+        ValueError: The video does not have anchors, one of the clips is before the
+            first anchor in its period, or ffmpeg failed to extract the clips.
     """
     anchors = read_anchors(video_path)
 
     if len(anchors) == 0:
         raise ValueError(f"{video_path} has no set anchors")
 
-    clip_files: List
+    clip_clocks = _merged_clip_clocks(clip_clocks, merge_gap)
+    video_times = _get_clip_video_times(anchors, clip_clocks)
+
+    def write_clips_to(path: str) -> None:
+        with _clips_concat_list(
+            video_path, video_times, max_workers, smart_cut
+        ) as concat_list_path:
+            _concat(concat_list_path, path)
+
+    return _read_clip(
+        video_path,
+        write_clips_to,
+        cache,
+        lambda clip_cache: clip_cache.clip_name(
+            anchors, clip_clocks, {"method": "get_clips", "smart_cut": smart_cut}
+        ),
+    )
 
-    with _video_sans_chapters(video_path) as video_sans_chapters_path:
 
-        def create_clip_file(clip_info: dict):
-            clip_file = NamedTemporaryFile("rb", suffix=".mp4")
+def write_clip(
+    video_path: str,
+    period: int,
+    start_clock: float,
+    end_clock: float,
+    output: Union[str, BinaryIO],
+    smart_cut: bool = False,
+) -> None:
+    """Write a clip from a match by period and clock to a file.
 
-            start_video_time, end_video_time = _get_video_times(
-                anchors,
-                clip_info["period"],
-                clip_info["start_clock"],
-                clip_info["end_clock"],
-            )
+    Unlike get_clip, the clip is never held in memory, so memory use does not grow with
+    the length of the clip.
 
-            _extract_clip(
-                video_sans_chapters_path,
-                clip_file.name,
-                start_video_time,
-                end_video_time,
-            )
+    Args:
+        video_path: The path to a video.
+        period: The period of the match the clip is in.
+        start_clock: The start of the clip in seconds since the start of the period.
+        end_clock: The end of the clip in seconds since the start of the period.
+        output: A path to write the clip to, or a binary file object to copy it to.
+        smart_cut: Start the clip exactly at start_clock, as with get_clip.
 
-            return clip_file
-
-        clip_files = [create_clip_file(clip_info) for clip_info in clip_clocks]
-
-    clips: bytes
-
-    with NamedTemporaryFile("w") as clip_paths_file:
-        clip_paths = "\n".join([f"file '{clip_file.name}'" for clip_file in clip_files])
-        clip_paths_file.write(clip_paths)
-        clip_paths_file.seek(0)
-
-        with NamedTemporaryFile("rb", suffix=".mp4") as clips_file:
-            subprocess.run(
-                [
-                    "ffmpeg",
-                    "-y",
-                    "-f",
-                    "concat",
-                    "-safe",
-                    "0",
-                    "-i",
-                    clip_paths_file.name,
-                    "-c",
-                    "copy",
-                    clips_file.name,
-                ],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
+    Raises:
+        ValueError: The video does not have anchors, the clips is before the first
+            anchor in its period, or ffmpeg failed to extract it.
+    """
+    anchors = read_anchors(video_path)
+
+    if len(anchors) == 0:
+        raise ValueError(f"{video_path} has no set anchors")
+
+    start_video_time, end_video_time = _get_video_times(
+        anchors, period, start_clock, end_clock
+    )
 
-            clips = clips_file.read()
+    extract_clip = _smart_cut_clip if smart_cut else _extract_clip
 
-    for clip_file in clip_files:
-        clip_file.close()
+    _write_output(
+        output,
+        lambda path: extract_clip(video_path, path, start_video_time, end_video_time),
+    )
 
-    return clips
 
+def write_clips(
+    video_path: str,
+    clip_clocks: List[dict],
+    output: Union[str, BinaryIO],
+    max_workers: int = 1,
+    smart_cut: bool = False,
+    merge_gap: Optional[float] = None,
+) -> None:
+    """Write clips from a match by period and clock to a file.
 
-def _get_video_times(
-    anchors: List[Anchor], period: int, start_clock: float, end_clock: float
-) -> Tuple[float, float]:
-    """Convert period and match clocks into video times.
+    Unlike get_clips, the clips are never held in memory, so memory use does not grow
+    with the length of the clips.
 
     Args:
-        anchors: A video's anchors.
-        period: The period of the match.
-        start_clock: A time since the start of the period.
-        end_clock: A time since the start of the period.
-
-    Returns:
-        A pair, (start_video_time, end_video_time), that correspond to start_clock and
-        end_clock in video time.
+        video_path: The path to a video.
+        clip_clocks: A list of clips to select and stitch together, as with
+            get_clips.
+        output: A path to write the clips to, or a binary file object to copy them
+            to.
+        max_workers: The most ffmpeg processes to extract smart cuts with at once.
+        smart_cut: Start each clip exactly at its start_clock, as with get_clip.
+        merge_gap: Merge clips that are close together, as with get_clips.
 
     Raises:
-        ValueError: There are no anchors in the period before start_clock.
-    """
-    prior_anchors = sorted(
-        [
-            anchor
-            for anchor in anchors
-            if anchor.period == period and anchor.clock <= start_clock
-        ],
-        key=attrgetter("clock"),
-    )
-
-    if len(prior_anchors) == 0:
-        minute = int(start_clock / 60)
-        second = int(start_clock % 60)
+        ValueError: The video does not have anchors, one of the clips is before the
+            first anchor in its period, or ffmpeg failed to extract the clips.
+    """
+    anchors = read_anchors(video_path)
 
-        raise ValueError(
-            f"No anchors set in period {period} before {minute}:{second:02}"
-        )
+    if len(anchors) == 0:
+        raise ValueError(f"{video_path} has no set anchors")
 
-    last_anchor = prior_anchors[-1]
-    start_offset = start_clock - last_anchor.clock
-    start_video_time = last_anchor.video_time + start_offset
+    clip_clocks = _merged_clip_clocks(clip_clocks, merge_gap)
+    video_times = _get_clip_video_times(anchors, clip_clocks)
 
-    duration = end_clock - start_clock
-    end_video_time = start_video_time + duration
+    with _clips_concat_list(
+        video_path, video_times, max_workers, smart_cut
+    ) as concat_list_path:
+        _write_output(output, lambda path: _concat(concat_list_path, path))
 
-    return start_video_time, end_video_time
 
+def stream_clip(
+    video_path: str,
+    period: int,
+    start_clock: float,
+    end_clock: float,
+    chunk_size: int = 64 * 1024,
+) -> Iterator[bytes]:
+    """Stream a clip from a match by period and clock.
 
-@contextmanager
-def _video_sans_chapters(video_path: str) -> Iterator[str]:
-    """Create a copy of a video without its chapters.
+    The clip is a fragmented MP4 piped from ffmpeg, so it can be sent as it is
+    extracted, e.g. as a chunked HTTP response. If ffmpeg fails, a ValueError is
+    raised when the stream ends.
 
     Args:
         video_path: The path to a video.
+        period: The period of the match the clip is in.
+        start_clock: The start of the clip in seconds since the start of the period.
+        end_clock: The end of the clip in seconds since the start of the period.
+        chunk_size: The most bytes to read from ffmpeg at a time.
 
-    Yields:
-        The path to the copied video file without chapters.
-    """
-    with NamedTemporaryFile("rb", suffix=".mp4") as video_sans_chapters_file:
-        subprocess.run(
-            [
-                "ffmpeg",
-                "-y",
-                "-i",
-                video_path,
-                "-map",
-                "0",
-                "-vcodec",
-                "copy",
-                "-acodec",
-                "copy",
-                "-map_chapters",
-                "-1",
-                video_sans_chapters_file.name,
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
+    Returns:
+        An iterator over chunks of the clip.
+
+    Raises:
+        ValueError: The video does not have anchors or the clips is before the first
+            anchor in its period.
+    """
+    anchors = read_anchors(video_path)
+
+    if len(anchors) == 0:
+        raise ValueError(f"{video_path} has no set anchors")
 
-        yield video_sans_chapters_file.name
+    start_video_time, end_video_time = _get_video_times(
+        anchors, period, start_clock, end_clock
+    )
 
+    return _stream_output(
+        ["ffmpeg", "-y"]
+        + _clip_input_args(video_path, start_video_time, end_video_time)
+        + _clip_output_args(0)
+        + _FRAGMENTED_MP4_ARGS
+        + ["pipe:1"],
+        chunk_size,
+        "stream_clip",
+    )
 
-def _extract_clip(
-    input_video_path: str, output_video_path: str, start_time: float, end_time: float
-) -> None:
-    """Extract a clip from input_video_path and write it to output_video_path.
 
-    Output can be incorrect if input_video_path has chapters. Use _video_sans_chapters
-    to copy the video file without chapters before using this method.
+def stream_clips(
+    video_path: str,
+    clip_clocks: List[dict],
+    max_workers: int = 1,
+    smart_cut: bool = False,
+    chunk_size: int = 64 * 1024,
+    merge_gap: Optional[float] = None,
+) -> Iterator[bytes]:
+    """Stream clips from a match by period and clock.
+
+    The clips are stitched together into a fragmented MP4 piped from ffmpeg when
+    iteration starts. If ffmpeg fails, a ValueError is raised when the stream ends.
 
     Args:
-        input_video_path: The path to a video.
-        output_video_path: The path to write the video with anchors to.
-        start_time: The start of the clip in seconds since video start.
-        end_time: The end of the clip in seconds since video start.
+        video_path: The path to a video.
+        clip_clocks: A list of clips to select and stitch together, as with
+            get_clips.
+        max_workers: The most ffmpeg processes to extract smart cuts with at once.
+        smart_cut: Start each clip exactly at its start_clock, as with get_clip.
+        chunk_size: The most bytes to read from ffmpeg at a time.
+        merge_gap: Merge clips that are close together, as with get_clips.
+
+    Returns:
+        An iterator over chunks of the clips.
+
+    Raises:
+        ValueError: The video does not have anchors or one of the clips is before the
+            first anchor in its period.
     """
-    subprocess.run(
-        [
-            "ffmpeg",
-            "-y",
-            "-ss",
-            f"{start_time:0.2f}",
-            "-to",
-            f"{end_time:0.2f}",
-            "-i",
-            input_video_path,
-            "-map",
-            "0",
-            "-vcodec",
-            "copy",
-            "-acodec",
-            "copy",
-            output_video_path,
-        ],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
+    anchors = read_anchors(video_path)
+
+    if len(anchors) == 0:
+        raise ValueError(f"{video_path} has no set anchors")
+
+    clip_clocks = _merged_clip_clocks(clip_clocks, merge_gap)
+    video_times = _get_clip_video_times(anchors, clip_clocks)
+
+    def stream() -> Iterator[bytes]:
+        with _clips_concat_list(
+            video_path, video_times, max_workers, smart_cut
+        ) as concat_list_path:
+            yield from _stream_output(
+                ["ffmpeg", "-y"]
+                + _concat_input_args(concat_list_path)
+                + _CONCAT_OUTPUT_ARGS
+                + _FRAGMENTED_MP4_ARGS
+                + ["pipe:1"],
+                chunk_size,
+                "stream_clips",
+            )
+
+    return stream()
+
+
+def write_hls(
+    video_path: str,
+    clip_clocks: List[dict],
+    output_directory: str,
+    segment_duration: float = 6.0,
+    segment_type: str = "mpegts",
+    max_workers: int = 1,
+    smart_cut: bool = False,
+    merge_gap: Optional[float] = None,
+) -> str:
+    """Write clips from a match by period and clock as an HLS playlist and segments.
+
+    The playlist is an event playlist that ffmpeg rewrites as each segment is
+    finished, so a player pointed at it can start playing after the first segment
+    while the rest are written, e.g. with write_hls running in another thread.
+
+    Args:
+        video_path: The path to a video.
+        clip_clocks: A list of clips to select and stitch together, as with
+            get_clips.
+        output_directory: The directory to write the playlist and segments to. It is
+            created if it doesn't exist.
+        segment_duration: The target length of each segment in seconds. Segments are
+            cut at keyframes, so they can be longer.
+        segment_type: "mpegts" for MPEG-TS segments, which any HLS player can play, or
+            "fmp4" for fragmented MP4 segments.
+        max_workers: The most ffmpeg processes to extract smart cuts with at once.
+        smart_cut: Start each clip exactly at its start_clock, as with get_clip.
+        merge_gap: Merge clips that are close together, as with get_clips.
+
+    Returns:
+        The path to the playlist, index.m3u8 in output_directory.
+
+    Raises:
+        ValueError: The video does not have anchors, one of the clips is before the
+            first anchor in its period, segment_type is unknown, or ffmpeg failed to
+            write the playlist.
+    """
+    if segment_type not in _HLS_SEGMENT_EXTENSIONS:
+        raise ValueError(f"Unknown HLS segment type {segment_type}")
+
+    anchors = read_anchors(video_path)
+
+    if len(anchors) == 0:
+        raise ValueError(f"{video_path} has no set anchors")
+
+    clip_clocks = _merged_clip_clocks(clip_clocks, merge_gap)
+    video_times = _get_clip_video_times(anchors, clip_clocks)
+
+    os.makedirs(output_directory, exist_ok=True)
+    playlist_path = os.path.join(output_directory, "index.m3u8")
+
+    with _clips_concat_list(
+        video_path, video_times, max_workers, smart_cut
+    ) as concat_list_path:
+        result = commands.run_command(
+            ["ffmpeg", "-y"]
+            + _concat_input_args(concat_list_path)
+            + _CONCAT_OUTPUT_ARGS
+            + _hls_output_args(output_directory, segment_duration, segment_type)
+            + [playlist_path],
+            "write_hls",
+            [output_directory],
+        )
+
+    if result.returncode != 0:
+        raise ValueError(
+            f"Unable to write an HLS playlist to {output_directory},"
+            f" {commands.failure_reason(result.stderr)}"
+        )
+
+    return playlist_path
+
+
+def export_clips(
+    video_path: str,
+    clip_clocks: List[dict],
+    output_video_paths: List[str],
+    single_pass: bool = False,
+    max_workers: int = 1,
+    smart_cut: bool = False,
+) -> None:
+    """Write clips from a match to separate files by period and clock.
+
+    Args:
+        video_path: The path to a video.
+        clip_clocks: A list of clips to select. Each clip dictionary should have a
+            period, start_clock, and end_clock. These values are the same as with
+            get_clip.
+        output_video_paths: The path to write each clip to, in the same order as
+            clip_clocks.
+        single_pass: Extract several clips with each ffmpeg process instead of one
+            process per clip. This saves process startup, which dominates the cost of
+            short clips.
+        max_workers: The most ffmpeg processes to extract clips with at once.
+        smart_cut: Start each clip exactly at its start_clock, as with get_clip.
+
+    Raises:
+        ValueError: The video does not have anchors, one of the clips is before the
+            first anchor in its period, or there is not one output path per clip.
+    """
+    if len(output_video_paths) != len(clip_clocks):
+        raise ValueError(
+            f"Got {len(output_video_paths)} output paths for {len(clip_clocks)} clips"
+        )
+
+    anchors = read_anchors(video_path)
+
+    if len(anchors) == 0:
+        raise ValueError(f"{video_path} has no set anchors")
+
+    video_times = _get_clip_video_times(anchors, clip_clocks)
+
+    _extract_clips_in_pool(
+        video_path,
+        output_video_paths,
+        video_times,
+        single_pass,
+        max_workers,
+        smart_cut,
+    )
+
+
+def coalesce_clip_clocks(clip_clocks: List[dict], gap: float = 0.0) -> CoalescedClips:
+    """Merge clips that are close together and measure the extraction saved.
+
+    Args:
+        clip_clocks: A list of clip dictionaries, as with get_clips.
+        gap: The longest time in seconds between two clips that are merged, as with
+            merge_clip_clocks.
+
+    Returns:
+        The merged clips, and the seconds of footage that no longer need to be
+        extracted. The saving is negative if merging clips across gaps adds more
+        footage than overlaps remove.
+    """
+    merged_clip_clocks = merge_clip_clocks(clip_clocks, gap)
+
+    def duration(clip_info: dict) -> float:
+        return max(clip_info["end_clock"] - clip_info["start_clock"], 0.0)
+
+    seconds_saved = sum(map(duration, clip_clocks)) - sum(
+        map(duration, merged_clip_clocks)
+    )
+
+    return CoalescedClips(merged_clip_clocks, seconds_saved)
+
+
+def merge_clip_clocks(clip_clocks: List[dict], gap: float = 0.0) -> List[dict]:
+    """Merge clips that overlap or are close together in the same period.
+
+    Args:
+        clip_clocks: A list of clip dictionaries, as with get_clips.
+        gap: The longest time in seconds between two clips that are merged. Clips
+            that overlap or touch are always merged.
+
+    Returns:
+        The merged clips, sorted by period and start_clock.
+    """
+    merged: List[dict] = []
+
+    for clip_info in sorted(
+        clip_clocks,
+        key=lambda clip_info: (clip_info["period"], clip_info["start_clock"]),
+    ):
+        previous = merged[-1] if merged else None
+
+        if (
+            previous is not None
+            and previous["period"] == clip_info["period"]
+            and clip_info["start_clock"] - previous["end_clock"] <= gap
+        ):
+            previous["end_clock"] = max(previous["end_clock"], clip_info["end_clock"])
+        else:
+            merged.append(
+                {
+                    "period": clip_info["period"],
+                    "start_clock": clip_info["start_clock"],
+                    "end_clock": clip_info["end_clock"],
+                }
+            )
+
+    return merged
+
+
+def _read_clip(
+    video_path: str,
+    write_clip: Callable[[str], None],
+    cache: Optional[ClipCache],
+    clip_name: Callable[[ClipCache], str],
+) -> bytes:
+    """Read a clip from a cache, or extract it if it isn't cached.
+
+    Args:
+        video_path: The path to the video the clip is from.
+        write_clip: A function that extracts the clip to the path it is given.
+        cache: The cache to keep the clip in, or None to always extract it.
+        clip_name: A function that gets the name the clip is cached under in the
+            cache it is given.
+
+    Returns:
+        The clip as bytes.
+    """
+    if cache is None:
+        with NamedTemporaryFile("rb", suffix=".mp4") as clip_file:
+            write_clip(clip_file.name)
+
+            return clip_file.read()
+
+    clip_path = cache.get_or_create(video_path, clip_name(cache), write_clip)
+
+    with open(clip_path, "rb") as clip_file:
+        return clip_file.read()
+
+
+def _merged_clip_clocks(
+    clip_clocks: List[dict], merge_gap: Optional[float]
+) -> List[dict]:
+    """Merge clips before extraction if a merge gap is set, logging the saving.
+
+    Args:
+        clip_clocks: A list of clip dictionaries, as with get_clips.
+        merge_gap: The longest time in seconds between two clips that are merged, or
+            None to leave the clips as they are.
+
+    Returns:
+        The clips to extract.
+    """
+    if merge_gap is None:
+        return clip_clocks
+
+    coalesced = coalesce_clip_clocks(clip_clocks, merge_gap)
+
+    logger.info(
+        "Merged %d clips into %d, saving %.1f seconds of extraction",
+        len(clip_clocks),
+        len(coalesced.clip_clocks),
+        coalesced.seconds_saved,
+    )
+
+    return coalesced.clip_clocks
+
+
+def _get_clip_video_times(
+    anchors: List[Anchor], clip_clocks: List[dict]
+) -> List[Tuple[float, float]]:
+    """Convert clips selected by period and clock into video times.
+
+    Args:
+        anchors: A video's anchors.
+        clip_clocks: A list of clip dictionaries, as with get_clips.
+
+    Returns:
+        A (start_video_time, end_video_time) pair for each clip.
+    """
+    timeline = AnchorTimeline(anchors)
+
+    return [
+        timeline.clip_video_times(
+            clip_info["period"], clip_info["start_clock"], clip_info["end_clock"]
+        )
+        for clip_info in clip_clocks
+    ]
+
+
+def _get_video_times(
+    anchors: List[Anchor], period: int, start_clock: float, end_clock: float
+) -> Tuple[float, float]:
+    """Convert period and match clocks into video times.
+
+    Args:
+        anchors: A video's anchors.
+        period: The period of the match.
+        start_clock: A time since the start of the period.
+        end_clock: A time since the start of the period.
+
+    Returns:
+        A pair, (start_video_time, end_video_time), that correspond to start_clock and
+        end_clock in video time.
+    """
+    return AnchorTimeline(anchors).clip_video_times(period, start_clock, end_clock)
+
+
+def _anchor_cache_key(video_path: str) -> Optional[Tuple[str, int, int]]:
+    """Get the key that anchors read from a video are cached under.
+
+    Args:
+        video_path: The path to a video.
+
+    Returns:
+        The video's absolute path, size and modification time, or None if the video
+        does not exist.
+    """
+    try:
+        stat = os.stat(video_path)
+    except OSError:
+        return None
+
+    return os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns
+
+
+def _extract_clip(
+    input_video_path: str, output_video_path: str, start_time: float, end_time: float
+) -> None:
+    """Extract a clip from input_video_path and write it to output_video_path.
+
+    Chapters and data streams are left out of the clip. Anchors are stored as chapters,
+    and copying them (or the text track that carries them) into a clip would stretch
+    the clip's duration to the chapter end times.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_path: The path to write the video with anchors to.
+        start_time: The start of the clip in seconds since video start.
+        end_time: The end of the clip in seconds since video start.
+
+    Raises:
+        ValueError: ffmpeg failed to extract the clip.
+    """
+    result = commands.run_command(
+        _extract_clips_command(
+            input_video_path, [output_video_path], [(start_time, end_time)]
+        ),
+        "extract_clip",
+        [output_video_path],
+    )
+
+    if result.returncode != 0:
+        raise ValueError(f"Unable to extract a clip from {input_video_path}")
+
+
+def _extract_clips(
+    input_video_path: str,
+    output_video_paths: List[str],
+    video_times: List[Tuple[float, float]],
+) -> None:
+    """Extract several clips from input_video_path with one ffmpeg process.
+
+    The video is added as an input once per clip, seeking to the clip's start, and each
+    input is copied to its own output. Clips are the same as with _extract_clip.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_paths: The paths to write each clip to.
+        video_times: A (start_time, end_time) pair in video time for each clip.
+
+    Raises:
+        ValueError: ffmpeg failed to extract the clips.
+    """
+    result = commands.run_command(
+        _extract_clips_command(input_video_path, output_video_paths, video_times),
+        "extract_clips",
+        output_video_paths,
+    )
+
+    if result.returncode != 0:
+        raise ValueError(f"Unable to extract clips from {input_video_path}")
+
+
+def _extract_clips_command(
+    input_video_path: str,
+    output_video_paths: List[str],
+    video_times: List[Tuple[float, float]],
+) -> List[str]:
+    """Get the ffmpeg command that extracts clips from input_video_path.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_paths: The paths to write each clip to.
+        video_times: A (start_time, end_time) pair in video time for each clip.
+
+    Returns:
+        The ffmpeg command.
+    """
+    command = ["ffmpeg", "-y"]
+
+    for start_time, end_time in video_times:
+        command += _clip_input_args(input_video_path, start_time, end_time)
+
+    for index, output_video_path in enumerate(output_video_paths):
+        command += _clip_output_args(index) + [output_video_path]
+
+    return command
+
+
+def _smart_cut_clip(
+    input_video_path: str, output_video_path: str, start_time: float, end_time: float
+) -> None:
+    """Extract a clip that starts exactly at start_time at close to stream copy speed.
+
+    Stream copy can only start a clip at a keyframe. A smart cut re-encodes the
+    footage from start_time to the clip's first keyframe to match the video, stream
+    copies the rest, and stitches the two together. Keyframes come from the video's
+    keyframe index, which is built once per video.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_path: The path to write the clip to.
+        start_time: The start of the clip in seconds since video start.
+        end_time: The end of the clip in seconds since video start.
+
+    Raises:
+        ValueError: The video's codec can't be re-encoded to match it, or ffmpeg
+            failed to cut the clip.
+    """
+    index = keyframes.read_keyframe_index(input_video_path)
+
+    if index.video_codec not in _SMART_CUT_VIDEO_CODECS:
+        raise ValueError(f"Smart cuts are not supported for {index.video_codec} video")
+
+    first_keyframe = next(
+        (
+            keyframe
+            for keyframe in index.keyframes
+            if keyframe >= start_time - _KEYFRAME_TOLERANCE
+        ),
+        None,
+    )
+
+    def run(command: List[str], stage: str) -> None:
+        result = commands.run_command(command, stage, [command[-1]])
+
+        if result.returncode != 0:
+            raise ValueError(f"Unable to smart cut a clip from {input_video_path}")
+
+    if first_keyframe is None or first_keyframe >= end_time:
+        run(
+            _encode_clip_command(
+                input_video_path, output_video_path, start_time, end_time, index
+            ),
+            "smart_cut_encode",
+        )
+    elif first_keyframe - start_time <= _KEYFRAME_TOLERANCE:
+        run(
+            _copy_clip_command(
+                input_video_path, output_video_path, first_keyframe, end_time, index
+            ),
+            "smart_cut_copy",
+        )
+    else:
+        with NamedTemporaryFile("rb", suffix=".mp4") as head_file:
+            with NamedTemporaryFile("rb", suffix=".mp4") as tail_file:
+                run(
+                    _encode_clip_command(
+                        input_video_path,
+                        head_file.name,
+                        start_time,
+                        first_keyframe - _KEYFRAME_TOLERANCE,
+                        index,
+                    ),
+                    "smart_cut_encode",
+                )
+                run(
+                    _copy_clip_command(
+                        input_video_path,
+                        tail_file.name,
+                        first_keyframe,
+                        end_time,
+                        index,
+                    ),
+                    "smart_cut_copy",
+                )
+
+                _concat_clips([head_file.name, tail_file.name], output_video_path)
+
+
+def _encode_clip_command(
+    input_video_path: str,
+    output_video_path: str,
+    start_time: float,
+    end_time: float,
+    index: keyframes.KeyframeIndex,
+) -> List[str]:
+    """Get the ffmpeg command that re-encodes a clip to match the video it is from.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_path: The path to write the clip to.
+        start_time: The start of the clip in seconds since video start.
+        end_time: The end of the clip in seconds since video start.
+        index: The video's keyframe index.
+
+    Returns:
+        The ffmpeg command.
+    """
+    video_encoder, _ = _SMART_CUT_VIDEO_CODECS[index.video_codec]
+    audio_encoder = _SMART_CUT_AUDIO_ENCODERS.get(index.audio_codec, index.audio_codec)
+
+    command = [
+        "ffmpeg",
+        "-y",
+        "-ss",
+        f"{start_time:0.6f}",
+        "-to",
+        f"{end_time:0.6f}",
+        "-i",
+        input_video_path,
+        "-map",
+        "0:v:0",
+        "-map",
+        "0:a?",
+        "-c:v",
+        video_encoder,
+        # B-frames and frame duplication would shift the head's timestamps, which
+        # the tail is stitched after
+        "-bf",
+        "0",
+        "-vsync",
+        "passthrough",
+        "-video_track_timescale",
+        f"{index.timescale}",
+    ]
+
+    if index.pixel_format is not None:
+        command += ["-pix_fmt", index.pixel_format]
+
+    if audio_encoder is not None:
+        command += ["-c:a", audio_encoder]
+
+    return command + ["-map_chapters", "-1", output_video_path]
+
+
+def _copy_clip_command(
+    input_video_path: str,
+    output_video_path: str,
+    keyframe: float,
+    end_time: float,
+    index: keyframes.KeyframeIndex,
+) -> List[str]:
+    """Get the ffmpeg command that stream copies a clip starting at a keyframe.
+
+    Parameter sets are repeated in the stream, so the copy can be stitched after a
+    re-encoded clip whose encoder settings differ.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_path: The path to write the clip to.
+        keyframe: The time of the keyframe the clip starts at.
+        end_time: The end of the clip in seconds since video start.
+        index: The video's keyframe index.
+
+    Returns:
+        The ffmpeg command.
+    """
+    _, bitstream_filter = _SMART_CUT_VIDEO_CODECS[index.video_codec]
+
+    return [
+        "ffmpeg",
+        "-y",
+        # seeking lands on the last keyframe before the seek time, so nudge past it
+        "-ss",
+        f"{keyframe + _KEYFRAME_TOLERANCE:0.6f}",
+        "-to",
+        f"{end_time:0.6f}",
+        "-i",
+        input_video_path,
+        "-map",
+        "0:v:0",
+        "-map",
+        "0:a?",
+        "-c",
+        "copy",
+        "-bsf:v",
+        bitstream_filter,
+        "-map_chapters",
+        "-1",
+        output_video_path,
+    ]
+
+
+@contextmanager
+def _extracted_clips(
+    input_video_path: str,
+    video_times: List[Tuple[float, float]],
+    single_pass: bool,
+    max_workers: int,
+    smart_cut: bool = False,
+) -> Iterator[List[str]]:
+    """Extract clips from input_video_path to temporary files.
+
+    Args:
+        input_video_path: The path to a video.
+        video_times: A (start_time, end_time) pair in video time for each clip.
+        single_pass: Extract batches of clips with each process using _extract_clips.
+        max_workers: The most ffmpeg processes to run at once.
+        smart_cut: Extract each clip with _smart_cut_clip.
+
+    Yields:
+        The path to each clip. The files are deleted when the context exits.
+    """
+    clip_files = [NamedTemporaryFile("rb", suffix=".mp4") for _ in video_times]
+
+    try:
+        clip_paths = [clip_file.name for clip_file in clip_files]
+
+        _extract_clips_in_pool(
+            input_video_path,
+            clip_paths,
+            video_times,
+            single_pass,
+            max_workers,
+            smart_cut,
+        )
+
+        yield clip_paths
+    finally:
+        for clip_file in clip_files:
+            clip_file.close()
+
+
+def _extract_clips_in_pool(
+    input_video_path: str,
+    output_video_paths: List[str],
+    video_times: List[Tuple[float, float]],
+    single_pass: bool,
+    max_workers: int,
+    smart_cut: bool = False,
+) -> None:
+    """Extract clips from input_video_path with a pool of ffmpeg processes.
+
+    Each clip is written to its own path, so the order of the clips does not depend on
+    the order the processes finish in.
+
+    Args:
+        input_video_path: The path to a video.
+        output_video_paths: The paths to write each clip to.
+        video_times: A (start_time, end_time) pair in video time for each clip.
+        single_pass: Extract batches of clips with each process using _extract_clips.
+            Ignored for smart cuts, which take several processes per clip.
+        max_workers: The most ffmpeg processes to run at once.
+        smart_cut: Extract each clip with _smart_cut_clip.
+    """
+    batches = _clip_batches(
+        output_video_paths, video_times, single_pass and not smart_cut
+    )
+
+    def extract_batch(batch: Tuple[List[str], List[Tuple[float, float]]]) -> None:
+        batch_paths, batch_times = batch
+
+        if len(batch_paths) > 1:
+            _extract_clips(input_video_path, batch_paths, batch_times)
+        else:
+            extract_clip = _smart_cut_clip if smart_cut else _extract_clip
+            start_time, end_time = batch_times[0]
+            extract_clip(input_video_path, batch_paths[0], start_time, end_time)
+
+    if max_workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            extract_batch(batch)
+    else:
+        # ffmpeg does the work, so threads are enough to keep every process busy
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(extract_batch, batches))
+
+
+def _clip_batches(
+    output_video_paths: List[str],
+    video_times: List[Tuple[float, float]],
+    single_pass: bool,
+) -> List[Tuple[List[str], List[Tuple[float, float]]]]:
+    """Group clips into the batches extracted by each ffmpeg process.
+
+    Args:
+        output_video_paths: The paths to write each clip to.
+        video_times: A (start_time, end_time) pair in video time for each clip.
+        single_pass: Group several clips into each batch instead of one.
+
+    Returns:
+        A list of (output_video_paths, video_times) for each batch.
+    """
+    batch_size = _SINGLE_PASS_BATCH_SIZE if single_pass else 1
+
+    return [
+        (
+            output_video_paths[batch_start : batch_start + batch_size],
+            video_times[batch_start : batch_start + batch_size],
+        )
+        for batch_start in range(0, len(output_video_paths), batch_size)
+    ]
+
+
+def _concat_clips(clip_paths: List[str], output_video_path: str) -> None:
+    """Stitch clips together and write them to output_video_path.
+
+    Args:
+        clip_paths: The paths to the clips in the order they should play.
+        output_video_path: The path to write the stitched clips to.
+    """
+    with _concat_list(clip_paths) as concat_list_path:
+        _concat(concat_list_path, output_video_path)
+
+
+def _concat(concat_list_path: str, output_video_path: str) -> None:
+    """Write the clips in a concat list to output_video_path.
+
+    Args:
+        concat_list_path: The path to a list written by _concat_list or
+            _source_concat_list.
+        output_video_path: The path to write the stitched clips to.
+
+    Raises:
+        ValueError: ffmpeg failed to stitch the clips.
+    """
+    result = commands.run_command(
+        _concat_command(concat_list_path, output_video_path),
+        "concat",
+        [output_video_path],
+    )
+
+    if result.returncode != 0:
+        raise ValueError(f"Unable to write clips to {output_video_path}")
+
+
+def _concat_command(concat_list_path: str, output_video_path: str) -> List[str]:
+    """Get the ffmpeg command that stitches together a list of clips.
+
+    Args:
+        concat_list_path: The path to a list written by _concat_list.
+        output_video_path: The path to write the stitched clips to.
+
+    Returns:
+        The ffmpeg command.
+    """
+    return (
+        ["ffmpeg", "-y"]
+        + _concat_input_args(concat_list_path)
+        + _CONCAT_OUTPUT_ARGS
+        + [output_video_path]
+    )
+
+
+@contextmanager
+def _concat_list(clip_paths: List[str]) -> Iterator[str]:
+    """Write a list of clips for ffmpeg's concat demuxer.
+
+    Args:
+        clip_paths: The paths to the clips in the order they should play.
+
+    Yields:
+        The path to the list. The list is deleted when the context exits.
+    """
+    with _ranged_concat_list(
+        [(clip_path, None) for clip_path in clip_paths]
+    ) as concat_list_path:
+        yield concat_list_path
+
+
+@contextmanager
+def _source_concat_list(
+    video_path: str, video_times: List[Tuple[float, float]]
+) -> Iterator[str]:
+    """Write a list of clips of one video for ffmpeg's concat demuxer.
+
+    Each clip is the video with inpoint and outpoint directives, so the concat demuxer
+    reads the clips straight from the video without extracting them to files first.
+    Like _extract_clip, each clip starts at the keyframe before its start time.
+
+    Args:
+        video_path: The path to a video.
+        video_times: A (start_time, end_time) pair in video time for each clip.
+
+    Yields:
+        The path to the list. The list is deleted when the context exits.
+    """
+    with _ranged_concat_list(
+        [(video_path, clip_times) for clip_times in video_times]
+    ) as concat_list_path:
+        yield concat_list_path
+
+
+@contextmanager
+def _ranged_concat_list(
+    entries: List[Tuple[str, Optional[Tuple[float, float]]]],
+) -> Iterator[str]:
+    """Write a list of whole files and ranges of files for ffmpeg's concat demuxer.
+
+    Args:
+        entries: A (path, video_times) pair for each clip in the order they should
+            play. video_times is a (start_time, end_time) pair to read part of the
+            file with inpoint and outpoint directives, or None to read all of it.
+
+    Yields:
+        The path to the list. The list is deleted when the context exits.
+    """
+    lines = []
+
+    for path, video_times in entries:
+        if video_times is None:
+            lines.append(f"file {_concat_quote(path)}")
+            continue
+
+        start_time, end_time = video_times
+        # the concat demuxer resolves relative paths against the list's directory
+        lines += [
+            f"file {_concat_quote(os.path.abspath(path))}",
+            f"inpoint {start_time:0.2f}",
+            f"outpoint {end_time:0.2f}",
+        ]
+
+    with NamedTemporaryFile("w") as concat_list_file:
+        concat_list_file.write("\n".join(lines))
+        concat_list_file.seek(0)
+
+        yield concat_list_file.name
+
+
+@contextmanager
+def _clips_concat_list(
+    video_path: str,
+    video_times: List[Tuple[float, float]],
+    max_workers: int,
+    smart_cut: bool,
+) -> Iterator[str]:
+    """Write a concat list of clips from video_path, extracting them only if needed.
+
+    Stream copied clips are read straight from the video with _source_concat_list.
+    Smart cuts re-encode the start of each clip, so they are extracted to temporary
+    files first.
+
+    Args:
+        video_path: The path to a video.
+        video_times: A (start_time, end_time) pair in video time for each clip.
+        max_workers: The most ffmpeg processes to extract smart cuts with at once.
+        smart_cut: Extract each clip with _smart_cut_clip.
+
+    Yields:
+        The path to the list. The list and any extracted clips are deleted when the
+        context exits.
+    """
+    if not smart_cut:
+        with _source_concat_list(video_path, video_times) as concat_list_path:
+            yield concat_list_path
+
+        return
+
+    with _extracted_clips(
+        video_path, video_times, False, max_workers, smart_cut
+    ) as clip_paths:
+        with _concat_list(clip_paths) as concat_list_path:
+            yield concat_list_path
+
+
+def _concat_quote(path: str) -> str:
+    """Quote a path for a concat list.
+
+    Args:
+        path: The path to quote.
+
+    Returns:
+        The path in single quotes, with any single quotes in it escaped.
+    """
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+def _concat_input_args(concat_list_path: str) -> List[str]:
+    """Get the ffmpeg arguments that open a list of clips as one input.
+
+    Args:
+        concat_list_path: The path to a list written by _concat_list.
+
+    Returns:
+        The input arguments for ffmpeg.
+    """
+    return ["-f", "concat", "-safe", "0", "-i", concat_list_path]
+
+
+def _write_output(
+    output: Union[str, BinaryIO], write_video: Callable[[str], None]
+) -> None:
+    """Write a video to a path or a binary file object.
+
+    Args:
+        output: A path, or a binary file object.
+        write_video: A function that writes the video to the path it is given.
+    """
+    if not hasattr(output, "write"):
+        write_video(os.fspath(output))
+        return
+
+    with NamedTemporaryFile("rb", suffix=".mp4") as video_file:
+        write_video(video_file.name)
+        shutil.copyfileobj(video_file, output)
+
+
+def _stream_output(command: List[str], chunk_size: int, stage: str) -> Iterator[bytes]:
+    """Run an ffmpeg command that writes to stdout and yield what it writes.
+
+    ffmpeg is stopped if the iterator is closed before the output ends. Only commands
+    that run to the end are recorded. stderr goes to a temporary file rather than a
+    pipe, so ffmpeg can't block on a full stderr pipe that nothing reads.
+
+    Args:
+        command: The ffmpeg command, with pipe:1 as its output.
+        chunk_size: The most bytes to read at a time.
+        stage: The name the command is recorded under.
+
+    Yields:
+        Chunks of ffmpeg's output.
+
+    Raises:
+        ValueError: ffmpeg ran to the end and exited with a non-zero status.
+    """
+    start_time = time.time()
+    start = time.perf_counter()
+    output_bytes = 0
+
+    with TemporaryFile() as stderr_file:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+        # Popen only leaves stdout as None if it isn't a pipe
+        stdout = cast(BinaryIO, process.stdout)
+
+        finished = False
+
+        try:
+            while True:
+                chunk = stdout.read(chunk_size)
+
+                if not chunk:
+                    break
+
+                output_bytes += len(chunk)
+                yield chunk
+
+            finished = True
+        finally:
+            stdout.close()
+
+            if not finished and process.poll() is None:
+                process.kill()
+
+            process.wait()
+
+        stderr_file.seek(0, os.SEEK_END)
+        stderr_file.seek(max(stderr_file.tell() - commands._STDERR_TAIL_CHARS, 0))
+        stderr = stderr_file.read()
+
+    commands.record_command(
+        stage,
+        command,
+        start_time,
+        time.perf_counter() - start,
+        process.returncode,
+        output_bytes,
+        stderr,
+    )
+
+    if process.returncode != 0:
+        raise ValueError(
+            f"{stage} failed with exit status {process.returncode},"
+            f" {commands.failure_reason(stderr)}"
+        )
+
+
+def _hls_output_args(
+    output_directory: str, segment_duration: float, segment_type: str
+) -> List[str]:
+    """Get the ffmpeg arguments that write an HLS event playlist and its segments.
+
+    Args:
+        output_directory: The directory to write the segments to.
+        segment_duration: The target length of each segment in seconds.
+        segment_type: "mpegts" or "fmp4".
+
+    Returns:
+        The output arguments for ffmpeg, to be followed by the playlist path.
+    """
+    segment_path = os.path.join(
+        output_directory, f"segment_%05d{_HLS_SEGMENT_EXTENSIONS[segment_type]}"
+    )
+
+    return [
+        "-f",
+        "hls",
+        "-hls_time",
+        f"{segment_duration:g}",
+        "-hls_list_size",
+        "0",
+        "-hls_playlist_type",
+        "event",
+        "-hls_segment_type",
+        segment_type,
+        "-hls_segment_filename",
+        segment_path,
+    ]
+
+
+def _clip_input_args(video_path: str, start_time: float, end_time: float) -> List[str]:
+    """Get the ffmpeg arguments that open a video seeked to a clip.
+
+    Args:
+        video_path: The path to a video.
+        start_time: The start of the clip in seconds since video start.
+        end_time: The end of the clip in seconds since video start.
+
+    Returns:
+        The input arguments for ffmpeg.
+    """
+    return ["-ss", f"{start_time:0.2f}", "-to", f"{end_time:0.2f}", "-i", video_path]
+
+
+def _clip_output_args(input_index: int) -> List[str]:
+    """Get the ffmpeg arguments that stream copy an input to a clip.
+
+    Args:
+        input_index: The index of the ffmpeg input to copy.
+
+    Returns:
+        The output arguments for ffmpeg, to be followed by the output path.
+    """
+    return [
+        "-map",
+        f"{input_index}",
+        "-map",
+        f"-{input_index}:d?",
+        "-vcodec",
+        "copy",
+        "-acodec",
+        "copy",
+        "-map_chapters",
+        "-1",
+    ]
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import match_video.aio as aio
+import match_video.commands
+import match_video.stores as stores
+import match_video.utils as utils
+from match_video.anchor import Anchor
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def fake_process(stdout=b"", block=False, returncode=0):
+    process = MagicMock()
+    process.returncode = None
+
+    async def communicate():
+        if block:
+            await asyncio.Event().wait()
+
+        process.returncode = returncode
+
+        return stdout, b""
+
+    async def wait():
+        return process.returncode
+
+    process.communicate = communicate
+    process.wait = wait
+
+    return process
+
+
+@patch("asyncio.create_subprocess_exec")
+def test_aread_anchors(mock_create_subprocess_exec):
+    stdout = json.dumps(
+        {
+            "chapters": [
+                {
+                    "start_time": "10.000000",
+                    "tags": {"title": "Period 1, 0.0"},
+                }
+            ]
+        }
+    ).encode()
+
+    async def create_subprocess_exec(*command, **kwargs):
+        return fake_process(stdout)
+
+    mock_create_subprocess_exec.side_effect = create_subprocess_exec
+
+    result = run(aio.aread_anchors("path"))
+
+    assert result == [Anchor(1, 0.0, 10.0)]
+    assert mock_create_subprocess_exec.call_args[0] == tuple(
+        utils._read_anchors_command("path")
+    )
+
+
+@patch("asyncio.create_subprocess_exec")
+def test_aread_anchors_bad_path(mock_create_subprocess_exec):
+    stdout = json.dumps(
+        {"error": {"code": -2, "string": "No such file or directory"}}
+    ).encode()
+
+    async def create_subprocess_exec(*command, **kwargs):
+        return fake_process(stdout)
+
+    mock_create_subprocess_exec.side_effect = create_subprocess_exec
+
+    with pytest.raises(ValueError):
+        run(aio.aread_anchors("path"))
+
+
+@patch("match_video.aio.aread_anchors")
+def test_aget_clip_no_anchors(mock_aread_anchors):
+    async def aread_anchors(video_path):
+        return []
+
+    mock_aread_anchors.side_effect = aread_anchors
+
+    with pytest.raises(ValueError):
+        run(aio.aget_clip("path", 1, 0.0, 10.0))
+
+
+@patch("asyncio.create_subprocess_exec")
+@patch("match_video.aio.aread_anchors")
+def test_aget_clips_reads_clips_in_one_process(
+    mock_aread_anchors, mock_create_subprocess_exec
+):
+    async def aread_anchors(video_path):
+        return [Anchor(1, 0.0, 0.0), Anchor(2, 0.0, 1000.0)]
+
+    async def create_subprocess_exec(*command, **kwargs):
+        with open(command[-1], "wb") as output_file:
+            output_file.write(b"clips")
+
+        return fake_process()
+
+    mock_aread_anchors.side_effect = aread_anchors
+    mock_create_subprocess_exec.side_effect = create_subprocess_exec
+    clip_clocks = [
+        {"period": 1, "start_clock": float(i), "end_clock": i + 1.0} for i in range(3)
+    ]
+
+    clips = run(aio.aget_clips("path", clip_clocks))
+
+    assert clips == b"clips"
+    commands = [args for args, _ in mock_create_subprocess_exec.call_args_list]
+    assert len(commands) == 1
+    assert "concat" in commands[0]
+
+
+@patch("asyncio.create_subprocess_exec")
+def test_run_records_command(mock_create_subprocess_exec):
+    async def create_subprocess_exec(*command, **kwargs):
+        return fake_process(stdout=b"{}")
+
+    mock_create_subprocess_exec.side_effect = create_subprocess_exec
+    records = []
+    match_video.commands.add_command_hook(records.append)
+
+    try:
+        run(aio._run(["ffprobe", "path"], "read_anchors"))
+    finally:
+        match_video.commands.remove_command_hook(records.append)
+
+    (record,) = records
+    assert record.stage == "read_anchors"
+    assert record.returncode == 0
+    assert record.output_bytes == 2
+
+
+@patch("asyncio.create_subprocess_exec")
+def test_run_kills_process_when_cancelled(mock_create_subprocess_exec):
+    process = fake_process(block=True)
+
+    async def create_subprocess_exec(*command, **kwargs):
+        return process
+
+    mock_create_subprocess_exec.side_effect = create_subprocess_exec
+
+    async def cancel_run():
+        task = asyncio.ensure_future(aio._run(["ffmpeg"], "test"))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(cancel_run())
+
+    process.kill.assert_called_once()
+
+
+def test_aread_anchors_from_store(tmp_path):
+    video_path = tmp_path / "match.mp4"
+    video_path.write_bytes(b"video")
+    video_path = str(video_path)
+    store = stores.JSONSidecarStore()
+    anchors = [Anchor(1, 0.0, 4.0)]
+
+    with patch("asyncio.create_subprocess_exec") as mock_create_subprocess_exec:
+        run(aio.awrite_anchors(video_path, video_path, anchors, store=store))
+
+        assert run(aio.aread_anchors(video_path, store=store)) == anchors
+
+    mock_create_subprocess_exec.assert_not_called()
+
+
+@patch("asyncio.create_subprocess_exec")
+def test_awrite_anchors_inplace_keeps_video_if_ffmpeg_fails(
+    mock_create_subprocess_exec, tmp_path
+):
+    video_path = tmp_path / "match.mp4"
+    video_path.write_bytes(b"video")
+
+    async def create_subprocess_exec(*command, **kwargs):
+        if "ffmetadata" in command:
+            with open(command[-1], "w") as metadata_file:
+                metadata_file.write(";FFMETADATA1\n")
+
+            return fake_process()
+
+        with open(command[-1], "wb") as output_file:
+            output_file.write(b"partial")
+
+        return fake_process(returncode=-25)
+
+    mock_create_subprocess_exec.side_effect = create_subprocess_exec
+
+    with pytest.raises(ValueError):
+        run(aio.awrite_anchors(str(video_path), str(video_path), []))
+
+    assert video_path.read_bytes() == b"video"
+    assert os.listdir(tmp_path) == ["match.mp4"]
@@ -0,0 +1,49 @@
+import pytest
+
+from match_video.anchor import Anchor, AnchorTimeline
+
+ANCHORS = [
+    Anchor(2, 0.0, 3000.0),
+    Anchor(1, 1000.0, 1200.0),
+    Anchor(1, 0.0, 100.0),
+    Anchor(2, 600.0, 3700.0),
+]
+
+
+def test_video_time():
+    timeline = AnchorTimeline(ANCHORS)
+
+    assert timeline.video_time(1, 0.0) == 100.0
+    assert timeline.video_time(1, 999.0) == 1099.0
+    assert timeline.video_time(1, 1000.0) == 1200.0
+    assert timeline.video_time(2, 700.0) == 3800.0
+
+
+def test_video_time_last_anchor_at_clock_wins():
+    timeline = AnchorTimeline([Anchor(1, 0.0, 100.0), Anchor(1, 0.0, 160.0)])
+
+    assert timeline.video_time(1, 10.0) == 170.0
+
+
+def test_video_time_before_first_anchor():
+    timeline = AnchorTimeline(ANCHORS)
+
+    with pytest.raises(ValueError, match="period 3 before 1:05"):
+        timeline.video_time(3, 65.0)
+
+    with pytest.raises(ValueError):
+        AnchorTimeline([Anchor(1, 60.0, 100.0)]).video_time(1, 30.0)
+
+
+def test_video_times():
+    timeline = AnchorTimeline(ANCHORS)
+
+    video_times = timeline.video_times([1, 2, 1, 2], [10.0, 10.0, 1010.0, 610.0])
+
+    assert video_times == [110.0, 3010.0, 1210.0, 3710.0]
+
+
+def test_clip_video_times_play_through_discontinuity():
+    timeline = AnchorTimeline(ANCHORS)
+
+    assert timeline.clip_video_times(1, 990.0, 1020.0) == (1090.0, 1120.0)
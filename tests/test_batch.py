@@ -0,0 +1,251 @@
+import json
+import subprocess
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import match_video.batch as batch
+from match_video.anchor import Anchor
+
+
+def test_read_manifest_csv(tmp_path):
+    manifest_path = tmp_path / "manifest.csv"
+    manifest_path.write_text(
+        "input_video_path,first_half_start_time,second_half_start_time,output_video_path\n"
+        "a.mp4,1:30,62:10,\n"
+        "/videos/b.mp4,0:05,50:00,b_anchored.mp4\n"
+    )
+
+    manifest = batch.read_manifest(str(manifest_path))
+
+    assert manifest == [
+        batch.HalfStarts(str(tmp_path / "a.mp4"), "1:30", "62:10", None),
+        batch.HalfStarts(
+            "/videos/b.mp4", "0:05", "50:00", str(tmp_path / "b_anchored.mp4")
+        ),
+    ]
+
+
+def test_read_manifest_json(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(
+        json.dumps(
+            [
+                {
+                    "input_video_path": "a.mp4",
+                    "first_half_start_time": 90,
+                    "second_half_start_time": "62:10",
+                }
+            ]
+        )
+    )
+
+    manifest = batch.read_manifest(str(manifest_path))
+
+    assert manifest == [batch.HalfStarts(str(tmp_path / "a.mp4"), 90, "62:10", None)]
+
+
+def test_read_manifest_missing_column(tmp_path):
+    manifest_path = tmp_path / "manifest.csv"
+    manifest_path.write_text(
+        "input_video_path,first_half_start_time,second_half_start_time\na.mp4,1:30,\n"
+    )
+
+    with pytest.raises(ValueError, match="second_half_start_time"):
+        batch.read_manifest(str(manifest_path))
+
+
+def test_read_manifest_unknown_format(tmp_path):
+    manifest_path = tmp_path / "manifest.txt"
+    manifest_path.write_text("")
+
+    with pytest.raises(ValueError):
+        batch.read_manifest(str(manifest_path))
+
+
+@patch("match_video.batch.os.path.exists", return_value=True)
+@patch("match_video.batch.utils.write_anchors")
+def test_set_half_starts(mock_write_anchors, mock_exists):
+    def write_anchors(input_video_path, output_video_path, anchors, store):
+        if input_video_path == "bad.mp4":
+            raise ValueError("bad.mp4 is not a video")
+
+    mock_write_anchors.side_effect = write_anchors
+    progress = MagicMock()
+
+    results = batch.set_half_starts(
+        [
+            batch.HalfStarts("a.mp4", "1:30", "62:10", None),
+            batch.HalfStarts("bad.mp4", "0:00", "50:00", None),
+            batch.HalfStarts("c.mp4", 0, "not a time", None),
+            batch.HalfStarts("d.mp4", "0:00", "50:00", "d_out.mp4"),
+        ],
+        max_workers=2,
+        progress=progress,
+    )
+
+    assert results[0] == batch.BatchResult("a.mp4", None)
+    assert results[1] == batch.BatchResult("bad.mp4", "bad.mp4 is not a video")
+    assert results[2].input_video_path == "c.mp4"
+    assert results[2].error is not None
+    assert results[3] == batch.BatchResult("d.mp4", None)
+
+    mock_write_anchors.assert_any_call(
+        "a.mp4",
+        "a.mp4",
+        [Anchor(1, 0.0, 90.0), Anchor(2, 0.0, 3730.0)],
+        store=None,
+    )
+    mock_write_anchors.assert_any_call(
+        "d.mp4",
+        "d_out.mp4",
+        [Anchor(1, 0.0, 0.0), Anchor(2, 0.0, 3000.0)],
+        store=None,
+    )
+
+    assert progress.call_count == 4
+    assert [args[0] for args, _ in progress.call_args_list] == [1, 2, 3, 4]
+    assert all(args[1] == 4 for args, _ in progress.call_args_list)
+
+
+@patch("match_video.batch.utils.write_anchors")
+def test_set_half_starts_missing_video(mock_write_anchors):
+    results = batch.set_half_starts(
+        [batch.HalfStarts("missing.mp4", "0:00", "50:00", None)]
+    )
+
+    assert results[0].error == "missing.mp4 not found"
+    mock_write_anchors.assert_not_called()
+
+
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 1, b"", b""))
+def test_set_half_starts_write_fails(mock_subprocess_run, tmp_path):
+    video_path = tmp_path / "match.mp4"
+    video_path.write_bytes(b"not a video")
+    output_path = str(tmp_path / "match_out.mp4")
+
+    results = batch.set_half_starts(
+        [batch.HalfStarts(str(video_path), "0:00", "50:00", output_path)]
+    )
+
+    assert results[0].error is not None
+
+
+def test_parse_video_time():
+    assert batch.parse_video_time("62:10") == 3730.0
+    assert batch.parse_video_time("0:05.5") == 5.5
+    assert batch.parse_video_time("90") == 90.0
+    assert batch.parse_video_time(90) == 90.0
+
+    with pytest.raises(ValueError):
+        batch.parse_video_time("1:xx")
+
+
+def write_videos(directory, names):
+    for name in names:
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"video")
+
+
+SCAN_ANCHORS = {
+    "good.mp4": [Anchor(1, 0.0, 10.0), Anchor(2, 0.0, 3000.0)],
+    "empty.mp4": [],
+    "first_half.mp4": [Anchor(1, 0.0, 10.0)],
+}
+
+
+def read_scan_anchors(video_path, store=None):
+    name = video_path.split("/")[-1]
+
+    if name not in SCAN_ANCHORS:
+        raise ValueError(f"Unable to read metadata for {name}")
+
+    return SCAN_ANCHORS[name]
+
+
+@patch("match_video.batch.utils.read_anchors", side_effect=read_scan_anchors)
+def test_scan_videos(mock_read_anchors, tmp_path):
+    write_videos(
+        tmp_path,
+        [
+            "good.mp4",
+            "season/empty.mp4",
+            "season/first_half.mp4",
+            "season/broken.MP4",
+            "season/.good.mp4.tmp.mp4",
+            "notes.txt",
+        ],
+    )
+    progress = MagicMock()
+
+    results = batch.scan_videos(str(tmp_path), max_workers=2, progress=progress)
+
+    assert [
+        (result.video_path, result.status, result.problems) for result in results
+    ] == [
+        (str(tmp_path / "good.mp4"), "ok", []),
+        (
+            str(tmp_path / "season/broken.MP4"),
+            "error",
+            ["Unable to read metadata for broken.MP4"],
+        ),
+        (str(tmp_path / "season/empty.mp4"), "missing", ["No anchors set"]),
+        (
+            str(tmp_path / "season/first_half.mp4"),
+            "inconsistent",
+            ["No anchors for period 2"],
+        ),
+    ]
+    assert results[0].size == 5
+    assert progress.call_count == 4
+
+
+@patch("match_video.batch.utils.read_anchors", side_effect=read_scan_anchors)
+def test_scan_videos_reuses_previous_results(mock_read_anchors, tmp_path):
+    write_videos(tmp_path, ["good.mp4", "empty.mp4"])
+    previous = batch.scan_videos(str(tmp_path))
+    (tmp_path / "empty.mp4").write_bytes(b"anchored video")
+    mock_read_anchors.reset_mock()
+
+    results = batch.scan_videos(str(tmp_path), previous=previous)
+
+    mock_read_anchors.assert_called_once_with(str(tmp_path / "empty.mp4"), store=None)
+    assert results[1] is previous[1]
+
+
+def test_check_anchors():
+    anchors = [
+        Anchor(1, 0.0, 10.0),
+        Anchor(1, 600.0, 700.0),
+        Anchor(1, 300.0, 800.0),
+        Anchor(3, 0.0, 3000.0),
+        Anchor(2, 0.0, 3100.0),
+    ]
+
+    assert batch.check_anchors(anchors) == [
+        "Period 1 clock goes back from 600.00s to 300.00s at 800.00s",
+        "Period 2 anchor at 3100.00s is after period 3",
+    ]
+    assert batch.check_anchors([Anchor(1, 0.0, 10.0)], min_periods=1) == []
+    assert batch.check_anchors([Anchor(2, 0.0, 10.0)]) == ["No anchors for period 1"]
+
+
+@pytest.mark.parametrize("report_name", ["report.jsonl", "report.csv"])
+def test_scan_report_round_trip(report_name, tmp_path):
+    results = [
+        batch.ScanResult("good.mp4", 10, 1234567890, "ok", [Anchor(1, 0.0, 10.0)], []),
+        batch.ScanResult(
+            "bad.mp4", None, None, "error", [], ["Not found", "Still not found"]
+        ),
+    ]
+    report_path = str(tmp_path / report_name)
+
+    batch.write_scan_report(results, report_path)
+
+    assert batch.read_scan_report(report_path) == results
+
+
+def test_scan_report_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        batch.write_scan_report([], str(tmp_path / "report.jsonl"), "xml")
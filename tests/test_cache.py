@@ -0,0 +1,226 @@
+import os
+
+import pytest
+
+from match_video.anchor import Anchor
+from match_video.cache import CacheInfo, ClipCache, LRUCache, VideoCache, video_key
+
+
+def write_file(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_video_key_changes_with_video(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    write_file(video_path, "video")
+
+    key = video_key(video_path)
+    assert video_key(video_path) == key
+
+    write_file(video_path, "edited video")
+    assert video_key(video_path) != key
+
+
+def test_get_or_create_builds_once(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    write_file(video_path, "video")
+    cache = VideoCache(str(tmp_path / "cache"))
+    created = []
+
+    def create(path):
+        created.append(path)
+        write_file(path, "derived")
+
+    first_path = cache.get_or_create(video_path, "derived.txt", create)
+    second_path = cache.get_or_create(video_path, "derived.txt", create)
+
+    assert first_path == second_path
+    assert len(created) == 1
+    assert open(first_path).read() == "derived"
+
+
+def test_get_missing(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    write_file(video_path, "video")
+    cache = VideoCache(str(tmp_path / "cache"))
+
+    assert cache.get(video_path, "derived.txt") is None
+
+
+def test_get_or_create_after_video_changes(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    write_file(video_path, "video")
+    cache = VideoCache(str(tmp_path / "cache"))
+
+    old_path = cache.get_or_create(
+        video_path, "derived.txt", lambda path: write_file(path, "old")
+    )
+    write_file(video_path, "edited video")
+    new_path = cache.get_or_create(
+        video_path, "derived.txt", lambda path: write_file(path, "new")
+    )
+
+    assert old_path != new_path
+    assert open(new_path).read() == "new"
+
+
+def test_failed_create_leaves_no_entry(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    write_file(video_path, "video")
+    cache = VideoCache(str(tmp_path / "cache"))
+
+    def create(path):
+        raise RuntimeError("ffmpeg failed")
+
+    try:
+        cache.get_or_create(video_path, "derived.txt", create)
+    except RuntimeError:
+        pass
+
+    assert os.listdir(cache.directory) == []
+
+
+def test_empty_create_leaves_no_entry(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    write_file(video_path, "video")
+    cache = VideoCache(str(tmp_path / "cache"))
+
+    with pytest.raises(ValueError):
+        cache.get_or_create(video_path, "derived.txt", lambda path: None)
+
+    assert os.listdir(cache.directory) == []
+    assert cache.get(video_path, "derived.txt") is None
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = VideoCache(str(tmp_path / "cache"), max_bytes=10)
+    videos = []
+
+    for i in range(3):
+        video_path = str(tmp_path / f"video_{i}.mp4")
+        write_file(video_path, "video")
+        videos.append(video_path)
+
+    cache.get_or_create(
+        videos[0], "derived.txt", lambda path: write_file(path, "a" * 4)
+    )
+    os.utime(cache.path(videos[0], "derived.txt"), (0, 0))
+    cache.get_or_create(
+        videos[1], "derived.txt", lambda path: write_file(path, "b" * 4)
+    )
+    os.utime(cache.path(videos[1], "derived.txt"), (1, 1))
+
+    # using the first entry makes the second the least recently used
+    cache.get(videos[0], "derived.txt")
+    cache.get_or_create(
+        videos[2], "derived.txt", lambda path: write_file(path, "c" * 4)
+    )
+
+    assert cache.get(videos[0], "derived.txt") is not None
+    assert cache.get(videos[1], "derived.txt") is None
+    assert cache.get(videos[2], "derived.txt") is not None
+
+
+def test_default_directory_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("MATCH_VIDEO_CACHE_DIR", str(tmp_path))
+
+    assert VideoCache().directory == str(tmp_path)
+
+
+def test_lru_cache_hits_and_misses():
+    cache = LRUCache(maxsize=2)
+
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+
+    assert cache.info() == CacheInfo(hits=1, misses=1, maxsize=2, currsize=1)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_discard():
+    cache = LRUCache()
+    cache.put(("video.mp4", 1), 1)
+    cache.put(("other.mp4", 1), 2)
+
+    cache.discard(lambda key: key[0] == "video.mp4")
+
+    assert cache.get(("video.mp4", 1)) is None
+    assert cache.get(("other.mp4", 1)) == 2
+
+
+def test_video_cache_ttl(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    write_file(video_path, "video")
+    cache = VideoCache(str(tmp_path / "cache"), ttl=60)
+
+    path = cache.get_or_create(video_path, "derived.txt", lambda p: write_file(p, "a"))
+    assert cache.get(video_path, "derived.txt") == path
+
+    # created two minutes ago
+    os.utime(path, (os.stat(path).st_atime, os.stat(path).st_mtime - 120))
+
+    assert cache.get(video_path, "derived.txt") is None
+    assert not os.path.exists(path)
+
+
+def test_video_cache_get_keeps_creation_time(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    write_file(video_path, "video")
+    cache = VideoCache(str(tmp_path / "cache"))
+
+    path = cache.get_or_create(video_path, "derived.txt", lambda p: write_file(p, "a"))
+    os.utime(path, (0, 100))
+    cache.get(video_path, "derived.txt")
+
+    assert os.stat(path).st_mtime == 100
+    assert os.stat(path).st_atime > 100
+
+
+def test_video_cache_info(tmp_path):
+    video_path = str(tmp_path / "video.mp4")
+    write_file(video_path, "video")
+    cache = VideoCache(str(tmp_path / "cache"), max_bytes=1000)
+
+    cache.get_or_create(video_path, "derived.txt", lambda p: write_file(p, "abc"))
+    cache.get_or_create(video_path, "derived.txt", lambda p: write_file(p, "abc"))
+
+    assert cache.info() == CacheInfo(hits=1, misses=1, maxsize=1000, currsize=3)
+
+
+def test_clip_cache_default_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("MATCH_VIDEO_CACHE_DIR", str(tmp_path))
+
+    assert ClipCache().directory == os.path.join(str(tmp_path), "clips")
+
+
+def test_clip_name():
+    cache = ClipCache("cache")
+    anchors = [Anchor(1, 0.0, 0.0)]
+    clips = [{"period": 1, "start_clock": 0, "end_clock": 10}]
+
+    name = cache.clip_name(anchors, clips, {"smart_cut": False})
+
+    assert name.startswith("clip-") and name.endswith(".mp4")
+    assert (
+        cache.clip_name(
+            anchors,
+            [{"period": 1, "start_clock": 0.0, "end_clock": 10.0}],
+            {"smart_cut": False},
+        )
+        == name
+    )
+    assert cache.clip_name(anchors, clips, {"smart_cut": True}) != name
+    assert cache.clip_name([Anchor(1, 0.0, 1.0)], clips, {"smart_cut": False}) != name
@@ -1,12 +1,17 @@
 from unittest.mock import call, patch
 
+import pytest
+import typer
+
+import match_video.batch as batch
 import match_video.cli as cli
+import match_video.stores as stores
 from match_video.anchor import Anchor
 
 
 @patch("match_video.cli.utils.write_anchors")
 def test_set_half_starts(mock_write_anchors):
-    cli.set_half_starts("input_path", "0:00", "60:00", "output_path")
+    cli.set_half_starts("input_path", "0:00", "60:00", "output_path", store=None)
 
     mock_write_anchors.assert_called_once_with(
         "input_path",
@@ -15,12 +20,13 @@ def test_set_half_starts(mock_write_anchors):
             Anchor(1, 0.0, 0.0),
             Anchor(2, 0.0, 3600.0),
         ],
+        store=None,
     )
 
 
 @patch("match_video.cli.utils.write_anchors")
 def test_set_half_starts_inplace(mock_write_anchors):
-    cli.set_half_starts("path", "0:00", "60:00")
+    cli.set_half_starts("path", "0:00", "60:00", store=None)
 
     mock_write_anchors.assert_called_once_with(
         "path",
@@ -29,6 +35,7 @@ def test_set_half_starts_inplace(mock_write_anchors):
             Anchor(1, 0.0, 0.0),
             Anchor(2, 0.0, 3600.0),
         ],
+        store=None,
     )
 
 
@@ -41,7 +48,7 @@ def test_set_half_starts_inplace(mock_write_anchors):
     ],
 )
 def test_read_anchors(mock_read_anchors, mock_typer_echo):
-    cli.read_anchors("path")
+    cli.read_anchors("path", store=None)
 
     expected_calls = [
         call("Period 1 0:00 | 0:00 in video"),
@@ -53,6 +60,137 @@ def test_read_anchors(mock_read_anchors, mock_typer_echo):
 @patch("match_video.cli.typer.echo")
 @patch("match_video.cli.utils.read_anchors", return_value=[])
 def test_read_anchors_no_anchors(mock_read_anchors, mock_typer_echo):
-    cli.read_anchors("path")
+    cli.read_anchors("path", store=None)
 
     mock_typer_echo.assert_called_once_with("No anchors set for video")
+
+
+@patch("match_video.cli.typer.echo")
+@patch("match_video.cli.batch.set_half_starts")
+@patch("match_video.cli.batch.read_manifest", return_value=["entry"])
+def test_set_half_starts_batch_failure(
+    mock_read_manifest, mock_set_half_starts, mock_typer_echo
+):
+    mock_set_half_starts.return_value = [
+        batch.BatchResult("a.mp4", None),
+        batch.BatchResult("b.mp4", "b.mp4 not found"),
+    ]
+
+    with pytest.raises(typer.Exit) as exit_info:
+        cli.set_half_starts_batch("manifest.csv", max_workers=4, store=None)
+
+    assert exit_info.value.exit_code == 1
+    mock_set_half_starts.assert_called_once()
+    assert mock_set_half_starts.call_args[1]["max_workers"] == 4
+    mock_typer_echo.assert_called_with("Set anchors for 1 of 2 videos")
+
+
+@patch("match_video.cli.typer.echo")
+@patch("match_video.cli.stores.migrate_anchors", return_value=[Anchor(1, 0.0, 0.0)])
+def test_migrate_anchors(mock_migrate_anchors, mock_typer_echo):
+    cli.migrate_anchors(["a.mp4", "b.mp4"], source="chapters", target="json")
+
+    assert mock_migrate_anchors.call_count == 2
+    video_path, source, target = mock_migrate_anchors.call_args[0]
+    assert video_path == "b.mp4"
+    assert isinstance(source, stores.ChapterStore)
+    assert isinstance(target, stores.JSONSidecarStore)
+    mock_typer_echo.assert_called_with("Copied 1 anchors for b.mp4")
+
+
+def test_unknown_store():
+    with pytest.raises(typer.BadParameter):
+        cli.read_anchors("path", store="redis")
+
+
+@patch("match_video.cli.typer.echo")
+@patch("match_video.cli.batch.scan_videos")
+def test_scan(mock_scan_videos, mock_typer_echo, tmp_path):
+    mock_scan_videos.return_value = [
+        batch.ScanResult("a.mp4", 10, 1, "ok", [Anchor(1, 0.0, 0.0)], []),
+        batch.ScanResult("b.mp4", 10, 1, "missing", [], ["No anchors set"]),
+    ]
+    report_path = str(tmp_path / "report.csv")
+
+    with pytest.raises(typer.Exit):
+        cli.scan(
+            "videos",
+            output=report_path,
+            report_format=None,
+            max_workers=8,
+            store=None,
+            previous=report_path,
+            min_periods=2,
+        )
+
+    assert mock_scan_videos.call_args[1]["previous"] is None
+    assert [result.status for result in batch.read_scan_report(report_path)] == [
+        "ok",
+        "missing",
+    ]
+    mock_typer_echo.assert_called_once_with(
+        "Scanned 2 videos: 1 ok, 1 missing, 0 inconsistent, 0 failed", err=True
+    )
+
+
+@patch("match_video.cli.utils.write_anchors")
+@patch(
+    "match_video.cli.detect.detect_half_starts",
+    return_value=[Anchor(1, 0.0, 240.0), Anchor(2, 0.0, 3900.0)],
+)
+def test_detect_half_starts(mock_detect_half_starts, mock_write_anchors):
+    cli.detect_half_starts(
+        "match.mp4", None, store=None, half_minutes=45.0, dry_run=False
+    )
+
+    mock_write_anchors.assert_called_once_with(
+        "match.mp4",
+        "match.mp4",
+        [Anchor(1, 0.0, 240.0), Anchor(2, 0.0, 3900.0)],
+        store=None,
+    )
+
+
+@patch("match_video.cli.utils.write_anchors")
+@patch(
+    "match_video.cli.detect.detect_half_starts",
+    side_effect=ValueError("No whistle looks like the first half's kickoff"),
+)
+def test_detect_half_starts_failure(mock_detect_half_starts, mock_write_anchors):
+    with pytest.raises(typer.Exit):
+        cli.detect_half_starts(
+            "match.mp4", None, store=None, half_minutes=45.0, dry_run=False
+        )
+
+    mock_write_anchors.assert_not_called()
+
+
+@patch("match_video.cli.utils.write_anchors")
+@patch(
+    "match_video.cli.ocr.detect_clock_anchors",
+    return_value=[Anchor(1, 0.0, 100.0), Anchor(1, 1460.0, 1500.0)],
+)
+def test_set_clock_anchors(mock_detect_clock_anchors, mock_write_anchors):
+    cli.set_clock_anchors(
+        "match.mp4",
+        "40:20:120:36",
+        None,
+        store=None,
+        sample_interval=1.0,
+        drift_threshold=2.0,
+        max_workers=4,
+        dry_run=False,
+    )
+
+    assert mock_detect_clock_anchors.call_args[0] == ("match.mp4", (40, 20, 120, 36))
+    mock_write_anchors.assert_called_once_with(
+        "match.mp4",
+        "match.mp4",
+        [Anchor(1, 0.0, 100.0), Anchor(1, 1460.0, 1500.0)],
+        store=None,
+    )
+
+
+def test_set_clock_anchors_bad_region():
+    with pytest.raises(typer.BadParameter):
+        cli.set_clock_anchors("match.mp4", "40:20:120")
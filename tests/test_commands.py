@@ -0,0 +1,86 @@
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+import match_video.commands as commands
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    commands.reset_command_metrics()
+
+    yield
+
+    commands.reset_command_metrics()
+
+
+@patch("subprocess.run")
+def test_run_command_records_metrics(mock_subprocess_run, tmp_path):
+    output_path = tmp_path / "clip.mp4"
+    output_path.write_bytes(b"clip")
+    mock_subprocess_run.return_value = subprocess.CompletedProcess(
+        ["ffmpeg"], 0, b"out", b""
+    )
+
+    result = commands.run_command(["ffmpeg"], "extract_clip", [str(output_path)])
+
+    assert result.stdout == b"out"
+    mock_subprocess_run.assert_called_once_with(
+        ["ffmpeg"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+
+    metrics = commands.command_metrics()["extract_clip"]
+    assert metrics.count == 1
+    assert metrics.failures == 0
+    assert metrics.output_bytes == len(b"out") + len(b"clip")
+    assert metrics.seconds >= 0
+
+
+@patch("subprocess.run")
+def test_run_command_failure(mock_subprocess_run, caplog):
+    stderr = b"x" * 5000 + b"match.mp4: No such file or directory"
+    mock_subprocess_run.return_value = subprocess.CompletedProcess(
+        ["ffmpeg"], 1, b"", stderr
+    )
+    records = []
+    commands.add_command_hook(records.append)
+
+    try:
+        commands.run_command(["ffmpeg"], "concat")
+    finally:
+        commands.remove_command_hook(records.append)
+
+    (record,) = records
+    assert record.returncode == 1
+    assert record.stderr_tail.endswith("No such file or directory")
+    assert len(record.stderr_tail) == 2000
+    assert commands.command_metrics()["concat"].failures == 1
+    assert "concat failed with exit status 1" in caplog.text
+
+
+@patch("subprocess.run")
+def test_failing_hook_does_not_stop_command(mock_subprocess_run, caplog):
+    mock_subprocess_run.return_value = subprocess.CompletedProcess(
+        ["ffprobe"], 0, b"{}", b""
+    )
+
+    def hook(record):
+        raise RuntimeError("exporter is down")
+
+    commands.add_command_hook(hook)
+
+    try:
+        result = commands.run_command(["ffprobe"], "read_anchors")
+    finally:
+        commands.remove_command_hook(hook)
+
+    assert result.stdout == b"{}"
+    assert "Command hook" in caplog.text
+
+
+def test_output_bytes_of_directory(tmp_path):
+    (tmp_path / "segment_00000.ts").write_bytes(b"a" * 10)
+    (tmp_path / "index.m3u8").write_bytes(b"b" * 5)
+
+    assert commands._output_bytes(None, [str(tmp_path)]) == 15
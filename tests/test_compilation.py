@@ -0,0 +1,166 @@
+import os
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+import match_video.compilation as compilation
+from match_video.anchor import Anchor
+from match_video.compilation import CompilationClip, StreamParameters
+
+HD = StreamParameters("h264", 1280, 720, "yuv420p", "25/1", 12800, "aac", "48000", 2)
+SD = StreamParameters("h264", 640, 360, "yuv420p", "30/1", 15360, "aac", "44100", 2)
+
+
+def fake_run_command(concat_lists):
+    def run_command(command, stage, output_paths=(), universal_newlines=False):
+        if stage == "compilation":
+            with open(command[command.index("-i") + 1]) as concat_list_file:
+                concat_lists.append(concat_list_file.read())
+
+        return subprocess.CompletedProcess(command, 0, b"", b"")
+
+    return run_command
+
+
+@patch("match_video.compilation.commands.run_command")
+@patch("match_video.compilation.read_stream_parameters", return_value=HD)
+@patch(
+    "match_video.compilation.utils.read_anchors",
+    side_effect=lambda video_path: [Anchor(1, 0.0, 10.0), Anchor(2, 0.0, 3000.0)],
+)
+def test_compilation_reads_clips_from_videos(
+    mock_read_anchors, mock_read_stream_parameters, mock_run_command, tmp_path
+):
+    concat_lists = []
+    mock_run_command.side_effect = fake_run_command(concat_lists)
+    clips = [
+        CompilationClip("match_1.mp4", 1, 60.0, 70.0),
+        ("match_2.mp4", 2, 0.0, 5.0),
+        ("match_1.mp4", 2, 30.0, 40.0),
+    ]
+
+    compilation.write_compilation(clips, str(tmp_path / "goals.mp4"), max_workers=2)
+
+    assert sorted(args[0] for args, _ in mock_read_anchors.call_args_list) == [
+        "match_1.mp4",
+        "match_2.mp4",
+    ]
+
+    match_1 = os.path.abspath("match_1.mp4")
+    match_2 = os.path.abspath("match_2.mp4")
+    assert concat_lists == [
+        f"file '{match_1}'\ninpoint 70.00\noutpoint 80.00\n"
+        f"file '{match_2}'\ninpoint 3000.00\noutpoint 3005.00\n"
+        f"file '{match_1}'\ninpoint 3030.00\noutpoint 3040.00"
+    ]
+
+    command = mock_run_command.call_args[0][0]
+    assert command[command.index("-bsf:v") + 1] == "h264_mp4toannexb"
+    assert command[-1] == str(tmp_path / "goals.mp4")
+
+
+@patch("match_video.compilation.commands.run_command")
+@patch(
+    "match_video.compilation.read_stream_parameters",
+    side_effect=lambda video_path: SD if video_path == "old_match.mp4" else HD,
+)
+@patch(
+    "match_video.compilation.utils.read_anchors",
+    side_effect=lambda video_path: [Anchor(1, 0.0, 0.0)],
+)
+def test_compilation_mismatched_streams(
+    mock_read_anchors, mock_read_stream_parameters, mock_run_command
+):
+    clips = [("match.mp4", 1, 0.0, 10.0), ("old_match.mp4", 1, 0.0, 10.0)]
+
+    with pytest.raises(ValueError, match="old_match.mp4"):
+        compilation.get_compilation(clips)
+
+    mock_run_command.assert_not_called()
+
+
+@patch("match_video.compilation.commands.run_command")
+@patch(
+    "match_video.compilation.read_stream_parameters",
+    side_effect=lambda video_path: SD if video_path == "old_match.mp4" else HD,
+)
+@patch(
+    "match_video.compilation.utils.read_anchors",
+    side_effect=lambda video_path: [Anchor(1, 0.0, 0.0)],
+)
+def test_compilation_normalizes_mismatched_clips(
+    mock_read_anchors, mock_read_stream_parameters, mock_run_command
+):
+    concat_lists = []
+    mock_run_command.side_effect = fake_run_command(concat_lists)
+    clips = [("match.mp4", 1, 0.0, 10.0), ("old_match.mp4", 1, 5.0, 10.0)]
+
+    compilation.get_compilation(clips, normalize=True)
+
+    stages = [args[1] for args, _ in mock_run_command.call_args_list]
+    assert stages == ["normalize_clip", "compilation"]
+
+    normalize_command = mock_run_command.call_args_list[0][0][0]
+    assert normalize_command[normalize_command.index("-i") + 1] == "old_match.mp4"
+    assert "scale=1280:720,fps=25/1" in normalize_command
+    assert normalize_command[normalize_command.index("-ar") + 1] == "48000"
+
+    match = os.path.abspath("match.mp4")
+    assert concat_lists == [
+        f"file '{match}'\ninpoint 0.00\noutpoint 10.00\n"
+        f"file '{normalize_command[-1]}'"
+    ]
+
+
+@pytest.mark.parametrize("failed_stage", ["normalize_clip", "compilation"])
+@patch("match_video.compilation.commands.run_command")
+@patch(
+    "match_video.compilation.read_stream_parameters",
+    side_effect=lambda video_path: SD if video_path == "old_match.mp4" else HD,
+)
+@patch(
+    "match_video.compilation.utils.read_anchors",
+    side_effect=lambda video_path: [Anchor(1, 0.0, 0.0)],
+)
+def test_compilation_ffmpeg_fails(
+    mock_read_anchors, mock_read_stream_parameters, mock_run_command, failed_stage
+):
+    def run_command(command, stage, output_paths=(), universal_newlines=False):
+        returncode = 1 if stage == failed_stage else 0
+        stderr = b"old_match.mp4: Invalid data found when processing input\n"
+
+        return subprocess.CompletedProcess(command, returncode, b"", stderr)
+
+    mock_run_command.side_effect = run_command
+    clips = [("match.mp4", 1, 0.0, 10.0), ("old_match.mp4", 1, 5.0, 10.0)]
+
+    with pytest.raises(ValueError, match="Invalid data found"):
+        compilation.get_compilation(clips, normalize=True)
+
+
+def test_compilation_needs_clips():
+    with pytest.raises(ValueError):
+        compilation.get_compilation([])
+
+
+@patch("match_video.compilation.commands.run_command")
+def test_read_stream_parameters(mock_run_command, tmp_path):
+    video_path = str(tmp_path / "match.mp4")
+    open(video_path, "wb").close()
+    mock_run_command.return_value = subprocess.CompletedProcess(
+        [],
+        0,
+        """{"streams": [
+            {"codec_type": "video", "codec_name": "h264", "width": 1280,
+             "height": 720, "pix_fmt": "yuv420p", "r_frame_rate": "25/1",
+             "time_base": "1/12800"},
+            {"codec_type": "audio", "codec_name": "aac", "sample_rate": "48000",
+             "channels": 2}
+        ]}""",
+        "",
+    )
+
+    assert compilation.read_stream_parameters(video_path) == HD
+    assert compilation.read_stream_parameters(video_path) == HD
+    assert mock_run_command.call_count == 1
@@ -0,0 +1,94 @@
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+import match_video.detect as detect
+from match_video.anchor import Anchor
+from match_video.detect import Whistle
+
+
+def levels_output(levels):
+    lines = []
+
+    for index, (level, band_level) in enumerate(levels):
+        lines += [
+            f"frame:{index}    pts:{index * 3200}    pts_time:{index * 0.2:g}",
+            f"lavfi.astats.1.RMS_level={level}",
+            f"lavfi.astats.2.RMS_level={band_level}",
+        ]
+
+    return "\n".join(lines).encode()
+
+
+@patch("match_video.detect.commands.run_command")
+def test_detect_whistles(mock_run_command):
+    crowd = (-30.0, -42.0)
+    whistle = (-25.0, -26.5)
+    silence = (-70.0, -70.0)
+    mock_run_command.return_value = subprocess.CompletedProcess(
+        [],
+        0,
+        levels_output(
+            [
+                crowd,
+                whistle,
+                whistle,
+                whistle,
+                crowd,
+                whistle,
+                silence,
+                whistle,
+                whistle,
+            ]
+        ),
+        b"",
+    )
+
+    whistles = detect.detect_whistles("match.mp4")
+
+    assert whistles == [
+        Whistle(pytest.approx(0.2), pytest.approx(0.6)),
+        Whistle(pytest.approx(1.4), pytest.approx(0.4)),
+    ]
+    command, stage = mock_run_command.call_args[0]
+    assert stage == "detect_whistles"
+    assert command[command.index("-i") + 1] == "match.mp4"
+    assert "-vn" in command
+
+
+@patch(
+    "match_video.detect.commands.run_command",
+    return_value=subprocess.CompletedProcess([], 1, b"", b"Invalid argument"),
+)
+def test_detect_whistles_without_audio(mock_run_command):
+    with pytest.raises(ValueError):
+        detect.detect_whistles("match.mp4")
+
+
+def minutes(*times):
+    return [Whistle(time * 60, 1.0) for time in times]
+
+
+def test_half_starts_from_whistles():
+    whistles = minutes(4, 30, 45, 48, 51, 65, 66, 90, 120, 127)
+
+    assert detect.half_starts_from_whistles(whistles) == (240.0, 3900.0)
+
+
+def test_half_starts_need_half_time():
+    with pytest.raises(ValueError, match="half-time"):
+        detect.half_starts_from_whistles(minutes(2, 10, 30, 50, 52, 54))
+
+
+def test_half_starts_need_kickoff():
+    with pytest.raises(ValueError, match="kickoff"):
+        detect.half_starts_from_whistles(minutes(0, 70, 90))
+
+
+@patch("match_video.detect.detect_whistles", return_value=minutes(4, 49, 65, 97))
+def test_detect_half_starts(mock_detect_whistles):
+    assert detect.detect_half_starts("match.mp4") == [
+        Anchor(1, 0.0, 240.0),
+        Anchor(2, 0.0, 3900.0),
+    ]
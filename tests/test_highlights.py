@@ -0,0 +1,111 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+import match_video.highlights as highlights
+from match_video.highlights import Event
+
+OPTA_XML = """<?xml version="1.0" encoding="utf-8"?>
+<Games>
+  <Game id="1">
+    <Event id="1" type_id="1" period_id="1" min="0" sec="5" />
+    <Event id="2" type_id="16" period_id="1" min="23" sec="10">
+      <Q id="1" qualifier_id="56" value="Center" />
+    </Event>
+    <Event id="3" type_id="13" period_id="2" min="47" sec="30" />
+    <Event id="4" type_id="15" period_id="3" min="95" sec="0" />
+  </Game>
+</Games>
+"""
+
+
+def test_read_json_events(tmp_path):
+    events_path = tmp_path / "events.json"
+    events_path.write_text(
+        json.dumps({"events": [{"period": 1, "clock": 65.5, "type": "shot"}]})
+    )
+
+    assert list(highlights.read_events(str(events_path))) == [Event(1, 65.5, "shot")]
+
+
+def test_read_csv_events(tmp_path):
+    events_path = tmp_path / "events.csv"
+    events_path.write_text("period,clock,type\n1,65.5,shot\n2,10,goal\n")
+
+    assert list(highlights.read_events(str(events_path))) == [
+        Event(1, 65.5, "shot"),
+        Event(2, 10.0, "goal"),
+    ]
+
+
+def test_read_opta_events(tmp_path):
+    events_path = tmp_path / "events.xml"
+    events_path.write_text(OPTA_XML)
+
+    assert list(highlights.read_events(str(events_path))) == [
+        Event(1, 5.0, "1"),
+        Event(1, 1390.0, "16"),
+        Event(2, 150.0, "13"),
+        Event(3, 300.0, "15"),
+    ]
+
+
+def test_read_opta_events_skips_pre_and_post_match(tmp_path):
+    events_path = tmp_path / "events.xml"
+    events_path.write_text("""<?xml version="1.0" encoding="utf-8"?>
+<Games>
+  <Game id="1">
+    <Event id="1" type_id="34" period_id="16" min="0" sec="0" />
+    <Event id="2" type_id="32" period_id="1" min="0" sec="0" />
+    <Event id="3" type_id="30" period_id="14" min="0" sec="0" />
+  </Game>
+</Games>
+""")
+
+    assert list(highlights.read_events(str(events_path))) == [Event(1, 0.0, "32")]
+
+
+def test_read_events_unknown_format():
+    with pytest.raises(ValueError):
+        list(highlights.read_events("events.txt"))
+
+
+def test_highlight_clip_clocks():
+    events = [
+        Event(2, 100.0, "goal"),
+        Event(1, 3.0, "shot"),
+        Event(1, 60.0, "shot"),
+        Event(1, 66.0, "goal"),
+        Event(1, 80.0, "pass"),
+    ]
+
+    clip_clocks = highlights.highlight_clip_clocks(
+        events, before=5.0, after=3.0, types={"shot", "goal"}
+    )
+
+    assert clip_clocks == [
+        {"period": 1, "start_clock": 0.0, "end_clock": 6.0},
+        {"period": 1, "start_clock": 55.0, "end_clock": 69.0},
+        {"period": 2, "start_clock": 95.0, "end_clock": 103.0},
+    ]
+
+
+def test_highlight_clip_clocks_types_match_numbers():
+    clip_clocks = highlights.highlight_clip_clocks(
+        [Event(1, 60.0, "16"), Event(1, 120.0, "1")], types=[16]
+    )
+
+    assert clip_clocks == [{"period": 1, "start_clock": 55.0, "end_clock": 65.0}]
+
+
+@patch("match_video.highlights.utils.get_clips", return_value=b"clips")
+def test_get_highlights(mock_get_clips):
+    events = iter([Event(1, 60.0, "goal"), Event(1, 62.0, "goal")])
+
+    clips = highlights.get_highlights("path", events, max_workers=2)
+
+    assert clips == b"clips"
+    mock_get_clips.assert_called_once_with(
+        "path", [{"period": 1, "start_clock": 55.0, "end_clock": 67.0}], max_workers=2
+    )
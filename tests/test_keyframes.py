@@ -0,0 +1,70 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import match_video.keyframes as keyframes
+from match_video.cache import VideoCache
+
+
+def test_parse_keyframes():
+    packets_csv = """0.000000,K__
+0.160000,___
+0.080000,___
+2.000000,K__
+N/A,K__
+1.960000,___"""
+
+    assert keyframes._parse_keyframes(packets_csv) == [0.0, 2.0]
+
+
+@patch("subprocess.run")
+def test_read_keyframe_index(mock_subprocess_run, tmp_path):
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"video")
+    streams = MagicMock()
+    streams.stdout = json.dumps(
+        {
+            "streams": [
+                {
+                    "codec_type": "video",
+                    "codec_name": "h264",
+                    "pix_fmt": "yuv420p",
+                    "time_base": "1/12800",
+                },
+                {"codec_type": "audio", "codec_name": "aac", "time_base": "1/48000"},
+            ]
+        }
+    )
+    packets = MagicMock()
+    packets.stdout = "2.000000,K__\n0.000000,K__\n0.040000,___\n"
+    mock_subprocess_run.side_effect = [streams, packets]
+    cache = VideoCache(str(tmp_path / "cache"))
+
+    index = keyframes.read_keyframe_index(str(video_path), cache)
+    cached_index = keyframes.read_keyframe_index(str(video_path), cache)
+
+    assert mock_subprocess_run.call_count == 2
+    assert index == cached_index
+    assert index == keyframes.KeyframeIndex(
+        keyframes=[0.0, 2.0],
+        video_codec="h264",
+        pixel_format="yuv420p",
+        timescale=12800,
+        audio_codec="aac",
+    )
+
+
+@patch("subprocess.run")
+def test_read_keyframe_index_bad_path(mock_subprocess_run, tmp_path):
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"video")
+    mock_subprocess_run.return_value = MagicMock()
+    mock_subprocess_run.return_value.stdout = json.dumps(
+        {"error": {"code": -1094995529, "string": "Invalid data found"}}
+    )
+
+    with pytest.raises(ValueError):
+        keyframes.read_keyframe_index(
+            str(video_path), VideoCache(str(tmp_path / "cache"))
+        )
@@ -0,0 +1,119 @@
+import json
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+import match_video as mv
+import match_video.launcher as launcher
+import match_video.utils as utils
+from benchmarks.import_time import IMPORT_BUDGET_MS
+from match_video.anchor import Anchor
+
+
+def run_python(code, *options):
+    result = subprocess.run(
+        [sys.executable, *options, "-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+    return result.stdout, result.stderr
+
+
+def test_import_is_lazy():
+    stdout, _ = run_python(
+        "import sys, match_video\n"
+        "print(sorted(name for name in sys.modules\n"
+        "    if name.startswith('match_video') or name in ('asyncio', 'typer')))"
+    )
+
+    assert stdout.strip() == "['match_video']"
+
+
+def test_read_anchors_does_not_load_sqlite():
+    stdout, _ = run_python(
+        "import sys, match_video.launcher, match_video.utils\n"
+        "print('sqlite3' in sys.modules)"
+    )
+
+    assert stdout.strip() == "False"
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime needs 3.7")
+def test_import_time_budget():
+    cumulative_ms = []
+
+    for _ in range(3):
+        _, stderr = run_python("import match_video", "-X", "importtime")
+        (line,) = [line for line in stderr.splitlines() if line.endswith("match_video")]
+        cumulative_ms.append(int(line.split("|")[1]) / 1000)
+
+    assert min(cumulative_ms) < IMPORT_BUDGET_MS
+
+
+def test_lazy_exports():
+    assert mv.get_clip is utils.get_clip
+    assert set(mv.__all__) <= set(dir(mv))
+
+    for name in mv.__all__:
+        assert getattr(mv, name) is not None
+
+    with pytest.raises(AttributeError):
+        mv.not_exported
+
+
+def test_read_anchors_fast_path(tmp_path):
+    video_path = tmp_path / "match.mp4"
+    video_path.write_bytes(b"")
+    (tmp_path / "match.mp4.anchors.json").write_text(
+        json.dumps(
+            {
+                "anchors": [
+                    {"period": 1, "clock": 0.0, "video_time": 5.0},
+                    {"period": 2, "clock": 2700.0, "video_time": 3305.0},
+                ]
+            }
+        )
+    )
+
+    stdout, _ = run_python(
+        "import sys\n"
+        "from match_video.launcher import main\n"
+        f"main(['read-anchors', {str(video_path)!r}, '--store=json'])\n"
+        "print('typer' in sys.modules)"
+    )
+
+    assert stdout.splitlines() == [
+        "Period 1 0:00 | 0:05 in video",
+        "Period 2 45:00 | 55:05 in video",
+        "False",
+    ]
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["set-half-starts", "match.mp4", "0:00", "60:00"],
+        ["read-anchors", "--help"],
+        ["read-anchors", "a.mp4", "b.mp4"],
+        ["read-anchors", "match.mp4", "--store", "mongodb"],
+    ],
+)
+@patch("match_video.utils.read_anchors")
+@patch("match_video.cli.app")
+def test_other_commands_use_typer(mock_app, mock_read_anchors, args):
+    launcher.main(args)
+
+    mock_app.assert_called_once_with(args=args, prog_name="match-video")
+    mock_read_anchors.assert_not_called()
+
+
+def test_anchor_lines():
+    assert launcher.anchor_lines([]) == ["No anchors set for video"]
+    assert launcher.anchor_lines([Anchor(2, 2730.5, 3600.0)]) == [
+        "Period 2 45:30 | 60:00 in video"
+    ]
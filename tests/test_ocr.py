@@ -0,0 +1,96 @@
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+import match_video.ocr as ocr
+from match_video.anchor import Anchor
+from match_video.ocr import ClockReading
+
+
+def readings(video_times, offset):
+    return [ClockReading(time, time - offset) for time in video_times]
+
+
+@pytest.mark.parametrize(
+    "text, clock",
+    [("67:12\n", 4032), ("0 5 : 09", 309), ("45.00", 2700), ("", None), ("7:9", None)],
+)
+def test_parse_clock(text, clock):
+    assert ocr.parse_clock(text) == clock
+
+
+def test_clock_anchors():
+    first_half = (
+        readings(range(100, 1200), 100)
+        + [ClockReading(1200, 3000)]
+        + readings(range(1201, 1500), 100)
+        # a minute of footage is cut
+        + readings(range(1500, 2800), 40)
+    )
+    half_time = [ClockReading(time, None) for time in range(2800, 3700)]
+    second_half = readings(range(3700, 4000), 1000)
+
+    assert ocr.clock_anchors(first_half + half_time + second_half) == [
+        Anchor(1, 0.0, 100),
+        Anchor(1, 1460.0, 1500),
+        Anchor(2, 0.0, 3700),
+    ]
+
+
+def test_clock_anchors_stopped_clock():
+    first_half = readings(range(0, 2700), 0) + [
+        ClockReading(time, 2700) for time in range(2700, 2900)
+    ]
+    second_half = readings(range(3800, 3900), 1100)
+
+    assert ocr.clock_anchors(first_half + second_half) == [
+        Anchor(1, 0.0, 0),
+        Anchor(2, 0.0, 3800),
+    ]
+
+
+def test_clock_anchors_start_in_second_half():
+    assert ocr.clock_anchors(readings(range(10, 100), -3000)) == [Anchor(2, 310.0, 10)]
+
+
+@patch("match_video.ocr._read_chunk_clock")
+@patch("match_video.ocr._read_duration", return_value=650.0)
+def test_read_match_clock_in_chunks(mock_read_duration, mock_read_chunk_clock):
+    mock_read_chunk_clock.side_effect = lambda video_path, region, start, end, _: [
+        ClockReading(start, None)
+    ]
+
+    clock_readings = ocr.read_match_clock("match.mp4", (0, 0, 80, 30), max_workers=3)
+
+    assert [reading.video_time for reading in clock_readings] == [0.0, 300.0, 600.0]
+    assert sorted(args[2:4] for args, _ in mock_read_chunk_clock.call_args_list) == [
+        (0.0, 300.0),
+        (300.0, 600.0),
+        (600.0, 650.0),
+    ]
+
+
+@patch("match_video.ocr.commands.run_command")
+def test_read_chunk_clock(mock_run_command):
+    def run_command(command, stage, output_paths=(), universal_newlines=False):
+        if stage == "sample_clock":
+            for index in range(3):
+                open(command[-1] % index, "wb").close()
+
+            return subprocess.CompletedProcess(command, 0, b"", b"")
+
+        with open(command[1]) as frames_file:
+            assert len(frames_file.read().splitlines()) == 3
+
+        return subprocess.CompletedProcess(command, 0, "12:00\n\f12:02\n\f\f", "")
+
+    mock_run_command.side_effect = run_command
+
+    assert ocr._read_chunk_clock("match.mp4", (10, 20, 80, 30), 300.0, 304.0, 2.0) == [
+        ClockReading(300.0, 720),
+        ClockReading(302.0, 722),
+    ]
+
+    sample_command = mock_run_command.call_args_list[0][0][0]
+    assert "fps=1/2,crop=80:30:10:20,scale=iw*3:ih*3,format=gray" in sample_command
@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+import match_video.server as server
+from match_video.anchor import Anchor
+from match_video.commands import StageMetrics
+
+
+@pytest.fixture
+def video_root(tmp_path):
+    (tmp_path / "match.mp4").write_bytes(b"video")
+
+    return tmp_path
+
+
+@pytest.fixture
+def base_url(video_root):
+    clip_server = server.make_server(port=0, video_root=str(video_root), max_workers=2)
+    thread = threading.Thread(target=clip_server.serve_forever, args=(0.05,))
+    thread.start()
+
+    yield f"http://127.0.0.1:{clip_server.server_port}"
+
+    clip_server.shutdown()
+    clip_server.server_close()
+    clip_server.service.shutdown()
+    thread.join()
+
+
+def get(url, data=None):
+    try:
+        with urllib.request.urlopen(url, data=data) as response:
+            return response.status, response.headers["Content-Type"], response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers["Content-Type"], error.read()
+
+
+@patch(
+    "match_video.server.utils.read_anchors",
+    return_value=[Anchor(1, 0.0, 4.0), Anchor(2, 0.0, 3000.0)],
+)
+def test_anchors(mock_read_anchors, base_url, video_root):
+    status, content_type, body = get(f"{base_url}/anchors?video=match.mp4")
+
+    assert status == 200
+    assert content_type == "application/json"
+    assert json.loads(body) == [
+        {"period": 1, "clock": 0.0, "video_time": 4.0},
+        {"period": 2, "clock": 0.0, "video_time": 3000.0},
+    ]
+    mock_read_anchors.assert_called_once_with(str(video_root / "match.mp4"))
+
+
+@patch("match_video.server.utils.get_clip", return_value=b"clip")
+def test_clip(mock_get_clip, base_url, video_root):
+    status, content_type, body = get(
+        f"{base_url}/clip?video=match.mp4&period=2&start_clock=60&end_clock=70"
+    )
+
+    assert status == 200
+    assert content_type == "video/mp4"
+    assert body == b"clip"
+    mock_get_clip.assert_called_once_with(
+        str(video_root / "match.mp4"), 2, 60.0, 70.0, smart_cut=False, cache=None
+    )
+
+
+@patch("match_video.server.utils.get_clips", return_value=b"clips")
+def test_clips(mock_get_clips, base_url):
+    clip_clocks = [
+        {"period": 1, "start_clock": 0, "end_clock": 10},
+        {"period": 2, "start_clock": 0, "end_clock": 10},
+    ]
+    request = json.dumps({"video": "match.mp4", "clips": clip_clocks}).encode()
+
+    status, _, body = get(f"{base_url}/clips", data=request)
+
+    assert status == 200
+    assert body == b"clips"
+    assert mock_get_clips.call_args[0][1] == clip_clocks
+
+
+def test_identical_requests_share_extraction(base_url):
+    calls = []
+
+    def get_clip(*args, **kwargs):
+        calls.append(args)
+        time.sleep(0.5)
+        return b"clip"
+
+    url = f"{base_url}/clip?video=match.mp4&period=1&start_clock=0&end_clock=10"
+
+    with patch("match_video.server.utils.get_clip", side_effect=get_clip):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(lambda _: get(url), range(4)))
+
+    assert [body for _, _, body in responses] == [b"clip"] * 4
+    assert len(calls) == 1
+
+
+def test_video_outside_root(base_url):
+    status, _, body = get(f"{base_url}/anchors?video=../secret.mp4")
+
+    assert status == 403
+    assert "outside the video root" in json.loads(body)["error"]
+
+
+def test_missing_video(base_url):
+    status, _, _ = get(f"{base_url}/anchors?video=other.mp4")
+
+    assert status == 404
+
+
+def test_bad_request(base_url):
+    status, _, body = get(f"{base_url}/clip?video=match.mp4&period=1")
+
+    assert status == 400
+    assert json.loads(body) == {"error": "start_clock is required"}
+
+
+@pytest.mark.parametrize(
+    "request_body, error",
+    [
+        ([], "The request body must be a JSON object"),
+        ({"video": "match.mp4", "clips": [1, 2]}, "Each clip must be an object"),
+        ({"video": ["match.mp4"], "clips": [{}]}, "video must be a string"),
+        (
+            {"video": "match.mp4", "clips": [{"period": None, "start_clock": 0}]},
+            "period, start_clock and end_clock must be numbers",
+        ),
+    ],
+)
+def test_clips_bad_request_body(base_url, request_body, error):
+    status, _, body = get(f"{base_url}/clips", data=json.dumps(request_body).encode())
+
+    assert status == 400
+    assert json.loads(body) == {"error": error}
+
+
+@patch(
+    "match_video.server.utils.get_clip",
+    side_effect=ValueError("No anchors set in period 3 before 0:00"),
+)
+def test_clip_error(mock_get_clip, base_url):
+    status, _, body = get(
+        f"{base_url}/clip?video=match.mp4&period=3&start_clock=0&end_clock=10"
+    )
+
+    assert status == 400
+    assert json.loads(body) == {"error": "No anchors set in period 3 before 0:00"}
+
+
+def test_metrics(base_url):
+    with patch(
+        "match_video.server.commands.command_metrics",
+        return_value={"concat": StageMetrics(2, 1, 1.5, 1.0, 300)},
+    ):
+        status, content_type, body = get(f"{base_url}/metrics")
+
+    assert status == 200
+    assert json.loads(body) == {
+        "concat": {
+            "count": 2,
+            "failures": 1,
+            "seconds": 1.5,
+            "max_seconds": 1.0,
+            "output_bytes": 300,
+        }
+    }
@@ -0,0 +1,122 @@
+from unittest.mock import patch
+
+import pytest
+
+import match_video.stores as stores
+import match_video.utils as utils
+from match_video.anchor import Anchor
+
+ANCHORS = [Anchor(1, 0.0, 4.0), Anchor(2, 0.0, 3800.0)]
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    path = tmp_path / "match.mp4"
+    path.write_bytes(b"video" * 1000)
+
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def reset_default_store():
+    yield
+
+    stores.set_default_store(None)
+
+
+def test_json_sidecar_store(video_path):
+    store = stores.JSONSidecarStore()
+
+    assert store.read(video_path) == []
+
+    store.write(video_path, video_path, ANCHORS)
+
+    assert store.read(video_path) == ANCHORS
+    assert store.sidecar_path(video_path) == f"{video_path}.anchors.json"
+
+
+def test_json_sidecar_store_copies_video(video_path, tmp_path):
+    store = stores.JSONSidecarStore()
+    output_path = str(tmp_path / "output.mp4")
+
+    store.write(video_path, output_path, ANCHORS)
+
+    assert open(output_path, "rb").read() == open(video_path, "rb").read()
+    assert store.read(output_path) == ANCHORS
+    assert store.read(video_path) == []
+
+
+def test_sqlite_store(video_path, tmp_path):
+    store = stores.SQLiteStore(str(tmp_path / "anchors.db"))
+
+    assert store.read(video_path) == []
+
+    store.write(video_path, video_path, ANCHORS)
+    store.write(video_path, video_path, ANCHORS[:1])
+
+    assert store.read(video_path) == ANCHORS[:1]
+
+
+def test_sqlite_store_follows_moved_video(video_path, tmp_path):
+    store = stores.SQLiteStore(str(tmp_path / "anchors.db"))
+    store.write(video_path, video_path, ANCHORS)
+
+    moved_path = str(tmp_path / "moved.mp4")
+    with open(video_path, "rb") as video_file, open(moved_path, "wb") as moved_file:
+        moved_file.write(video_file.read())
+
+    assert store.read(moved_path) == ANCHORS
+
+
+def test_video_hash(tmp_path):
+    first_path = tmp_path / "first.mp4"
+    second_path = tmp_path / "second.mp4"
+    first_path.write_bytes(b"a" * 3 * 1024 * 1024)
+    second_path.write_bytes(b"a" * 3 * 1024 * 1024 + b"b")
+
+    assert stores.video_hash(str(first_path)) == stores.video_hash(str(first_path))
+    assert stores.video_hash(str(first_path)) != stores.video_hash(str(second_path))
+
+
+def test_open_store(tmp_path):
+    assert isinstance(stores.open_store("chapters"), stores.ChapterStore)
+    assert isinstance(stores.open_store("json"), stores.JSONSidecarStore)
+
+    sqlite_store = stores.open_store(f"sqlite:{tmp_path / 'anchors.db'}")
+    assert isinstance(sqlite_store, stores.SQLiteStore)
+
+    with pytest.raises(ValueError):
+        stores.open_store("sqlite:")
+
+
+def test_default_store(monkeypatch):
+    assert isinstance(stores.get_default_store(), stores.ChapterStore)
+
+    stores.set_default_store(None)
+    monkeypatch.setenv("MATCH_VIDEO_ANCHOR_STORE", "json")
+
+    assert isinstance(stores.get_default_store(), stores.JSONSidecarStore)
+
+
+def test_read_and_write_anchors_use_store(video_path):
+    store = stores.JSONSidecarStore()
+    stores.set_default_store(store)
+
+    with patch("subprocess.run") as mock_subprocess_run:
+        utils.write_anchors(video_path, video_path, ANCHORS)
+
+        assert utils.read_anchors(video_path) == ANCHORS
+        assert utils.read_anchors(video_path, store=store) == ANCHORS
+
+    mock_subprocess_run.assert_not_called()
+
+
+@patch("match_video.utils._read_chapter_anchors", return_value=ANCHORS)
+def test_migrate_anchors(mock_read_chapter_anchors, video_path):
+    target = stores.JSONSidecarStore()
+
+    anchors = stores.migrate_anchors(video_path, stores.ChapterStore(), target)
+
+    assert anchors == ANCHORS
+    assert target.read(video_path) == ANCHORS
+    mock_read_chapter_anchors.assert_called_once_with(video_path)
@@ -1,4 +1,6 @@
+import io
 import json
+import os
 import subprocess
 from unittest.mock import MagicMock, patch
 
@@ -6,11 +8,26 @@ import pytest
 
 import match_video.utils as utils
 from match_video.anchor import Anchor
+from match_video.cache import ClipCache
+from match_video.keyframes import KeyframeIndex
+
+
+def read_concat_lists(concat_lists):
+    """Make a subprocess.run side effect that keeps the concat lists ffmpeg reads."""
+
+    def run(command, **kwargs):
+        if "concat" in command:
+            with open(command[command.index("-i") + 1]) as concat_list_file:
+                concat_lists.append(concat_list_file.read())
+
+        return subprocess.CompletedProcess(command, 0, b"", b"")
+
+    return run
 
 
 @patch("match_video.utils.NamedTemporaryFile")
 @patch("os.path.exists", return_value=False)
-@patch("subprocess.run")
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
 def test_write_anchors_no_periods(
     mock_subprocess_run, mock_exists, mock_temp_file_context
 ):
@@ -34,7 +51,7 @@ encoder=Lavf58.76.100"""
 
 @patch("match_video.utils.NamedTemporaryFile")
 @patch("os.path.exists", return_value=False)
-@patch("subprocess.run")
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
 def test_write_anchors_two_periods(
     mock_subprocess_run, mock_exists, mock_temp_file_context
 ):
@@ -79,7 +96,7 @@ title=Period 2, 0.0"""
 
 @patch("match_video.utils.NamedTemporaryFile")
 @patch("os.path.exists", return_value=False)
-@patch("subprocess.run")
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
 def test_write_anchors_overwrite(
     mock_subprocess_run, mock_exists, mock_temp_file_context
 ):
@@ -127,13 +144,23 @@ title=Period 3, 10.0"""
     mock_temp_file.write.assert_called_once_with(expected_metadata)
 
 
-@patch("shutil.copy2")
+@patch("os.remove")
+@patch("os.replace")
+@patch("shutil.copymode")
+@patch("os.path.getsize", return_value=1000)
 @patch("match_video.utils.NamedTemporaryFile")
 @patch("os.path.samefile", return_value=True)
 @patch("os.path.exists", return_value=True)
-@patch("subprocess.run")
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
 def test_write_anchors_inplace(
-    mock_subprocess_run, mock_exists, mock_samefile, mock_temp_file_context, mock_copy2
+    mock_subprocess_run,
+    mock_exists,
+    mock_samefile,
+    mock_temp_file_context,
+    mock_getsize,
+    mock_copymode,
+    mock_replace,
+    mock_remove,
 ):
     existing_metadata = """;FFMETADATA1
 major_brand=brand
@@ -176,7 +203,46 @@ title=Period 2, 0.0"""
     mock_temp_file = mock_temp_file_context.return_value.__enter__.return_value
     mock_temp_file.write.assert_called_once_with(expected_metadata)
 
-    mock_copy2.assert_called_once_with("intermediate_file_name", "path")
+    assert mock_subprocess_run.call_args[0][0][-1] == "intermediate_file_name"
+    mock_copymode.assert_called_once_with("path", "intermediate_file_name")
+    mock_replace.assert_called_once_with("intermediate_file_name", "path")
+
+
+def test_write_anchors_inplace_keeps_video_if_write_fails(tmp_path):
+    video_path = tmp_path / "match.mp4"
+    video_path.write_bytes(b"video")
+
+    with patch("subprocess.run"):
+        with pytest.raises(ValueError):
+            utils.write_anchors(str(video_path), str(video_path), [])
+
+    assert video_path.read_bytes() == b"video"
+    assert os.listdir(tmp_path) == ["match.mp4"]
+
+
+def test_write_anchors_inplace_keeps_video_if_ffmpeg_fails(tmp_path):
+    video_path = tmp_path / "match.mp4"
+    video_path.write_bytes(b"video")
+
+    def run(command, **kwargs):
+        if "ffmetadata" in command:
+            with open(command[-1], "w") as metadata_file:
+                metadata_file.write(";FFMETADATA1\n")
+
+            return subprocess.CompletedProcess(command, 0, b"", b"")
+
+        # ffmpeg killed part way through the copy, e.g. by a file size limit
+        with open(command[-1], "wb") as output_file:
+            output_file.write(b"partial")
+
+        return subprocess.CompletedProcess(command, -25, b"", b"")
+
+    with patch("subprocess.run", side_effect=run):
+        with pytest.raises(ValueError):
+            utils.write_anchors(str(video_path), str(video_path), [])
+
+    assert video_path.read_bytes() == b"video"
+    assert os.listdir(tmp_path) == ["match.mp4"]
 
 
 @patch("subprocess.run")
@@ -326,7 +392,6 @@ def test_read_anchors_bad_path(mock_subprocess_run):
 
 @patch("match_video.utils._extract_clip")
 @patch("match_video.utils.NamedTemporaryFile")
-@patch("match_video.utils._video_sans_chapters")
 @patch(
     "match_video.utils.read_anchors",
     return_value=[
@@ -336,19 +401,44 @@ def test_read_anchors_bad_path(mock_subprocess_run):
 )
 def test_get_clip(
     mock_read_anchors,
-    mock_video_sans_chapters_context,
     mock_temp_file_context,
     mock_extract_clip,
 ):
     clip = utils.get_clip("path", 1, 0.0, 10.0)
 
-    video_sans_chapters_path = (
-        mock_video_sans_chapters_context.return_value.__enter__.return_value
-    )
     clip_file_path = mock_temp_file_context.return_value.__enter__.return_value.name
 
-    mock_extract_clip.assert_called_once_with(
-        video_sans_chapters_path, clip_file_path, 0.0, 10.0
+    mock_extract_clip.assert_called_once_with("path", clip_file_path, 0.0, 10.0)
+
+
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
+def test_extract_clip_without_chapters(mock_subprocess_run):
+    utils._extract_clip("input_path", "output_path", 10.0, 20.0)
+
+    mock_subprocess_run.assert_called_once_with(
+        [
+            "ffmpeg",
+            "-y",
+            "-ss",
+            "10.00",
+            "-to",
+            "20.00",
+            "-i",
+            "input_path",
+            "-map",
+            "0",
+            "-map",
+            "-0:d?",
+            "-vcodec",
+            "copy",
+            "-acodec",
+            "copy",
+            "-map_chapters",
+            "-1",
+            "output_path",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
     )
 
 
@@ -442,3 +532,625 @@ def test_get_video_time_before_first_anchor_in_period():
 
     with pytest.raises(ValueError):
         utils._get_video_times(anchors, 1, 10.0, 20.0)
+
+
+@patch("subprocess.run")
+def test_read_anchors_cached(mock_subprocess_run, tmp_path):
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"video")
+    mock_subprocess_run.return_value = MagicMock()
+    mock_subprocess_run.return_value.stdout = json.dumps(
+        {
+            "chapters": [
+                {
+                    "start_time": "10.000000",
+                    "tags": {"title": "Period 1, 0.0"},
+                }
+            ]
+        }
+    )
+    utils.clear_anchor_cache()
+
+    first_result = utils.read_anchors(str(video_path))
+    second_result = utils.read_anchors(str(video_path))
+
+    mock_subprocess_run.assert_called_once()
+    assert first_result == second_result == [Anchor(1, 0.0, 10.0)]
+
+    cache_info = utils.anchor_cache_info()
+    assert cache_info.hits == 1
+    assert cache_info.misses == 1
+
+
+@patch("subprocess.run")
+def test_read_anchors_cache_invalidated_by_video_change(mock_subprocess_run, tmp_path):
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"video")
+    mock_subprocess_run.return_value = MagicMock()
+    mock_subprocess_run.return_value.stdout = json.dumps({"chapters": []})
+    utils.clear_anchor_cache()
+
+    utils.read_anchors(str(video_path))
+    video_path.write_bytes(b"edited video")
+    utils.read_anchors(str(video_path))
+
+    assert mock_subprocess_run.call_count == 2
+
+
+@patch("match_video.utils.NamedTemporaryFile")
+@patch("os.path.exists", return_value=False)
+@patch("subprocess.run")
+def test_read_anchors_cache_invalidated_by_write_anchors(
+    mock_subprocess_run, mock_exists, mock_temp_file_context, tmp_path
+):
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"video")
+    mock_subprocess_run.return_value = subprocess.CompletedProcess(
+        [], 0, json.dumps({"chapters": []})
+    )
+    mock_temp_file_context.return_value.__enter__.return_value.read.return_value = ""
+    utils.clear_anchor_cache()
+
+    utils.read_anchors(str(video_path))
+    utils.write_anchors("input_path", str(video_path), [Anchor(1, 0.0, 10.0)])
+    utils.read_anchors(str(video_path))
+
+    ffprobe_calls = [
+        args
+        for args, _ in mock_subprocess_run.call_args_list
+        if args[0][0] == "ffprobe"
+    ]
+    assert len(ffprobe_calls) == 2
+
+
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
+def test_extract_clips_one_process(mock_subprocess_run):
+    utils._extract_clips(
+        "input_path", ["output_path_1", "output_path_2"], [(10.0, 20.0), (30.0, 40.0)]
+    )
+
+    mock_subprocess_run.assert_called_once_with(
+        [
+            "ffmpeg",
+            "-y",
+            "-ss",
+            "10.00",
+            "-to",
+            "20.00",
+            "-i",
+            "input_path",
+            "-ss",
+            "30.00",
+            "-to",
+            "40.00",
+            "-i",
+            "input_path",
+            "-map",
+            "0",
+            "-map",
+            "-0:d?",
+            "-vcodec",
+            "copy",
+            "-acodec",
+            "copy",
+            "-map_chapters",
+            "-1",
+            "output_path_1",
+            "-map",
+            "1",
+            "-map",
+            "-1:d?",
+            "-vcodec",
+            "copy",
+            "-acodec",
+            "copy",
+            "-map_chapters",
+            "-1",
+            "output_path_2",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+
+@patch("match_video.utils._extract_clip")
+@patch("match_video.utils._extract_clips")
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_export_clips_single_pass(
+    mock_read_anchors, mock_extract_clips, mock_extract_clip
+):
+    clip_clocks = [
+        {"period": 1, "start_clock": float(i), "end_clock": i + 1.0} for i in range(10)
+    ]
+    output_paths = [f"clip_{i}.mp4" for i in range(10)]
+
+    utils.export_clips("path", clip_clocks, output_paths, single_pass=True)
+
+    mock_extract_clip.assert_not_called()
+    assert mock_extract_clips.call_count == 2
+
+    batches = [args for args, _ in mock_extract_clips.call_args_list]
+    assert [video_times for _, _, video_times in batches] == [
+        [(float(i), i + 1.0) for i in range(8)],
+        [(8.0, 9.0), (9.0, 10.0)],
+    ]
+
+
+@patch("match_video.utils._extract_clip")
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_export_clips_parallel(mock_read_anchors, mock_extract_clip):
+    clip_clocks = [
+        {"period": 2, "start_clock": float(i), "end_clock": i + 1.0} for i in range(10)
+    ]
+    output_paths = [f"clip_{i}.mp4" for i in range(10)]
+
+    utils.export_clips("path", clip_clocks, output_paths, max_workers=4)
+
+    assert mock_extract_clip.call_count == 10
+    extracted = {args[1]: args[2:] for args, _ in mock_extract_clip.call_args_list}
+    assert extracted == {f"clip_{i}.mp4": (1000.0 + i, 1001.0 + i) for i in range(10)}
+
+
+def test_export_clips_wrong_number_of_paths():
+    clip_clocks = [
+        {"period": 1, "start_clock": 0.0, "end_clock": 10.0},
+    ]
+
+    with pytest.raises(ValueError):
+        utils.export_clips("path", clip_clocks, ["clip_1.mp4", "clip_2.mp4"])
+
+
+@patch("subprocess.run")
+@patch("match_video.utils._extract_clip")
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_get_clips_reads_clips_from_video(
+    mock_read_anchors, mock_extract_clip, mock_subprocess_run
+):
+    concat_lists = []
+    mock_subprocess_run.side_effect = read_concat_lists(concat_lists)
+    clip_clocks = [
+        {"period": 2, "start_clock": 5.0, "end_clock": 10.0},
+        {"period": 1, "start_clock": 0.0, "end_clock": 10.0},
+    ]
+
+    utils.get_clips("path", clip_clocks, max_workers=3)
+
+    mock_extract_clip.assert_not_called()
+    assert mock_subprocess_run.call_count == 1
+
+    video_path = os.path.abspath("path")
+    assert concat_lists == [
+        f"file '{video_path}'\ninpoint 1005.00\noutpoint 1010.00\n"
+        f"file '{video_path}'\ninpoint 0.00\noutpoint 10.00"
+    ]
+
+    command = mock_subprocess_run.call_args[0][0]
+    assert command[command.index("-map_chapters") + 1] == "-1"
+
+
+@patch("subprocess.run")
+@patch("match_video.utils._smart_cut_clip")
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_get_clips_smart_cut_keeps_order(
+    mock_read_anchors, mock_smart_cut_clip, mock_subprocess_run
+):
+    concat_lists = []
+    mock_subprocess_run.side_effect = read_concat_lists(concat_lists)
+    clip_clocks = [
+        {"period": 1, "start_clock": float(i), "end_clock": i + 1.0} for i in range(5)
+    ]
+
+    utils.get_clips("path", clip_clocks, max_workers=3, smart_cut=True)
+
+    assert mock_smart_cut_clip.call_count == 5
+    clip_paths = {args[2]: args[1] for args, _ in mock_smart_cut_clip.call_args_list}
+    assert concat_lists == [
+        "\n".join(f"file '{clip_paths[float(i)]}'" for i in range(5))
+    ]
+
+
+def test_concat_quote():
+    assert utils._concat_quote("/videos/match.mp4") == "'/videos/match.mp4'"
+    assert utils._concat_quote("/videos/o'neill.mp4") == "'/videos/o'\\''neill.mp4'"
+
+
+@patch("match_video.utils._extract_clip")
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_write_clip_to_path(mock_read_anchors, mock_extract_clip):
+    utils.write_clip("path", 2, 0.0, 10.0, "clip.mp4")
+
+    mock_extract_clip.assert_called_once_with("path", "clip.mp4", 1000.0, 1010.0)
+
+
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_write_clip_to_file_object(mock_read_anchors):
+    def extract_clip(input_video_path, output_video_path, start_time, end_time):
+        with open(output_video_path, "wb") as clip_file:
+            clip_file.write(b"clip")
+
+    output = io.BytesIO()
+
+    with patch("match_video.utils._extract_clip", side_effect=extract_clip):
+        utils.write_clip("path", 1, 0.0, 10.0, output)
+
+    assert output.getvalue() == b"clip"
+
+
+@patch("match_video.utils.read_anchors", return_value=[])
+def test_write_clips_no_anchors(mock_read_anchors):
+    clip_clocks = [
+        {"period": 1, "start_clock": 0.0, "end_clock": 10.0},
+    ]
+
+    with pytest.raises(ValueError):
+        utils.write_clips("path", clip_clocks, "clips.mp4")
+
+
+@patch("subprocess.Popen")
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_stream_clip(mock_read_anchors, mock_popen):
+    mock_popen.return_value.stdout = io.BytesIO(b"fragmented clip")
+    mock_popen.return_value.poll.return_value = 0
+    mock_popen.return_value.returncode = 0
+
+    chunks = list(utils.stream_clip("path", 1, 0.0, 10.0, chunk_size=4))
+
+    assert b"".join(chunks) == b"fragmented clip"
+    assert chunks[0] == b"frag"
+
+    command = mock_popen.call_args[0][0]
+    assert command[-5:] == [
+        "-movflags",
+        "frag_keyframe+empty_moov",
+        "-f",
+        "mp4",
+        "pipe:1",
+    ]
+
+
+@patch("subprocess.Popen")
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_stream_clip_closed_early(mock_read_anchors, mock_popen):
+    mock_popen.return_value.stdout = io.BytesIO(b"fragmented clip")
+    mock_popen.return_value.poll.return_value = None
+
+    chunks = utils.stream_clip("path", 1, 0.0, 10.0, chunk_size=4)
+    next(chunks)
+    chunks.close()
+
+    mock_popen.return_value.kill.assert_called_once()
+
+
+@patch("subprocess.Popen")
+@patch("match_video.utils.read_anchors", return_value=[Anchor(1, 0.0, 0.0)])
+def test_stream_clip_ffmpeg_fails(mock_read_anchors, mock_popen):
+    def popen(command, stdout, stderr):
+        stderr.write(b"path: Invalid data found when processing input\n")
+        process = MagicMock()
+        process.stdout = io.BytesIO(b"")
+        process.returncode = 1
+
+        return process
+
+    mock_popen.side_effect = popen
+
+    with pytest.raises(ValueError, match="Invalid data found"):
+        list(utils.stream_clip("path", 1, 0.0, 10.0))
+
+
+@patch("match_video.utils.read_anchors", return_value=[])
+def test_stream_clip_no_anchors(mock_read_anchors):
+    with pytest.raises(ValueError):
+        utils.stream_clip("path", 1, 0.0, 10.0)
+
+
+@patch("match_video.utils._extract_clip")
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_write_hls(mock_read_anchors, mock_subprocess_run, mock_extract_clip, tmp_path):
+    output_directory = str(tmp_path / "hls")
+    clip_clocks = [
+        {"period": 1, "start_clock": 0.0, "end_clock": 10.0},
+        {"period": 2, "start_clock": 0.0, "end_clock": 10.0},
+    ]
+
+    playlist_path = utils.write_hls(
+        "path", clip_clocks, output_directory, segment_duration=4
+    )
+
+    assert playlist_path == os.path.join(output_directory, "index.m3u8")
+    assert os.path.isdir(output_directory)
+    mock_extract_clip.assert_not_called()
+
+    command = mock_subprocess_run.call_args[0][0]
+    assert command[-1] == playlist_path
+    assert command[command.index("-hls_time") + 1] == "4"
+    assert command[command.index("-hls_playlist_type") + 1] == "event"
+    assert command[command.index("-hls_segment_filename") + 1] == os.path.join(
+        output_directory, "segment_%05d.ts"
+    )
+
+
+@patch(
+    "subprocess.run",
+    return_value=subprocess.CompletedProcess(
+        [], 1, b"", b"path: Invalid data found when processing input\n"
+    ),
+)
+@patch("match_video.utils.read_anchors", return_value=[Anchor(1, 0.0, 0.0)])
+def test_write_hls_ffmpeg_fails(mock_read_anchors, mock_subprocess_run, tmp_path):
+    clip_clocks = [{"period": 1, "start_clock": 0.0, "end_clock": 10.0}]
+
+    with pytest.raises(ValueError, match="Invalid data found"):
+        utils.write_hls("path", clip_clocks, str(tmp_path / "hls"))
+
+
+@patch("match_video.utils.read_anchors", return_value=[Anchor(1, 0.0, 0.0)])
+def test_write_hls_unknown_segment_type(mock_read_anchors, tmp_path):
+    clip_clocks = [{"period": 1, "start_clock": 0.0, "end_clock": 10.0}]
+
+    with pytest.raises(ValueError):
+        utils.write_hls("path", clip_clocks, str(tmp_path), segment_type="webm")
+
+
+@patch("match_video.utils._concat_clips")
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
+@patch(
+    "match_video.utils.keyframes.read_keyframe_index",
+    return_value=KeyframeIndex([0.0, 2.0, 4.0], "h264", "yuv420p", 12800, "aac"),
+)
+def test_smart_cut_clip_between_keyframes(
+    mock_read_keyframe_index, mock_subprocess_run, mock_concat_clips
+):
+    utils._smart_cut_clip("input_path", "output_path", 1.5, 3.0)
+
+    encode_command, copy_command = [
+        args[0] for args, _ in mock_subprocess_run.call_args_list
+    ]
+    assert encode_command[2:6] == ["-ss", "1.500000", "-to", "1.999500"]
+    assert "libx264" in encode_command
+    assert copy_command[2:6] == ["-ss", "2.000500", "-to", "3.000000"]
+    assert "h264_mp4toannexb" in copy_command
+
+    head_path, tail_path = mock_concat_clips.call_args[0][0]
+    assert encode_command[-1] == head_path
+    assert copy_command[-1] == tail_path
+    assert mock_concat_clips.call_args[0][1] == "output_path"
+
+
+@patch("match_video.utils._concat_clips")
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
+@patch(
+    "match_video.utils.keyframes.read_keyframe_index",
+    return_value=KeyframeIndex([0.0, 2.0, 4.0], "h264", "yuv420p", 12800, "aac"),
+)
+def test_smart_cut_clip_at_keyframe(
+    mock_read_keyframe_index, mock_subprocess_run, mock_concat_clips
+):
+    utils._smart_cut_clip("input_path", "output_path", 2.0, 3.0)
+
+    mock_subprocess_run.assert_called_once()
+    copy_command = mock_subprocess_run.call_args[0][0]
+    assert copy_command[2:6] == ["-ss", "2.000500", "-to", "3.000000"]
+    assert copy_command[-1] == "output_path"
+    mock_concat_clips.assert_not_called()
+
+
+@patch("match_video.utils._concat_clips")
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 0))
+@patch(
+    "match_video.utils.keyframes.read_keyframe_index",
+    return_value=KeyframeIndex([0.0, 2.0, 4.0], "h264", "yuv420p", 12800, "aac"),
+)
+def test_smart_cut_clip_without_keyframe(
+    mock_read_keyframe_index, mock_subprocess_run, mock_concat_clips
+):
+    utils._smart_cut_clip("input_path", "output_path", 2.5, 3.5)
+
+    mock_subprocess_run.assert_called_once()
+    encode_command = mock_subprocess_run.call_args[0][0]
+    assert "libx264" in encode_command
+    assert encode_command[-1] == "output_path"
+    mock_concat_clips.assert_not_called()
+
+
+@patch(
+    "match_video.utils.keyframes.read_keyframe_index",
+    return_value=KeyframeIndex([0.0, 2.0, 4.0], "prores", None, 12800, None),
+)
+def test_smart_cut_clip_unsupported_codec(mock_read_keyframe_index):
+    with pytest.raises(ValueError):
+        utils._smart_cut_clip("input_path", "output_path", 1.5, 3.0)
+
+
+@patch("match_video.utils._smart_cut_clip")
+@patch("match_video.utils._extract_clips")
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_export_clips_smart_cut(
+    mock_read_anchors, mock_extract_clips, mock_smart_cut_clip
+):
+    clip_clocks = [
+        {"period": 1, "start_clock": float(i), "end_clock": i + 1.0} for i in range(3)
+    ]
+    output_paths = [f"clip_{i}.mp4" for i in range(3)]
+
+    utils.export_clips(
+        "path", clip_clocks, output_paths, single_pass=True, smart_cut=True
+    )
+
+    mock_extract_clips.assert_not_called()
+    assert mock_smart_cut_clip.call_count == 3
+
+
+def test_merge_clip_clocks():
+    clip_clocks = [
+        {"period": 2, "start_clock": 0.0, "end_clock": 10.0},
+        {"period": 1, "start_clock": 20.0, "end_clock": 30.0},
+        {"period": 1, "start_clock": 0.0, "end_clock": 10.0},
+        {"period": 1, "start_clock": 5.0, "end_clock": 8.0},
+        {"period": 1, "start_clock": 10.0, "end_clock": 12.0},
+        {"period": 2, "start_clock": 11.0, "end_clock": 20.0},
+    ]
+
+    assert utils.merge_clip_clocks(clip_clocks) == [
+        {"period": 1, "start_clock": 0.0, "end_clock": 12.0},
+        {"period": 1, "start_clock": 20.0, "end_clock": 30.0},
+        {"period": 2, "start_clock": 0.0, "end_clock": 10.0},
+        {"period": 2, "start_clock": 11.0, "end_clock": 20.0},
+    ]
+
+    assert utils.merge_clip_clocks(clip_clocks, gap=1.0)[2:] == [
+        {"period": 2, "start_clock": 0.0, "end_clock": 20.0},
+    ]
+    assert clip_clocks[0] == {"period": 2, "start_clock": 0.0, "end_clock": 10.0}
+
+
+def test_coalesce_clip_clocks():
+    clip_clocks = [
+        {"period": 1, "start_clock": 0.0, "end_clock": 10.0},
+        {"period": 1, "start_clock": 5.0, "end_clock": 15.0},
+        {"period": 1, "start_clock": 16.0, "end_clock": 20.0},
+    ]
+
+    coalesced = utils.coalesce_clip_clocks(clip_clocks)
+
+    assert coalesced.clip_clocks == [
+        {"period": 1, "start_clock": 0.0, "end_clock": 15.0},
+        {"period": 1, "start_clock": 16.0, "end_clock": 20.0},
+    ]
+    assert coalesced.seconds_saved == 5.0
+
+    assert utils.coalesce_clip_clocks(clip_clocks, gap=2.0).seconds_saved == 4.0
+
+
+@patch("subprocess.run")
+@patch("match_video.utils._extract_clip")
+@patch(
+    "match_video.utils.read_anchors",
+    return_value=[
+        Anchor(1, 0.0, 0.0),
+        Anchor(2, 0.0, 1000.0),
+    ],
+)
+def test_get_clips_merge_gap(
+    mock_read_anchors, mock_extract_clip, mock_subprocess_run, caplog
+):
+    clip_clocks = [
+        {"period": 2, "start_clock": 0.0, "end_clock": 10.0},
+        {"period": 1, "start_clock": 5.0, "end_clock": 15.0},
+        {"period": 1, "start_clock": 0.0, "end_clock": 10.0},
+    ]
+
+    concat_lists = []
+    mock_subprocess_run.side_effect = read_concat_lists(concat_lists)
+
+    with caplog.at_level("INFO", logger="match_video.utils"):
+        utils.get_clips("path", clip_clocks, merge_gap=0.0)
+
+    video_path = os.path.abspath("path")
+    assert concat_lists == [
+        f"file '{video_path}'\ninpoint 0.00\noutpoint 15.00\n"
+        f"file '{video_path}'\ninpoint 1000.00\noutpoint 1010.00"
+    ]
+    assert "Merged 3 clips into 2, saving 5.0 seconds" in caplog.text
+
+
+@patch("match_video.utils._extract_clip")
+@patch("match_video.utils.read_anchors", return_value=[Anchor(1, 0.0, 0.0)])
+def test_get_clip_cached(mock_read_anchors, mock_extract_clip, tmp_path):
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"video")
+    cache = ClipCache(str(tmp_path / "cache"))
+
+    def extract_clip(video_path, clip_path, start, end):
+        with open(clip_path, "wb") as clip_file:
+            clip_file.write(b"clip")
+
+    mock_extract_clip.side_effect = extract_clip
+
+    first = utils.get_clip(str(video_path), 1, 0.0, 10.0, cache=cache)
+    second = utils.get_clip(str(video_path), 1, 0.0, 10.0, cache=cache)
+    utils.get_clip(str(video_path), 1, 0.0, 20.0, cache=cache)
+
+    assert first == second == b"clip"
+    assert mock_extract_clip.call_count == 2
+    assert cache.info().hits == 1
+    assert cache.info().misses == 2
+
+
+@patch("subprocess.run", return_value=subprocess.CompletedProcess([], 1, b"", b""))
+@patch("match_video.utils.read_anchors", return_value=[Anchor(1, 0.0, 0.0)])
+def test_get_clip_failed_extraction_not_cached(
+    mock_read_anchors, mock_subprocess_run, tmp_path
+):
+    video_path = tmp_path / "video.mp4"
+    video_path.write_bytes(b"not a video")
+    cache = ClipCache(str(tmp_path / "cache"))
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            utils.get_clip(str(video_path), 1, 0.0, 10.0, cache=cache)
+
+    assert mock_subprocess_run.call_count == 2
+    assert cache.info().hits == 0
+    assert os.listdir(cache.directory) == []